@@ -1,10 +1,19 @@
+import uuid
+
 import streamlit as st
-from main import get_recommendation, extract_number, answer_what_if_question
+from main import get_recommendation, stream_what_if_answer
+from incremental import update_recommendation
+from profiles import build_profile_text
+from profiling import request_headers
+from streaming import begin_request, end_request
 import matplotlib.pyplot as plt
 
 st.set_page_config(page_title="Insurance Advisor", layout="centered")
 st.title("Personalized Insurance Recommender")
 
+# With PROFILE_HEADER=1, requests sent with "X-Profile: 1" are profiled
+request_headers(getattr(getattr(st, "context", None), "headers", None))
+
 # -------------------
 # Helper function
 # -------------------
@@ -15,6 +24,52 @@ def show_plan(title, plan):
     st.write(f"- Reason: {plan.reason}")
     st.write(f"- Add-ons: {', '.join(plan.add_ons) if plan.add_ons else 'None'}")
 
+# -------------------
+# Browser-side charts (chart data from get_recommendation(render_charts=False))
+# -------------------
+def show_affordability_chart(data):
+    st.vega_lite_chart({
+        "data": {"values": [
+            {"part": label, "amount": value, "pct": pct}
+            for label, value, pct in zip(data["labels"], data["values"], data["percentages"])
+        ]},
+        "mark": {"type": "arc", "tooltip": True},
+        "encoding": {
+            "theta": {"field": "amount", "type": "quantitative"},
+            "color": {"field": "part", "type": "nominal",
+                      "scale": {"domain": data["labels"], "range": data["colors"]}},
+        },
+        "title": data["title"],
+    }, use_container_width=True)
+
+def show_coverage_chart(data):
+    bars = [{"type": label, "amount": value, "label": text}
+            for label, value, text in zip(data["labels"], data["values"], data["value_labels"])]
+    st.vega_lite_chart({
+        "layer": [
+            {"data": {"values": bars}, "mark": {"type": "bar", "tooltip": True},
+             "encoding": {"x": {"field": "type", "type": "nominal", "title": None},
+                          "y": {"field": "amount", "type": "quantitative", "title": "Amount (₹)",
+                                "scale": {"domain": [0, data["y_max"]]}},
+                          "color": {"field": "type", "type": "nominal", "legend": None,
+                                    "scale": {"domain": data["labels"], "range": data["colors"]}}}},
+            {"data": {"values": bars}, "mark": {"type": "text", "dy": -8, "fontWeight": "bold"},
+             "encoding": {"x": {"field": "type", "type": "nominal"},
+                          "y": {"field": "amount", "type": "quantitative"},
+                          "text": {"field": "label"}}},
+            {"data": {"values": [{"income": data["annual_income"]}]},
+             "mark": {"type": "rule", "color": "red", "strokeDash": [6, 4], "size": 2},
+             "encoding": {"y": {"field": "income", "type": "quantitative"}}},
+        ],
+        "title": data["title"],
+    }, use_container_width=True)
+    st.caption(f"Red line: {data['income_label']}")
+
+def show_adequacy_gauge(data):
+    st.metric("Coverage Adequacy", data["label"])
+    st.progress(min(data["adequacy_pct"], 100) / 100)
+    st.caption(f"{data['coverage_text']} · {data['recommended_text']} · band: {data['color']}")
+
 # -------------------
 # Profile Form
 # -------------------
@@ -38,6 +93,7 @@ with st.form("profile_form"):
     vehicle = st.radio("Do you have a vehicle?", ["Yes", "No"])
     owns_property = st.radio("Owns Property?", ["Yes", "No"])
     frequent_traveler = st.radio("Frequent Traveler?", ["Yes", "No"])
+    interactive_charts = st.checkbox("Interactive charts (drawn in the browser)", value=True)
     submitted = st.form_submit_button("Get Recommendation")
 
 # -------------------
@@ -69,29 +125,40 @@ if submitted:
     }
 
 
+    # A small edit to the last submitted profile only recomputes what that field affects
+    profile_text = build_profile_text(user_input)
+    result = None
+    if "last_result" in st.session_state:
+        result = update_recommendation(st.session_state["last_result"], st.session_state["last_profile"],
+                                       user_input, render_charts=not interactive_charts)
+
     with st.spinner("Generating recommendations..."):
-        # Convert user_input dict to formatted string for get_recommendation
-        profile_text = (
-            f"Age: {user_input['age']}\n"
-            f"Monthly Income: ₹{user_input['income']}\n"
-            f"Marital Status: {user_input['marital_status']}\n"
-            f"Dependents: {user_input['dependents']}\n"
-            f"Employment: {user_input['employment']}\n"
-            f"Existing Insurance: {', '.join([k for k, v in user_input['existing_insurance'].items() if v])}\n"
-            f"Health Conditions: {user_input['health_conditions']}\n"
-            f"Vehicle: {user_input['vehicle']}\n"
-            f"Owns Property: {user_input['owns_property']}\n"
-            f"Frequent Traveler: {user_input['frequent_traveler']}\n"
-        )
-        result = get_recommendation(profile_text)
+        if result is None:
+            result = get_recommendation(profile_text, render_charts=not interactive_charts)
         if "error" in result:
             st.error("Failed to generate recommendation.")
             st.exception(result["error"])
             st.stop()
+        st.session_state["last_result"], st.session_state["last_profile"] = result, user_input
 
         recommendation = result["recommendation"]
         matched_products = result["products"]
         explanation = result["explanation"]
+        token_usage = result.get("token_usage")
+        if token_usage:
+            st.caption(
+                f"Tokens used: {token_usage['prompt_tokens']} prompt / "
+                f"{token_usage['completion_tokens']} completion"
+            )
+        if result.get("incremental"):
+            changed = ", ".join(result["incremental"]["changed_fields"]) or "nothing"
+            st.caption(f"Updated for changed fields ({changed}) in {result['incremental']['duration_ms']} ms.")
+        if result.get("served_by") == "rules_engine":
+            st.caption("High demand right now: this recommendation was calculated with our standard rules.")
+        elif result.get("served_by") == "mixed":
+            st.caption("Sections affected by your edit were recalculated with our standard rules.")
+        if result.get("reused_from"):
+            st.caption("Based on our advice for a very similar profile, with coverage and premiums recalculated for yours.")
 
     # -------------------
     # Recommendations
@@ -160,22 +227,32 @@ if submitted:
     # -------------------
     # Charts + Tips (only once)
     # -------------------
+    chart_data = result.get("chart_data") or {}
     st.subheader("📊 Premium vs Income")
-    if result.get("chart_path"):
+    if chart_data.get("affordability"):
+        show_affordability_chart(chart_data["affordability"])
+        st.info(result.get("affordability_tip", ""))
+    elif result.get("chart_path"):
         st.image(result["chart_path"], caption="Premium distribution vs income", use_container_width=True)
         st.info(result.get("affordability_tip", ""))
     else:
         st.warning("Chart could not be generated due to missing values.")
 
     st.subheader("📊 Coverage vs Income")
-    if result.get("coverage_chart_path"):
+    if chart_data.get("coverage_vs_income"):
+        show_coverage_chart(chart_data["coverage_vs_income"])
+        st.info(result.get("coverage_tip", ""))
+    elif result.get("coverage_chart_path"):
         st.image(result["coverage_chart_path"], caption="Coverage vs Annual Income", use_container_width=True)
         st.info(result.get("coverage_tip", ""))
     else:
         st.warning("Coverage chart not available.")
 
     st.subheader("📊 Coverage Adequacy")
-    if result.get("coverage_adequacy"):
+    if chart_data.get("coverage_adequacy"):
+        show_adequacy_gauge(chart_data["coverage_adequacy"])
+        st.info(result.get("adequacy_tip", ""))
+    elif result.get("coverage_adequacy"):
         st.image(result["coverage_adequacy"], caption="Adequacy Gauge", use_container_width=True)
         st.info(result.get("adequacy_tip", ""))
     else:
@@ -216,14 +293,21 @@ if submitted:
         if not final_q or final_q.strip() == "":
             st.warning("Please enter or select a question first.")
         else:
-            with st.spinner("Thinking..."):
-                try:
-                    st.write(f"Processing question: {final_q}")
-                    reply = answer_what_if_question(final_q, profile_text)
-                    st.session_state["what_if_reply"] = reply
-                except Exception as e:
-                    st.error(f"Error processing your question: {str(e)}")
-                    st.exception(e)
+            # A new question cancels the session's previous in-flight answer
+            session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+            cancel_event = begin_request(session_id)
+            st.session_state.pop("what_if_reply", None)
+            try:
+                st.write(f"Processing question: {final_q}")
+                with response_container.container():
+                    st.markdown("**Response:**")
+                    reply = st.write_stream(stream_what_if_answer(final_q, profile_text, cancel_event))
+                st.session_state["what_if_reply"] = reply
+            except Exception as e:
+                st.error(f"Error processing your question: {str(e)}")
+                st.exception(e)
+            finally:
+                end_request(session_id, cancel_event)
 
 # Display reply if available
 if "what_if_reply" in st.session_state:
@@ -0,0 +1,241 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, List
+
+from profiles import build_profile_text
+
+# ----------------------------------------
+# Resumable, chunked batch scoring
+# ----------------------------------------
+# Input rows stream from CSV or JSONL, are scored chunk by chunk on a worker
+# pool and appended to the output. After every flushed chunk a checkpoint
+# records how many rows are final and the writer's position (bytes of JSONL,
+# or finished Parquet parts), so a killed job resumes exactly there. Only one
+# chunk is ever held in memory.
+
+INSURANCE_KEYS = ["term_insurance", "health_insurance", "vehicle_insurance", "travel_insurance"]
+
+
+def read_rows(path: str) -> Iterator[Dict]:
+    """Stream raw rows from a .csv or .jsonl file."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def normalize_row(row: Dict) -> Dict:
+    """Turn a CSV/JSONL row into the profile-form dict app.py builds."""
+    existing = row.get("existing_insurance") or {}
+    if isinstance(existing, str):
+        # CSV: "term_insurance;health_insurance" (or comma separated)
+        names = {name.strip() for name in existing.replace(";", ",").split(",")}
+        existing = {key: key in names for key in INSURANCE_KEYS}
+    return {
+        "age": int(row["age"]),
+        "income": int(float(row["income"])),
+        "marital_status": row.get("marital_status") or "Single",
+        "dependents": int(row.get("dependents") or 0),
+        "employment": row.get("employment") or "Private Job",
+        "existing_insurance": existing,
+        "health_conditions": row.get("health_conditions") or "None",
+        "vehicle": row.get("vehicle") or "No",
+        "owns_property": row.get("owns_property") or "No",
+        "frequent_traveler": row.get("frequent_traveler") or "No",
+    }
+
+# ----------------------------------------
+# Scoring (runs inside worker processes / threads)
+# ----------------------------------------
+def score_row(task) -> Dict:
+    row_number, row, mode = task
+    # Sharded runs (sharded_batch.py) carry the global row number and dedupe key along
+    record = {"row": row.get("_row", row_number), "id": row.get("id", row_number)}
+    if "_key" in row:
+        record["key"] = row["_key"]
+    try:
+        profile = normalize_row(row)
+        profile_text = build_profile_text(profile)
+        if mode == "llm":
+            from main import get_recommendation
+            from llm_scheduler import BATCH, llm_priority
+            # Batch calls queue behind live users and fall back to rules when the LLM queue is deep
+            with llm_priority(BATCH):
+                result = get_recommendation(profile_text, render_charts=False, save_output=False)
+            if "error" in result:
+                raise RuntimeError(result["error"])
+            recommendation, products = result["recommendation"], result["products"]
+            record["served_by"] = result["served_by"]
+        else:
+            # Rules-only workers never import main (no Gemini key or model loading)
+            from matching import match_recommendation_products
+            from rules import calculate_insurance_recommendations
+            recommendation = calculate_insurance_recommendations(profile_text)
+            products = match_recommendation_products(recommendation, profile_text)
+        record.update(summarize(profile, recommendation, products))
+    except Exception as e:
+        record["error"] = str(e)
+    return record
+
+
+def summarize(profile: Dict, recommendation, products: Dict) -> Dict:
+    term, health = recommendation.term_insurance, recommendation.health_insurance
+    return {
+        "profile": profile,
+        "term_coverage": term.coverage_inr,
+        "term_premium": term.annual_premium_inr,
+        "health_coverage": health.coverage_inr,
+        "health_premium": health.annual_premium_inr,
+        "total_premium": sum(section.annual_premium_inr for section in recommendation.sections()),
+        "affordability": recommendation.premium_affordability_check,
+        "top_products": {category: [f"{p['company']} - {p['plans'][0]}" for p in found]
+                         for category, found in products.items()},
+        "recommendation": recommendation.model_dump(),
+        "products": products,
+    }
+
+# ----------------------------------------
+# Output writers
+# ----------------------------------------
+class JsonlWriter:
+    def __init__(self, path: str, resume_position: int):
+        self.path = path
+        self.file = open(path, "ab")
+        # Drop anything written after the last checkpoint (a partially flushed chunk)
+        self.file.truncate(resume_position)
+        self.file.seek(resume_position)
+
+    def write_chunk(self, records: List[Dict], chunk_index: int):
+        for record in records:
+            self.file.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def position(self) -> int:
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """One part file per chunk, so resuming never rewrites finished parts."""
+
+    def __init__(self, path: str, resume_position: int):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow (pip install pyarrow)")
+        self.path = path
+        self.parts = resume_position
+        os.makedirs(path, exist_ok=True)
+        # Drop parts written after the last checkpoint (and unfinished .tmp files)
+        for name in os.listdir(path):
+            if name.startswith("part-") and (name.endswith(".tmp") or int(name[5:11]) >= resume_position):
+                os.remove(os.path.join(path, name))
+
+    def write_chunk(self, records: List[Dict], chunk_index: int):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Nested fields are stored as JSON strings to keep a flat schema
+        rows = [{k: json.dumps(v, ensure_ascii=False) if isinstance(v, (dict, list)) else v
+                 for k, v in record.items()} for record in records]
+        part = os.path.join(self.path, f"part-{chunk_index:06d}.parquet")
+        pq.write_table(pa.Table.from_pylist(rows), part + ".tmp")
+        os.replace(part + ".tmp", part)
+        self.parts = chunk_index + 1
+
+    def position(self) -> int:
+        return self.parts
+
+    def close(self):
+        pass
+
+# ----------------------------------------
+# Checkpointing
+# ----------------------------------------
+def load_checkpoint(path: str, input_path: str) -> Dict:
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("input") == os.path.abspath(input_path):
+            return checkpoint
+    return {"input": os.path.abspath(input_path), "rows_done": 0, "chunks_done": 0, "output_position": 0}
+
+
+def save_checkpoint(path: str, checkpoint: Dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def run_batch(input_path: str, output_path: str, mode: str = "rules", fmt: str = "jsonl",
+              chunk_size: int = 1000, workers: int = 4, checkpoint_path: str = None, progress: bool = True) -> Dict:
+    checkpoint_path = checkpoint_path or output_path.rstrip("/") + ".checkpoint.json"
+    checkpoint = load_checkpoint(checkpoint_path, input_path)
+    writer = (JsonlWriter if fmt == "jsonl" else ParquetWriter)(output_path, checkpoint["output_position"])
+
+    # LLM scoring is I/O bound (threads); rules scoring is CPU bound (processes),
+    # where rows are sent to the workers in batches
+    pool_cls = ThreadPoolExecutor if mode == "llm" else ProcessPoolExecutor
+    rows = enumerate(read_rows(input_path))
+    skipped = checkpoint["rows_done"]
+    rows = islice(rows, skipped, None)
+    errors = 0
+    started = time.perf_counter()
+
+    try:
+        with pool_cls(max_workers=workers) as pool:
+            while True:
+                chunk = [(n, row, mode) for n, row in islice(rows, chunk_size)]
+                if not chunk:
+                    break
+                batching = {"chunksize": max(1, len(chunk) // (workers * 4))} if mode != "llm" else {}
+                records = list(pool.map(score_row, chunk, **batching))
+                errors += sum(1 for r in records if "error" in r)
+                writer.write_chunk(records, checkpoint["chunks_done"])
+
+                checkpoint["rows_done"] += len(chunk)
+                checkpoint["chunks_done"] += 1
+                checkpoint["output_position"] = writer.position()
+                save_checkpoint(checkpoint_path, checkpoint)
+                if progress:
+                    rate = (checkpoint["rows_done"] - skipped) / (time.perf_counter() - started)
+                    print(f"... {checkpoint['rows_done']} rows done ({rate:.0f} rows/s)", file=sys.stderr, flush=True)
+    finally:
+        writer.close()
+
+    return {"rows_done": checkpoint["rows_done"], "resumed_from": skipped, "errors": errors,
+            "duration_s": round(time.perf_counter() - started, 3)}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Score a CSV/JSONL customer file in resumable chunks.")
+    ap.add_argument("input", help="input .csv or .jsonl (one profile per row)")
+    ap.add_argument("output", help="output .jsonl file, or a directory for --format parquet")
+    ap.add_argument("--mode", choices=["rules", "llm"], default="rules")
+    ap.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    ap.add_argument("--chunk-size", type=int, default=1000)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    ap.add_argument("--checkpoint", help="checkpoint file (default: <output>.checkpoint.json)")
+    args = ap.parse_args(argv)
+
+    summary = run_batch(args.input, args.output, args.mode, args.format, args.chunk_size, args.workers, args.checkpoint)
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from profiling import enforce_retention
+
+# ----------------------------------------
+# Production traffic capture
+# ----------------------------------------
+# Opt-in recording of every get_recommendation / what-if invocation: its
+# arguments, wall-clock start, duration, per-stage timings, the LLM responses
+# (only with CAPTURE_LLM_RESPONSES=1) and a summary of the output, so
+# replay.py can re-drive the same traffic against the current code.
+#
+# Records are JSON, zlib-compressed against a preset dictionary of the keys
+# and profile lines every record repeats, and framed as
+# [4-byte big-endian length][1-byte format version][payload] in files that
+# rotate at CAPTURE_MAX_MB; the oldest files beyond CAPTURE_KEEP are deleted.
+#
+#   CAPTURE_TRAFFIC=1           enable capture
+#   CAPTURE_LLM_RESPONSES=1     also store LLM response text (needed to replay LLM calls)
+#   CAPTURE_DIR                 output directory (default ./traffic_capture)
+#   CAPTURE_MAX_MB / CAPTURE_KEEP   file size before rotating / files kept (default 32 / 20)
+#
+# Like @profiled, @captured returns the function unchanged when capture is
+# off; stage() then costs one context-variable lookup.
+
+ENABLED = os.getenv("CAPTURE_TRAFFIC", "0") == "1"
+RECORD_LLM = os.getenv("CAPTURE_LLM_RESPONSES", "0") == "1"
+CAPTURE_DIR = os.getenv("CAPTURE_DIR", os.path.join(os.getcwd(), "traffic_capture"))
+MAX_FILE_BYTES = int(float(os.getenv("CAPTURE_MAX_MB", 32)) * 1024 * 1024)
+KEEP_FILES = int(os.getenv("CAPTURE_KEEP", 20))
+
+FORMAT_VERSION = 1
+FRAME = struct.Struct(">IB")
+# Preset dictionary for format version 1; changing it needs a new version
+ZDICT = json.dumps({
+    "v": 1, "kind": "recommendation", "started_at": 0, "duration_ms": 0,
+    "args": {"profile_text": "Age: \nMonthly Income: ₹\nMarital Status: Married\nDependents: \n"
+                             "Employment: Private Job\nExisting Insurance: term_insurance, health_insurance\n"
+                             "Health Conditions: None\nVehicle: Yes\nOwns Property: No\nFrequent Traveler: No\n",
+             "query": "What if ", "structured_output": True, "render_charts": False, "save_output": True},
+    "stages": {"llm": 0, "matching": 0, "insights": 0, "charts": 0, "save": 0},
+    "llm": [{"call": "recommendation", "model": "gemini-2.5-pro", "text": "", "duration_ms": 0,
+             "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}}],
+    "output": {"served_by": "llm", "sections": {"term_insurance": [], "health_insurance": []},
+               "products": {"Term Insurance": [], "Health Insurance": []}},
+}, ensure_ascii=False).encode("utf-8")
+
+_current = contextvars.ContextVar("capture_record", default=None)
+
+
+def encode_record(record: Dict) -> bytes:
+    compressor = zlib.compressobj(9, zdict=ZDICT)
+    payload = compressor.compress(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    payload += compressor.flush()
+    return FRAME.pack(len(payload), FORMAT_VERSION) + payload
+
+
+def decode_payload(payload: bytes, version: int) -> Dict:
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported capture format version {version}")
+    decompressor = zlib.decompressobj(zdict=ZDICT)
+    return json.loads(decompressor.decompress(payload) + decompressor.flush())
+
+
+class CaptureLog:
+    """Appends framed records to the newest file, rotating at `max_bytes`."""
+
+    def __init__(self, directory: str = CAPTURE_DIR, max_bytes: int = MAX_FILE_BYTES, keep: int = KEEP_FILES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.path = None
+        self.size = 0
+        self._lock = threading.Lock()
+
+    def _rotate(self):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self.path = os.path.join(self.directory, f"capture_{stamp}.bin")
+        self.size = 0
+        # Make room for the file about to be started
+        keep = max(self.keep - 1, 0)
+        enforce_retention(self.directory, keep=keep, max_bytes=keep * self.max_bytes)
+
+    def write(self, record: Dict):
+        frame = encode_record(record)
+        with self._lock:
+            if self.path is None or self.size + len(frame) > self.max_bytes:
+                self._rotate()
+            with open(self.path, "ab") as f:
+                f.write(frame)
+            self.size += len(frame)
+
+
+def read_records(path: str) -> Iterator[Dict]:
+    """Records from a capture file, or from every file in a directory in time order.
+    A frame cut short by a crash ends its file."""
+    paths = [path] if os.path.isfile(path) else sorted(
+        os.path.join(path, name) for name in os.listdir(path) if name.endswith(".bin"))
+    for file_path in paths:
+        with open(file_path, "rb") as f:
+            while True:
+                header = f.read(FRAME.size)
+                if len(header) < FRAME.size:
+                    break
+                length, version = FRAME.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length:
+                    break
+                yield decode_payload(payload, version)
+
+
+_log: Optional[CaptureLog] = None
+
+
+def get_log() -> CaptureLog:
+    global _log
+    if _log is None:
+        _log = CaptureLog()
+    return _log
+
+
+def set_log(log: Optional[CaptureLog]):
+    """Send records to `log` (None: stop writing, e.g. while replaying)."""
+    global _log
+    _log = log
+
+# ----------------------------------------
+# Recording hooks
+# ----------------------------------------
+@contextmanager
+def stage(name: str):
+    """Time a stage of the current captured call (a no-op outside one)."""
+    record = _current.get()
+    if record is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        record["stages"][name] = round(record["stages"].get(name, 0) + elapsed, 3)
+
+
+def record_llm(call: str, model: Optional[str], text: Optional[str], usage: Optional[Dict] = None,
+               duration_ms: Optional[float] = None, chunks: Optional[List[str]] = None):
+    """Note an LLM response in the current captured call; the text is kept only when allowed."""
+    record = _current.get()
+    if record is None:
+        return
+    entry = {"call": call, "model": model, "duration_ms": round(duration_ms, 3) if duration_ms else None,
+             "usage": usage, "text": None}
+    if record["keep_llm_text"]:
+        entry["text"] = text
+        if chunks is not None:
+            entry["chunks"] = chunks
+    record["llm"].append(entry)
+
+
+def summarize_recommendation(result: Dict) -> Dict:
+    """The parts of a get_recommendation result a replay compares."""
+    if "error" in result:
+        return {"error": result["error"]}
+    recommendation = result["recommendation"]
+    sections = {name: [section.coverage_inr, section.annual_premium_inr, section.reason]
+                for name, section in recommendation if hasattr(section, "coverage_inr")}
+    return {
+        "served_by": result.get("served_by"),
+        "sections": sections,
+        "affordability": recommendation.premium_affordability_check,
+        "products": {label: [f"{p['company']}: {', '.join(p['plans'])}" for p in found]
+                     for label, found in (result.get("products") or {}).items()},
+        "tips": [result.get("affordability_tip"), result.get("coverage_tip"), result.get("adequacy_tip")],
+    }
+
+
+def _arguments(func, args, kwargs) -> Dict:
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    return {k: v for k, v in bound.arguments.items() if isinstance(v, (str, int, float, bool, type(None)))}
+
+
+def _new_record(kind: str, arguments: Dict) -> Dict:
+    return {"v": FORMAT_VERSION, "kind": kind, "started_at": time.time(), "duration_ms": None,
+            "args": arguments, "stages": {}, "llm": [], "keep_llm_text": RECORD_LLM, "output": None}
+
+
+def _finish(record: Dict, started: float, output, sink):
+    record["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    record["output"] = output
+    record.pop("keep_llm_text")
+    if sink is not None:
+        sink(record)
+        return
+    log = _log if _log is not None else (get_log() if ENABLED else None)
+    if log is not None:
+        try:
+            log.write(record)
+        except OSError:
+            pass  # capture must never fail the request
+
+
+def captured(kind: str, enabled: Optional[bool] = None, sink=None):
+    """Decorator: record each call of a recommendation function (or the text a
+    what-if generator yields); a no-op unless capture is enabled. Finished
+    records go to the capture log, or to `sink` when one is given."""
+    def decorate(func):
+        if not (ENABLED if enabled is None else enabled):
+            return func
+
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                if _current.get() is not None:
+                    yield from func(*args, **kwargs)
+                    return
+                record = _new_record(kind, _arguments(func, args, kwargs))
+                started = time.perf_counter()
+                pieces = []
+                stream = func(*args, **kwargs)
+                try:
+                    while True:
+                        # The record is current only while the generator body runs
+                        token = _current.set(record)
+                        try:
+                            piece = next(stream)
+                        except StopIteration:
+                            break
+                        finally:
+                            _current.reset(token)
+                        pieces.append(piece)
+                        yield piece
+                finally:
+                    stream.close()
+                    _finish(record, started, {"answer": "".join(pieces).strip()}, sink)
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current.get() is not None:
+                return func(*args, **kwargs)
+            record = _new_record(kind, _arguments(func, args, kwargs))
+            started = time.perf_counter()
+            token = _current.set(record)
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            finally:
+                _current.reset(token)
+                _finish(record, started, summarize_recommendation(result) if isinstance(result, dict) else None, sink)
+        return wrapper
+    return decorate
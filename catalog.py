@@ -0,0 +1,346 @@
+import json
+import os
+import re
+import math
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from products import insurance_products
+
+# ----------------------------------------
+# Flattened product catalog
+# ----------------------------------------
+# products.py mixes two shapes (companies with a "products" list, and
+# companies with a bare "plans" list), and insurance_products.json adds
+# individual priced plans. Everything is flattened once at import into one
+# record per plan so matchers walk a single list.
+CATALOG_JSON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "insurance_products.json")
+
+# Keywords used to infer the type of plans listed only by name
+PLAN_TYPE_KEYWORDS = {
+    "term": ("term",),
+    "health": ("health", "optima", "suraksha", "mediclaim"),
+    "vehicle": ("motor", "car", "vehicle", "two wheeler", "bike"),
+    "travel": ("travel",),
+    "personal_accident": ("accident",),
+    "savings": ("savings",),
+    "ulip": ("ulip",),
+    "investment": ("invest", "wealth"),
+    "retirement": ("retire", "pension"),
+    "income": ("income",),
+}
+
+
+def parse_csr_value(csr_value):
+    """Parse CSR value from various formats and return numeric value."""
+    if csr_value is None:
+        return 0
+
+    # Convert to string first
+    csr_str = str(csr_value).strip()
+
+    # Try to extract percentage from text like "High persistency, ~88.1% renewals"
+    match = re.search(r'(\d+(?:\.\d+)?)%', csr_str)
+    if match:
+        return float(match.group(1))
+
+    # Try to extract number with ~ symbol like "~88.1"
+    match = re.search(r'~?(\d+(?:\.\d+)?)', csr_str)
+    if match:
+        return float(match.group(1))
+
+    # Try direct float conversion
+    try:
+        return float(csr_str)
+    except ValueError:
+        return 0
+
+
+def infer_plan_types(plan_name: str) -> frozenset:
+    name = plan_name.lower()
+    types = {t for t, words in PLAN_TYPE_KEYWORDS.items() if any(w in name for w in words)}
+    return frozenset(types or {"other"})
+
+
+def _product_types(type_field: str) -> frozenset:
+    # e.g. "term + return_of_premium" -> {"term", "return_of_premium"}
+    return frozenset(part.strip() for part in str(type_field).split("+") if part.strip())
+
+
+# ----------------------------------------
+# Eligibility intervals
+# ----------------------------------------
+# Entry age, policy term and minimum premium come in several shapes across
+# products.py ({"min_age": 18, "max_age": 65}, "18 to ~65 years", "18+ years",
+# "5-40 years", "₹8,263/year"). They are parsed once into closed numeric
+# intervals; a missing or open-ended bound is -inf / inf.
+INF = float("inf")
+
+
+def parse_range_text(text) -> Tuple[float, float]:
+    """(low, high) from free text; "+", "varies" or "long-term" leave the top open."""
+    if text is None:
+        return -INF, INF
+    text = str(text).lower()
+    numbers = re.findall(r"\d+(?:\.\d+)?", text)
+    if not numbers:
+        return -INF, INF
+    low = float(numbers[0])
+    open_top = len(numbers) == 1 or "varies" in text or "long-term" in text or re.search(r"\d\+", text)
+    return low, INF if open_top else float(numbers[-1])
+
+
+def _age_range(eligibility, tenure_eligibility) -> Tuple[float, float]:
+    if isinstance(eligibility, dict) and ("min_age" in eligibility or "max_age" in eligibility):
+        return float(eligibility.get("min_age", -INF)), float(eligibility.get("max_age", INF))
+    if isinstance(eligibility, dict) and "entry_age" in eligibility:
+        return parse_range_text(eligibility["entry_age"])
+    if isinstance(tenure_eligibility, dict) and "entry_age_min" in tenure_eligibility:
+        return float(tenure_eligibility["entry_age_min"]), float(tenure_eligibility.get("entry_age_max", INF))
+    return -INF, INF
+
+
+def _term_range(tenure, tenure_eligibility) -> Tuple[float, float]:
+    if isinstance(tenure, dict):
+        if "min" in tenure or "max" in tenure:
+            return float(tenure.get("min", -INF)), float(tenure.get("max", INF))
+        text = tenure.get("policy_duration") or tenure.get("policy_term")
+        if text:
+            return parse_range_text(text)
+    if isinstance(tenure_eligibility, dict) and "policy_term_range" in tenure_eligibility:
+        return parse_range_text(tenure_eligibility["policy_term_range"])
+    return -INF, INF
+
+
+def _min_premium(premium) -> float:
+    if isinstance(premium, dict):
+        return float(premium.get("min", -INF))
+    if isinstance(premium, str):
+        # A quoted price ("₹8,263/year") is the cheapest way to buy the plan
+        match = re.search(r"\d[\d,]*(?:\.\d+)?", premium)
+        return float(match.group(0).replace(",", "")) if match else -INF
+    return -INF
+
+
+# ----------------------------------------
+# Coverage (sum assured / sum insured) ranges
+# ----------------------------------------
+# "₹1 Crore", "₹10 Lakhs (Family Floater)", "IDV ₹50,000 to ₹50 lakhs" and
+# {"sum_assured_min": 2500000, "sum_assured_max": "no_limit"} all become a
+# numeric (min, max) in rupees; None when the catalog gives no amount
+# ("Varies by plan", {"death_benefit": True}).
+_AMOUNT_RE = re.compile(r"(?:₹|\brs\.?)\s*(\d[\d,]*(?:\.\d+)?)\s*(crores?|cr\b|lakhs?|lacs?)?", re.IGNORECASE)
+_AMOUNT_UNITS = {"cr": 1e7, "lakh": 1e5, "lac": 1e5}
+
+
+def parse_amounts(text: str) -> List[float]:
+    amounts = []
+    for number, unit in _AMOUNT_RE.findall(str(text)):
+        scale = next((v for k, v in _AMOUNT_UNITS.items() if unit.lower().startswith(k)), 1) if unit else 1
+        amounts.append(float(number.replace(",", "")) * scale)
+    return amounts
+
+
+def parse_coverage_range(coverage) -> Optional[Tuple[float, float]]:
+    if isinstance(coverage, dict):
+        if "sum_assured_min" in coverage:
+            high = coverage.get("sum_assured_max")
+            return float(coverage["sum_assured_min"]), float(high) if isinstance(high, (int, float)) else INF
+        coverage = coverage.get("sum_insured") or coverage.get("sum_assured")
+    if not isinstance(coverage, str):
+        return None
+    amounts = parse_amounts(coverage)
+    return (min(amounts), max(amounts)) if amounts else None
+
+
+def coverage_distance(coverage: float, coverage_range: Tuple[float, float]) -> float:
+    """0 inside the range, else how many doublings the request is away from it."""
+    low, high = coverage_range
+    if coverage < low:
+        return math.log2(low / coverage)
+    if coverage > high:
+        return math.log2(coverage / high)
+    return 0.0
+
+
+def add_eligibility(plan: Dict) -> Dict:
+    plan["age_range"] = _age_range(plan.get("eligibility"), plan.get("tenure_eligibility"))
+    plan["term_range"] = _term_range(plan.get("tenure"), plan.get("tenure_eligibility"))
+    plan["min_premium"] = _min_premium(plan.get("premium"))
+    plan["coverage_range"] = parse_coverage_range(plan.get("coverage"))
+    return plan
+
+
+def build_catalog(products: Dict = None, json_path: str = CATALOG_JSON_PATH) -> List[Dict]:
+    products = insurance_products if products is None else products
+    plans = []
+    for company, details in products.items():
+        # Company-level CSR - try both field names
+        csr = details.get("csr") or details.get("claim_settlement_ratio")
+        base = {"company": company, "csr": csr, "csr_value": parse_csr_value(csr)}
+        if "products" in details:
+            for prod in details["products"]:
+                plans.append({
+                    **base,
+                    "name": prod.get("name", "Insurance Plan"),
+                    "types": _product_types(prod.get("type", "")),
+                    "coverage": prod.get("coverage", {}),
+                    "premium": prod.get("premium"),
+                    "tenure": prod.get("tenure"),
+                    "eligibility": prod.get("eligibility"),
+                    "riders": prod.get("riders", []),
+                    "waiting_period": prod.get("waiting_period"),
+                })
+        elif "plans" in details:
+            for plan in details["plans"]:
+                plans.append({
+                    **base,
+                    "name": plan,
+                    "types": infer_plan_types(plan),
+                    "coverage": details.get("coverage", {}),
+                    "premium": details.get("premium"),
+                    "tenure": details.get("tenure"),
+                    "eligibility": details.get("eligibility"),
+                    "tenure_eligibility": details.get("tenure_eligibility"),
+                    "riders": details.get("coverage", {}).get("riders", []),
+                    "waiting_period": details.get("waiting_period"),
+                })
+
+    if json_path and os.path.exists(json_path):
+        with open(json_path, "r", encoding="utf-8") as f:
+            for item in json.load(f):
+                # Priced plans from insurers also listed in products.py share their CSR
+                csr = next((p["csr"] for p in plans if p["company"] == item["company"]), None)
+                plans.append({
+                    "company": item["company"],
+                    "csr": csr,
+                    "csr_value": parse_csr_value(csr),
+                    "name": item["product"],
+                    "types": _product_types(item["type"]),
+                    "coverage": item.get("coverage"),
+                    "premium": item.get("premium"),
+                    "url": item.get("url"),
+                    "riders": [],
+                })
+    return [add_eligibility(plan) for plan in plans]
+
+# ----------------------------------------
+# Interval indexes
+# ----------------------------------------
+class IntervalIndex:
+    """Which of a fixed set of closed intervals contain x? Answered as a bitmask.
+
+    The interval endpoints cut the number line into elementary regions (each
+    endpoint, and the gaps between them); the set of intervals covering every
+    region is precomputed, so a lookup is one bisect.
+    """
+
+    def __init__(self, intervals: List[Tuple[float, float]]):
+        self.breakpoints = sorted({v for interval in intervals for v in interval if abs(v) != INF})
+        bp = self.breakpoints
+        if not bp:
+            samples = [0.0]
+        else:
+            # gap 0, point 0, gap 1, point 1, ..., point n-1, gap n
+            samples = [bp[0] - 1]
+            for i, point in enumerate(bp):
+                samples.append(point)
+                samples.append((point + bp[i + 1]) / 2 if i + 1 < len(bp) else point + 1)
+        self.masks = [sum(1 << i for i, (low, high) in enumerate(intervals) if low <= x <= high) for x in samples]
+
+    def lookup(self, x: float) -> int:
+        if not self.breakpoints:
+            return self.masks[0]
+        i = bisect_left(self.breakpoints, x)
+        on_point = i < len(self.breakpoints) and self.breakpoints[i] == x
+        return self.masks[2 * i + 1 if on_point else 2 * i]
+
+
+class CoverageIndex:
+    """Plans of one type ordered by how far their coverage range is from a request.
+
+    Ranges containing the request come from an IntervalIndex; the rest sit in
+    two sorted arrays (by max for ranges below, by min for ranges above), and
+    a bisect into each gives the nearest ones, which are merged outwards.
+    """
+
+    def __init__(self, ranges: List[Optional[Tuple[float, float]]]):
+        known = [(i, r) for i, r in enumerate(ranges) if r is not None]
+        self.contains = IntervalIndex([r if r is not None else (INF, -INF) for r in ranges])
+        self.highs = sorted((r[1], i) for i, r in known)
+        self.lows = sorted((r[0], i) for i, r in known)
+        self.ranges = ranges
+
+    def nearest(self, coverage: float, mask: int):
+        """(distance, i) for plans in `mask` with a known range, nearest first."""
+        inside = self.contains.lookup(coverage) & mask
+        for i in range(inside.bit_length()):
+            if inside >> i & 1:
+                yield 0.0, i
+        # Ranges entirely below the request, highest max first; entirely above, lowest min first
+        below = bisect_left(self.highs, (coverage, -1)) - 1
+        above = bisect_right(self.lows, (coverage, len(self.ranges)))
+        while below >= 0 or above < len(self.lows):
+            down = math.log2(coverage / self.highs[below][0]) if below >= 0 else INF
+            up = math.log2(self.lows[above][0] / coverage) if above < len(self.lows) else INF
+            if down <= up:
+                distance, i = down, self.highs[below][1]
+                below -= 1
+            else:
+                distance, i = up, self.lows[above][1]
+                above += 1
+            if mask >> i & 1:
+                yield distance, i
+
+
+class EligibilityIndex:
+    """Per product type: plans whose age, term and premium ranges admit a profile."""
+
+    def __init__(self, plans: List[Dict]):
+        self.by_type = {}
+        members: Dict[str, List[int]] = {}
+        for position, plan in enumerate(plans):
+            for product_type in plan["types"]:
+                members.setdefault(product_type, []).append(position)
+        for product_type, positions in members.items():
+            typed = [plans[p] for p in positions]
+            self.by_type[product_type] = (
+                [(p, plans[p]) for p in positions],
+                IntervalIndex([plan["age_range"] for plan in typed]),
+                # A plan whose maximum term is shorter than the wanted term is bought at its
+                # maximum, so only "min term <= wanted term" is required
+                IntervalIndex([(plan["term_range"][0], INF) for plan in typed]),
+                # "min premium <= budget" is "budget in [min premium, inf)"
+                IntervalIndex([(plan["min_premium"], INF) for plan in typed]),
+                CoverageIndex([plan["coverage_range"] for plan in typed]),
+            )
+
+    def _mask(self, product_type: str, age, term_years, premium_budget) -> int:
+        entries, ages, terms, premiums, _ = self.by_type[product_type]
+        mask = (1 << len(entries)) - 1
+        for value, index in ((age, ages), (term_years, terms), (premium_budget, premiums)):
+            if value is not None:
+                mask &= index.lookup(value)
+        return mask
+
+    def candidates(self, product_type: str, age: Optional[float] = None, term_years: Optional[float] = None,
+                   premium_budget: Optional[float] = None) -> List[Tuple[int, Dict]]:
+        """(catalog position, plan) pairs eligible for the profile, in catalog order."""
+        if product_type not in self.by_type:
+            return []
+        mask = self._mask(product_type, age, term_years, premium_budget)
+        return [entry for i, entry in enumerate(self.by_type[product_type][0]) if mask >> i & 1]
+
+    def nearest_coverage(self, product_type: str, coverage: float, age: Optional[float] = None,
+                         term_years: Optional[float] = None, premium_budget: Optional[float] = None):
+        """(coverage distance, catalog position, plan) for eligible plans with a known
+        coverage range, nearest first."""
+        if product_type not in self.by_type:
+            return
+        entries, coverage_index = self.by_type[product_type][0], self.by_type[product_type][4]
+        for distance, i in coverage_index.nearest(coverage, self._mask(product_type, age, term_years, premium_budget)):
+            yield (distance,) + entries[i]
+
+
+catalog_plans = build_catalog()
+catalog_index = EligibilityIndex(catalog_plans)
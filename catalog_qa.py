@@ -0,0 +1,315 @@
+import re
+from difflib import get_close_matches
+from typing import Dict, List, Optional, Set, Tuple
+
+from catalog import INF, catalog_plans
+from schemas import format_inr
+
+# ----------------------------------------
+# Catalog fact answering
+# ----------------------------------------
+# Questions that are pure lookups over the catalog ("Which insurance company
+# has the highest claim settlement ratio?", "What riders does SBI Life
+# offer?", "Entry age for ICICI Term Insurance?") are answered from indexes
+# built once at import, with the figures exactly as the catalog states them.
+# Anything that is not a recognisable catalog fact returns None so the caller
+# can fall back to the what-if engine or the LLM.
+
+INTENTS = [
+    ("csr", re.compile(r"claim settlement|\bcsr\b|claims? ratio|settles? (?:the most )?claims")),
+    ("riders", re.compile(r"\briders?\b|add-?ons?")),
+    ("entry_age", re.compile(r"entry age|age limit|\beligib|how old|(?:min|max)(?:imum)? age|oldest|youngest")),
+    ("min_premium", re.compile(r"cheapest|minimum premium|min premium|lowest premium|least expensive|starting premium")),
+    ("waiting_period", re.compile(r"waiting period|waiting time|how long .*wait|free[- ]look")),
+]
+
+TYPE_WORDS = {
+    "term": r"term",
+    "health": r"health|medical|mediclaim",
+    "vehicle": r"vehicle|motor|car|bike|two wheeler",
+    "travel": r"travel",
+    "personal_accident": r"accident",
+}
+
+# Words that name nothing on their own ("ICICI Prudential Life Insurance" -> "icici prudential")
+GENERIC_WORDS = {"insurance", "life", "general", "india", "company", "ltd", "limited", "plan", "plans",
+                 "policy", "e", "g", "eg"}
+QUESTION_WORDS = {"what", "which", "who", "does", "do", "is", "the", "of", "for", "a", "an", "offer", "offers",
+                  "have", "has", "riders", "rider", "entry", "age", "waiting", "period", "premium", "minimum",
+                  "claim", "settlement", "ratio", "csr", "highest", "lowest", "best", "top", "my", "i", "me"}
+# Everyday words that are also the first word of an insurer's name ("max age", "star health")
+AMBIGUOUS_WORDS = {"max", "care", "star"}
+MAX_NGRAM = 6
+DEFAULT_TOP = 3
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", str(text).lower()))
+
+
+def _stated_csr(plan: Dict) -> Optional[float]:
+    """The claim settlement ratio when the catalog states one (not persistency or a placeholder)."""
+    csr = plan["csr"]
+    if csr is None or plan["csr_value"] <= 0:
+        return None
+    if isinstance(csr, str) and re.search(r"persistency|renewal|not explicitly", csr, re.IGNORECASE):
+        return None
+    return plan["csr_value"]
+
+
+def _company_aliases(company: str) -> Set[str]:
+    full = _normalize(company)
+    words = [w for w in full.split() if w not in GENERIC_WORDS]
+    aliases = {full, " ".join(w for w in full.split() if w not in {"insurance", "company", "ltd", "limited"})}
+    if words:
+        aliases.update(" ".join(words[:n]) for n in range(1, len(words) + 1))
+    return {a for a in aliases if a and a not in AMBIGUOUS_WORDS}
+
+
+def _plan_aliases(name: str) -> Set[str]:
+    aliases = {_normalize(name)}
+    # "Health Insurance (Optima Secure, Health Suraksha)", "Term Insurance Plans (e.g., ABSLI Super Term Plan)"
+    parts = [name.split("(")[0]] + re.findall(r"\(([^)]*)\)", name)[0].split(",") if "(" in name else [name]
+    for part in parts:
+        words = [w for w in _normalize(part).split() if w not in GENERIC_WORDS]
+        # "Sampoorna Raksha Supreme" is also asked about as "Sampoorna Raksha"
+        aliases.update(" ".join(words[:n]) for n in range(2, len(words) + 1))
+    return {a for a in aliases if a}
+
+
+# ----------------------------------------
+# Indexes (built once at import)
+# ----------------------------------------
+def build_indexes(plans: List[Dict]) -> Dict:
+    plans_by_company: Dict[str, List[Dict]] = {}
+    for plan in plans:
+        plans_by_company.setdefault(plan["company"], []).append(plan)
+
+    # Alias (normalized n-gram) -> company names / plan positions
+    company_alias: Dict[str, Set[str]] = {}
+    for company in plans_by_company:
+        for alias in _company_aliases(company):
+            company_alias.setdefault(alias, set()).add(company)
+    plan_alias: Dict[str, Set[int]] = {}
+    for position, plan in enumerate(plans):
+        for alias in _plan_aliases(plan["name"]) - set(company_alias):
+            plan_alias.setdefault(alias, set()).add(position)
+
+    # CSR ranking per product type ("*" is every company), best first
+    csr_ranking: Dict[str, List[Tuple[float, str]]] = {}
+    for product_type in ["*"] + list(TYPE_WORDS):
+        best: Dict[str, float] = {}
+        for plan in plans:
+            value = _stated_csr(plan)
+            if value is not None and (product_type == "*" or product_type in plan["types"]):
+                best[plan["company"]] = max(value, best.get(plan["company"], 0))
+        csr_ranking[product_type] = sorted(((v, c) for c, v in best.items()), key=lambda e: (-e[0], e[1]))
+
+    # Rider (normalized) -> plan positions, and plans with a stated minimum premium, cheapest first
+    rider_plans: Dict[str, List[int]] = {}
+    for position, plan in enumerate(plans):
+        for rider in plan.get("riders") or []:
+            rider_plans.setdefault(_normalize(rider), []).append(position)
+    by_premium = sorted((i for i, p in enumerate(plans) if p["min_premium"] > 0),
+                        key=lambda i: (plans[i]["min_premium"], plans[i]["name"]))
+
+    return {
+        "plans": plans,
+        "plans_by_company": plans_by_company,
+        "company_alias": company_alias,
+        "plan_alias": plan_alias,
+        "vocabulary": frozenset({w for alias in list(company_alias) + list(plan_alias) for w in alias.split()}),
+        "corrections": {},
+        "csr_ranking": csr_ranking,
+        "rider_plans": rider_plans,
+        "by_premium": by_premium,
+    }
+
+
+indexes = build_indexes(catalog_plans)
+
+
+# ----------------------------------------
+# Entity resolution
+# ----------------------------------------
+def _correct(word: str, index: Dict) -> str:
+    """The closest alias word for a misspelling ("alianz" -> "allianz"), cached per word."""
+    corrections = index["corrections"]
+    if word not in corrections:
+        close = get_close_matches(word, sorted(index["vocabulary"]), n=1, cutoff=0.8)
+        corrections[word] = close[0] if close else word
+    return corrections[word]
+
+
+def resolve_entities(query: str, index: Dict = None) -> Dict:
+    """Companies and plans named in the question; misspelt words are first corrected
+    against the alias vocabulary. The most specific (longest) alias match wins."""
+    index = index or indexes
+    words = [w if w in index["vocabulary"] or w in QUESTION_WORDS or len(w) < 4 else _correct(w, index)
+             for w in _normalize(query).split()]
+    for n in range(min(MAX_NGRAM, len(words)), 0, -1):
+        found = [gram for gram in (" ".join(words[i:i + n]) for i in range(len(words) - n + 1))
+                 if gram in index["company_alias"] or gram in index["plan_alias"]]
+        if found:
+            companies, plans = set(), set()
+            for alias in found:
+                companies |= index["company_alias"].get(alias, set())
+                plans |= index["plan_alias"].get(alias, set())
+            return {"companies": sorted(companies), "plans": sorted(plans)}
+    return {"companies": [], "plans": []}
+
+
+def _product_type(query: str) -> Optional[str]:
+    for product_type, pattern in TYPE_WORDS.items():
+        if re.search(rf"\b(?:{pattern})\b", query):
+            return product_type
+    return None
+
+
+def _top_n(query: str) -> int:
+    match = re.search(r"\btop\s+(\d+)\b", query)
+    return int(match.group(1)) if match else DEFAULT_TOP
+
+
+def _entity_plans(entities: Dict, index: Dict) -> List[Dict]:
+    if entities["plans"]:
+        return [index["plans"][i] for i in entities["plans"]]
+    return [plan for company in entities["companies"] for plan in index["plans_by_company"][company]]
+
+
+# ----------------------------------------
+# Formatting
+# ----------------------------------------
+def format_csr(value: float) -> str:
+    return f"{value:g}%"
+
+
+def format_age_range(age_range: Tuple[float, float]) -> str:
+    low, high = age_range
+    if low == -INF and high == INF:
+        return "not stated in the catalog"
+    if high == INF:
+        return f"{low:g}+ years"
+    if low == -INF:
+        return f"up to {high:g} years"
+    return f"{low:g}–{high:g} years"
+
+
+def _waiting_text(waiting) -> str:
+    if not waiting:
+        return "no waiting period listed"
+    if isinstance(waiting, dict):
+        return "; ".join(f"{k.replace('_', ' ')}: {v}" for k, v in waiting.items())
+    return str(waiting)
+
+
+def _join(lines: List[str]) -> str:
+    return "\n".join(f"- {line}" for line in lines)
+
+
+# ----------------------------------------
+# Intent handlers
+# ----------------------------------------
+def _answer_csr(query, entities, index):
+    if entities["companies"] or entities["plans"]:
+        companies = sorted({p["company"] for p in _entity_plans(entities, index)})
+        lines = []
+        for company in companies:
+            value = _stated_csr(index["plans_by_company"][company][0])
+            raw = index["plans_by_company"][company][0]["csr"]
+            lines.append(f"{company}: {format_csr(value)}" if value is not None
+                         else f"{company}: no claim settlement ratio stated ({raw or 'not listed'})")
+        return "Claim settlement ratio:\n" + _join(lines)
+
+    product_type = _product_type(query) or "*"
+    ranking = index["csr_ranking"][product_type]
+    if re.search(r"lowest|worst|least", query):
+        ranking = ranking[::-1]
+    ranking = ranking[:_top_n(query)]
+    if not ranking:
+        return None
+    best_value, best_company = ranking[0]
+    scope = "" if product_type == "*" else f" among {product_type.replace('_', ' ')} insurers"
+    extreme = "lowest" if re.search(r"lowest|worst|least", query) else "highest"
+    tied = [c for v, c in index["csr_ranking"][product_type] if v == best_value and c != best_company]
+    answer = f"{best_company} has the {extreme} claim settlement ratio{scope}: {format_csr(best_value)}"
+    answer += f" (tied with {', '.join(tied)})." if tied else "."
+    return answer + "\n" + _join(f"{c}: {format_csr(v)}" for v, c in ranking)
+
+
+def _answer_riders(query, entities, index):
+    if entities["companies"] or entities["plans"]:
+        lines = [f"{p['name']} ({p['company']}): {', '.join(p['riders']) if p['riders'] else 'no riders listed'}"
+                 for p in _entity_plans(entities, index)]
+        return "Riders listed in the catalog:\n" + _join(lines)
+
+    # "Which plans offer a zero depreciation rider?"
+    q = _normalize(query)
+    riders = [r for r in index["rider_plans"] if r in q]
+    if not riders or not re.search(r"\b(?:which|who)\b", query):
+        return None
+    rider = max(riders, key=len)
+    plans = [index["plans"][i] for i in index["rider_plans"][rider]]
+    return f"Plans offering a {rider} rider:\n" + _join(f"{p['name']} ({p['company']})" for p in plans)
+
+
+def _answer_entry_age(query, entities, index):
+    if not (entities["companies"] or entities["plans"]):
+        return None
+    lines = [f"{p['name']} ({p['company']}): {format_age_range(p['age_range'])}"
+             for p in _entity_plans(entities, index)]
+    return "Entry age:\n" + _join(lines)
+
+
+def _answer_min_premium(query, entities, index):
+    if entities["companies"] or entities["plans"]:
+        lines = [f"{p['name']} ({p['company']}): "
+                 + (f"from {format_inr(int(p['min_premium']))}/year" if p["min_premium"] > 0 else "not listed")
+                 for p in _entity_plans(entities, index)]
+        return "Minimum premium:\n" + _join(lines)
+
+    product_type = _product_type(query)
+    ranked = [index["plans"][i] for i in index["by_premium"]
+              if product_type is None or product_type in index["plans"][i]["types"]][:_top_n(query)]
+    if not ranked:
+        return None
+    scope = f"{product_type.replace('_', ' ')} plans" if product_type else "plans"
+    return (f"Cheapest {scope} by listed minimum premium:\n"
+            + _join(f"{p['name']} ({p['company']}): from {format_inr(int(p['min_premium']))}/year" for p in ranked))
+
+
+def _answer_waiting_period(query, entities, index):
+    if not (entities["companies"] or entities["plans"]):
+        return None
+    lines = [f"{p['name']} ({p['company']}): {_waiting_text(p.get('waiting_period'))}"
+             for p in _entity_plans(entities, index)]
+    return "Waiting periods:\n" + _join(lines)
+
+
+HANDLERS = {
+    "csr": _answer_csr,
+    "riders": _answer_riders,
+    "entry_age": _answer_entry_age,
+    "min_premium": _answer_min_premium,
+    "waiting_period": _answer_waiting_period,
+}
+
+
+def detect_intent(query: str) -> Optional[str]:
+    q = query.lower()
+    if re.match(r"\s*what if\b", q):
+        return None  # scenario questions, even when they mention a rider or premium
+    return next((intent for intent, pattern in INTENTS if pattern.search(q)), None)
+
+
+def answer_catalog_question(query: str, index: Dict = None) -> Optional[Dict]:
+    """Answer a factual catalog question from the indexes, or return None."""
+    index = index or indexes
+    intent = detect_intent(query)
+    if intent is None:
+        return None
+    entities = resolve_entities(query, index)
+    answer = HANDLERS[intent](query.lower(), entities, index)
+    if answer is None:
+        return None
+    return {"intent": intent, "entities": entities, "answer": answer}
@@ -0,0 +1,72 @@
+from typing import Dict
+
+# ----------------------------------------
+# Pure chart-data layer shared by the matplotlib renderers in tools.py and the
+# browser-side charts in app.py: labels, clamping and colour bands, no drawing.
+# ----------------------------------------
+ADEQUACY_CLAMP_PCT = 120
+
+
+def format_inr_short(amount) -> str:
+    """₹ label with Cr/L suffixes, e.g. ₹1.5Cr, ₹12.0L, ₹45,000."""
+    if amount >= 10000000:  # 1 crore
+        return f"₹{amount/10000000:.1f}Cr"
+    elif amount >= 100000:  # 1 lakh
+        return f"₹{amount/100000:.1f}L"
+    else:
+        return f"₹{amount:,}"
+
+
+def affordability_chart_data(term_premium: int, health_premium: int, monthly_income: int) -> Dict:
+    """Premium split vs remaining income (zero slices dropped)."""
+    remaining_income = max(monthly_income - (term_premium + health_premium), 0)
+    slices = [
+        ("Remaining Income", remaining_income, '#4caf50'),
+        ("Term Insurance", term_premium, '#f44336'),
+        ("Health Insurance", health_premium, '#2196f3'),
+    ]
+    slices = [s for s in slices if s[1] > 0]
+    total = sum(s[1] for s in slices)
+    return {
+        "title": "Premium vs Monthly Income",
+        "labels": [s[0] for s in slices],
+        "values": [s[1] for s in slices],
+        "colors": [s[2] for s in slices],
+        "percentages": [round(s[1] / total * 100, 1) for s in slices] if total else [],
+    }
+
+
+def coverage_vs_income_chart_data(term_coverage: int, health_coverage: int, monthly_income: int) -> Dict:
+    """Coverage bars against the annual-income reference line."""
+    coverage_values = [term_coverage, health_coverage]
+    income_value = monthly_income * 12  # Annual income
+    return {
+        "title": "Insurance Coverage vs Annual Income",
+        "labels": ['Term Insurance', 'Health Insurance'],
+        "values": coverage_values,
+        "colors": ['#4caf50', '#2196f3'],
+        "value_labels": [format_inr_short(v) for v in coverage_values],
+        "annual_income": income_value,
+        "income_label": f"Annual Income ({format_inr_short(income_value)})",
+        "y_max": max(max(coverage_values), income_value) * 1.3,
+    }
+
+
+def adequacy_color(adequacy: float) -> str:
+    return "green" if adequacy >= 100 else "orange" if adequacy >= 50 else "red"
+
+
+def coverage_adequacy_data(actual_coverage: int, annual_income: int, multiplier: int = 10) -> Dict:
+    """Adequacy percentage vs annual_income × multiplier, clamped to 0–120% for display."""
+    recommended = annual_income * multiplier
+    adequacy = (actual_coverage / recommended) * 100 if recommended > 0 else 0
+    adequacy = min(adequacy, ADEQUACY_CLAMP_PCT)
+    return {
+        "title": "Insurance Coverage Adequacy Assessment",
+        "adequacy_pct": adequacy,
+        "color": adequacy_color(adequacy),
+        "label": f"{adequacy:.1f}%",
+        "coverage_text": f"Current: {format_inr_short(actual_coverage)}",
+        "recommended_text": f"Recommended: {format_inr_short(recommended)}",
+        "recommended": recommended,
+    }
@@ -0,0 +1,161 @@
+import time
+from typing import Dict, Optional, Set
+
+# ----------------------------------------
+# Incremental re-recommendation
+# ----------------------------------------
+# When an advisor edits one form field, only the outputs that depend on it are
+# recomputed; everything else is copied from the previous result. Affected
+# sections are re-derived with the rules engine, so an edit never waits for
+# the LLM. On an LLM result only their coverages, premiums and the
+# affordability check are replaced (as similarity.rederive does): the LLM's
+# reasons and add-ons stay, minus sentences quoting the old figures. Fields
+# only the LLM interprets (marital status, employment, existing policies,
+# property, travel) need a full run when the previous result came from the
+# LLM, because the rules engine cannot redo what they changed. An LLM result
+# edited this way is marked served_by="mixed": LLM advice with rules-engine
+# figures for the edited sections.
+
+# Form field -> outputs it feeds directly (mirrors rules.compute_rule_figures and the matcher)
+FIELD_EFFECTS = {
+    "age": {"term_insurance", "health_insurance", "vehicle_insurance", "personal_accident_cover", "eligibility"},
+    "income": {"term_insurance", "premium_budget",
+               "chart:affordability", "chart:coverage_vs_income", "chart:coverage_adequacy"},
+    "dependents": {"term_insurance", "health_insurance"},
+    "vehicle": {"vehicle_insurance"},
+    "health_conditions": {"term_insurance", "health_insurance"},
+}
+LLM_ONLY_FIELDS = {"marital_status", "employment", "existing_insurance", "owns_property", "frequent_traveler"}
+
+# Output -> outputs computed from it ("products:*" is every matched category)
+DERIVES = {
+    "term_insurance": {"products:term", "premium_affordability_check", "explanation",
+                       "chart:affordability", "chart:coverage_vs_income", "chart:coverage_adequacy"},
+    "health_insurance": {"products:health", "premium_affordability_check",
+                         "chart:affordability", "chart:coverage_vs_income", "chart:coverage_adequacy"},
+    "vehicle_insurance": {"products:vehicle", "premium_affordability_check"},
+    "personal_accident_cover": {"products:personal_accident", "premium_affordability_check"},
+    "eligibility": {"products:*"},
+    "premium_budget": {"products:*"},
+}
+RULE_SECTIONS = ["term_insurance", "health_insurance", "vehicle_insurance", "personal_accident_cover",
+                 "premium_affordability_check"]
+
+# Chart node -> (chart_data key, tip key, rendered image key)
+CHARTS = {
+    "chart:affordability": ("affordability", "affordability_tip", "chart_path"),
+    "chart:coverage_vs_income": ("coverage_vs_income", "coverage_tip", "coverage_chart_path"),
+    "chart:coverage_adequacy": ("coverage_adequacy", "adequacy_tip", "coverage_adequacy"),
+}
+
+
+def changed_fields(old_profile: Dict, new_profile: Dict) -> Set[str]:
+    return {k for k in set(old_profile) | set(new_profile) if old_profile.get(k) != new_profile.get(k)}
+
+
+def affected_outputs(fields: Set[str]) -> Set[str]:
+    """Everything downstream of the changed fields in the dependency graph."""
+    pending = [node for field in fields for node in FIELD_EFFECTS.get(field, ())]
+    affected = set()
+    while pending:
+        node = pending.pop()
+        if node not in affected:
+            affected.add(node)
+            pending.extend(DERIVES.get(node, ()))
+    return affected
+
+
+def update_recommendation(previous: Dict, old_profile: Dict, new_profile: Dict,
+                          render_charts: bool = False) -> Optional[Dict]:
+    """A get_recommendation-shaped result for `new_profile`, recomputing only what the
+    edit affects. Returns None when a full run is needed."""
+    from matching import RECOMMENDATION_CATEGORIES, match_products, recommendation_requirements
+    from profiles import build_profile_text
+    from rules import calculate_insurance_recommendations
+    from tools import recommendation_insights
+
+    started = time.perf_counter()
+    fields = changed_fields(old_profile, new_profile)
+    from_llm = previous.get("served_by") != "rules_engine"
+    if "error" in previous or (from_llm and fields & LLM_ONLY_FIELDS):
+        return None
+    if (previous.get("chart_data") is None) != render_charts:
+        return None  # switched between browser-drawn and rendered charts
+    affected = affected_outputs(fields)
+    profile_text = build_profile_text(new_profile)
+    result = dict(previous, token_usage=None, json_repairs=[], save_path=None)
+
+    sections = [name for name in RULE_SECTIONS if name in affected]
+    if sections:
+        rules = calculate_insurance_recommendations(profile_text)
+        update = {name: getattr(rules, name) for name in sections}
+        if from_llm:
+            update = {name: _with_amounts(getattr(previous["recommendation"], name), section)
+                      for name, section in update.items()}
+            result["served_by"] = "mixed"
+        result["recommendation"] = previous["recommendation"].model_copy(update=update)
+    recommendation = result["recommendation"]
+
+    # Matches: re-run the matcher for affected categories only, drop sections that disappeared
+    types = {node.split(":", 1)[1] for node in affected if node.startswith("products:")}
+    requirements = recommendation_requirements(recommendation, profile_text)
+    if "*" not in types:
+        requirements = {t: reqs for t, reqs in requirements.items() if t in types}
+    display = {product_type: label for product_type, label in RECOMMENDATION_CATEGORIES.values()}
+    section_of = {label: field for field, (_, label) in RECOMMENDATION_CATEGORIES.items()}
+    products = {label: found for label, found in previous["products"].items()
+                if getattr(recommendation, section_of[label], None) is not None}
+    for product_type, found in match_products(requirements).items():
+        if found:
+            products[display[product_type]] = found
+        else:
+            products.pop(display[product_type], None)
+    order = list(section_of)
+    result["products"] = dict(sorted(products.items(), key=lambda item: order.index(item[0])))
+
+    # Charts, tips and explanation
+    if affected & (set(CHARTS) | {"explanation"}):
+        insights = recommendation_insights(recommendation, profile_text)
+        if "explanation" in affected:
+            result["explanation"] = insights["explanation"]
+        chart_data = dict(previous.get("chart_data") or {})
+        for node, (data_key, tip_key, image_key) in CHARTS.items():
+            if node not in affected:
+                continue
+            result[tip_key] = insights[tip_key]
+            if render_charts:
+                result[image_key] = _render(data_key, insights["figures"])
+            else:
+                chart_data[data_key] = insights["chart_data"][data_key]
+        if not render_charts:
+            result["chart_data"] = chart_data
+
+    result["incremental"] = {
+        "changed_fields": sorted(fields),
+        "recomputed": sorted(affected),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+    return result
+
+
+def _with_amounts(stored, fresh):
+    """An LLM section (or the affordability check) with the rules engine's amounts;
+    sections the edit added or removed are taken from the rules engine."""
+    from similarity import without_figures
+
+    if stored is None or fresh is None or isinstance(fresh, str):
+        return fresh
+    return stored.model_copy(update={"coverage_inr": fresh.coverage_inr,
+                                     "annual_premium_inr": fresh.annual_premium_inr,
+                                     "reason": without_figures(stored.reason) or fresh.reason})
+
+
+def _render(data_key: str, figures) -> str:
+    from tools import visualize_affordability_chart, visualize_coverage_adequacy, visualize_coverage_vs_income_chart
+
+    term_val, health_val, term_coverage, health_coverage, income = figures
+    if data_key == "affordability":
+        return visualize_affordability_chart(term_val, health_val, income)
+    if data_key == "coverage_vs_income":
+        return visualize_coverage_vs_income_chart(term_coverage, health_coverage, income)
+    return visualize_coverage_adequacy(term_coverage + health_coverage, income * 12)
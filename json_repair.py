@@ -0,0 +1,230 @@
+import json
+import re
+from typing import List, Optional, Tuple
+
+# ----------------------------------------
+# Tolerant JSON extraction for LLM output
+# ----------------------------------------
+# Finds the first JSON object in a response and repairs the defects Gemini
+# produces most often: markdown fences, prose around the object, trailing
+# commas, single quotes, Python literals, raw newlines in strings and
+# truncation (unterminated strings / arrays / objects). Every fix applied is
+# reported so callers can log how often repairs are needed.
+
+FENCE_RE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.S)
+LITERALS = {"True": "true", "False": "false", "None": "null"}
+CLOSERS = {"{": "}", "[": "]"}
+
+
+def _strip_fences(text: str, repairs: List[str]) -> str:
+    match = FENCE_RE.search(text)
+    if match and "{" in match.group(1):
+        repairs.append("stripped_code_fence")
+        return match.group(1)
+    return text
+
+
+def _normalize(text: str, repairs: List[str]):
+    """Rewrite one JSON-ish object into strict JSON.
+
+    Returns (json_text, safe_text): `safe_text` is the output cut back to the
+    last complete value and closed, used when closing a truncated value in
+    place is not enough.
+    """
+    out = []
+    stack = []
+    safe_len, safe_stack = 0, []
+    i, n = 0, len(text)
+    fixes = set()
+
+    def mark_safe():
+        nonlocal safe_len, safe_stack
+        safe_len, safe_stack = len(out), list(stack)
+
+    while i < n:
+        ch = text[i]
+        if ch in "\"'":
+            is_key = _in_key_position(out, stack)
+            quote = ch
+            if quote == "'":
+                fixes.add("single_quotes")
+            buf = ['"']
+            i += 1
+            closed = False
+            while i < n:
+                c = text[i]
+                if c == "\\" and i + 1 < n:
+                    nxt = text[i + 1]
+                    # \' is not a valid JSON escape
+                    buf.append("'" if nxt == "'" else c + nxt)
+                    i += 2
+                    continue
+                if c == quote:
+                    closed = True
+                    i += 1
+                    break
+                if c == '"':
+                    buf.append('\\"')
+                elif c == "\n":
+                    fixes.add("escaped_control_chars")
+                    buf.append("\\n")
+                elif c in "\r\t":
+                    fixes.add("escaped_control_chars")
+                    buf.append("\\r" if c == "\r" else "\\t")
+                else:
+                    buf.append(c)
+                i += 1
+            if not closed:
+                fixes.add("closed_string")
+            out.append("".join(buf) + '"')
+            if closed and stack and not is_key:
+                mark_safe()
+            continue
+
+        if ch in "{[":
+            stack.append(ch)
+            out.append(ch)
+            # An empty container is a valid place to cut back to
+            mark_safe()
+        elif ch in "}]":
+            # Drop trailing commas before a closer
+            j = len(out) - 1
+            while j >= 0 and out[j].isspace():
+                j -= 1
+            if j >= 0 and out[j] == ",":
+                fixes.add("trailing_commas")
+                del out[j]
+            if stack:
+                stack.pop()
+            out.append(ch)
+            mark_safe()
+            if not stack:
+                i += 1
+                break
+        elif ch.isalpha():
+            m = re.match(r"[A-Za-z_]+", text[i:])
+            word = m.group(0)
+            if word in LITERALS:
+                fixes.add("python_literals")
+                word = LITERALS[word]
+            elif i + len(word) == n:
+                # Truncated inside a literal, e.g. "nul"
+                full = next((lit for lit in ("true", "false", "null") if lit.startswith(word)), None)
+                if full:
+                    fixes.add("completed_literal")
+                    word = full
+            out.append(word)
+            i += len(m.group(0))
+            if word in ("true", "false", "null"):
+                mark_safe()
+            continue
+        elif ch.isdigit() or ch == "-":
+            m = re.match(r"-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?", text[i:])
+            if m:
+                out.append(m.group(0))
+                i += len(m.group(0))
+                if i < n:
+                    mark_safe()
+                continue
+            out.append(ch)
+        else:
+            out.append(ch)
+        i += 1
+
+    repairs.extend(sorted(fixes))
+    closing = "".join(CLOSERS[c] for c in reversed(stack))
+    body = "".join(out).rstrip()
+    if closing:
+        repairs.append("closed_brackets")
+        body = body.rstrip(",").rstrip()
+        if body.endswith(":"):
+            body += " null"
+    safe = "".join(out[:safe_len]).rstrip().rstrip(",") + "".join(CLOSERS[c] for c in reversed(safe_stack))
+    return body + closing, safe, i
+
+
+def _in_key_position(out: List[str], stack: List[str]) -> bool:
+    """True if a string starting now is an object key (directly after '{' or ',')."""
+    if not stack or stack[-1] != "{":
+        return False
+    for token in reversed(out):
+        if not token.isspace():
+            return token in "{,"
+    return False
+
+
+def extract_json(text: str) -> Tuple[Optional[dict], List[str]]:
+    """Return (first JSON object found in `text`, list of repairs applied)."""
+    repairs: List[str] = []
+    if not text:
+        return None, repairs
+
+    text = _strip_fences(text, repairs)
+    start = text.find("{")
+    if start == -1:
+        return None, repairs
+    if text[:start].strip():
+        repairs.append("removed_leading_text")
+
+    # Fast path: the object is already valid JSON
+    try:
+        obj, end = json.JSONDecoder().raw_decode(text, start)
+        if text[end:].strip():
+            repairs.append("removed_trailing_text")
+        return obj, repairs
+    except json.JSONDecodeError:
+        pass
+
+    body, safe, end = _normalize(text[start:], repairs)
+    if text[start + end:].strip():
+        repairs.append("removed_trailing_text")
+    for candidate in (body, safe):
+        try:
+            obj = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if candidate is safe:
+            repairs.append("dropped_incomplete_value")
+        return obj, repairs
+    return None, repairs
+
+
+def fill_missing_sections(data: dict, model, repairs: Optional[List[str]] = None) -> dict:
+    """Default missing optional fields of a Pydantic model and null out broken optional sections.
+
+    An optional nested section (e.g. vehicle_insurance) that is missing required
+    keys - typically because the response was truncated inside it - is set to None.
+    """
+    repairs = repairs if repairs is not None else []
+    data = dict(data)
+    for name, field in model.model_fields.items():
+        if name not in data:
+            if not field.is_required():
+                data[name] = field.get_default(call_default_factory=True)
+                repairs.append(f"defaulted_{name}")
+            continue
+        value = data[name]
+        nested = _nested_model(field.annotation)
+        if nested is not None and isinstance(value, dict):
+            missing = [k for k, f in nested.model_fields.items() if f.is_required() and not _present(value, k, f)]
+            if missing and not field.is_required():
+                data[name] = None
+                repairs.append(f"dropped_incomplete_{name}")
+            else:
+                data[name] = fill_missing_sections(value, nested, repairs)
+    return data
+
+
+def _present(data: dict, name: str, field) -> bool:
+    """Is the field given under its name or any of its validation aliases?"""
+    alias = field.validation_alias
+    names = [name] + ([alias] if isinstance(alias, str) else [c for c in getattr(alias, "choices", []) if isinstance(c, str)])
+    return any(data.get(n) is not None for n in names)
+
+
+def _nested_model(annotation):
+    candidates = getattr(annotation, "__args__", None) or (annotation,)
+    for candidate in candidates:
+        if isinstance(candidate, type) and hasattr(candidate, "model_fields"):
+            return candidate
+    return None
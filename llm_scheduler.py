@@ -0,0 +1,209 @@
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+# ----------------------------------------
+# Quota-aware priority scheduler for outbound LLM calls
+# ----------------------------------------
+# Every Gemini call takes a slot first. Slots are granted in priority order
+# (interactive > what-if > batch) and only when both token buckets - requests
+# per minute and tokens per minute - can cover the call and fewer than
+# max_concurrency calls are in flight, so the provider's quota is never
+# exceeded and batch work cannot starve live users.
+#
+# Admission control: a call is refused with Overloaded (and the caller
+# degrades, e.g. to the rules engine) when the queue is full, when the queue
+# is deeper than its class's shed depth, or when it waited past its class's
+# timeout. snapshot() exposes queue and limiter state for monitoring.
+#
+#   LLM_RPM / LLM_TPM                   quota (default 60 / 250000)
+#   LLM_MAX_CONCURRENCY                 calls in flight at once (default 8)
+#   LLM_MAX_QUEUE                       hard queue limit (default 200)
+#   LLM_SHED_WHAT_IF_DEPTH / _BATCH_    shed what-if / batch beyond this depth (default 40 / 10)
+
+INTERACTIVE, WHAT_IF, BATCH = 0, 1, 2
+CLASS_NAMES = {INTERACTIVE: "interactive", WHAT_IF: "what_if", BATCH: "batch"}
+# Longest a call of each class may wait for a slot (None: no limit)
+DEFAULT_TIMEOUTS = {INTERACTIVE: 60.0, WHAT_IF: 30.0, BATCH: None}
+
+
+class Overloaded(Exception):
+    """The scheduler refused the call; degrade or retry later."""
+
+
+class TokenBucket:
+    """`limit` units per minute, refilled continuously, with a burst of one minute's worth."""
+
+    def __init__(self, limit_per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(limit_per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float):
+        """Charge (positive) or refund (negative) after the real usage is known; may go into debt."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class Ticket:
+    def __init__(self, scheduler: "LLMScheduler", priority: int, estimated_tokens: int):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.estimated_tokens = estimated_tokens
+        self.settled = False
+
+    def settle(self, actual_tokens: Optional[int]):
+        """Correct the TPM bucket with the provider-reported token count."""
+        if actual_tokens is not None and not self.settled:
+            self.settled = True
+            with self.scheduler._cond:
+                self.scheduler.tpm.adjust(actual_tokens - self.estimated_tokens)
+                self.scheduler._cond.notify_all()
+
+
+class LLMScheduler:
+    def __init__(self, rpm: float = 60, tpm: float = 250000, max_queue: int = 200, max_concurrency: int = 8,
+                 shed_depth: Optional[Dict[int, Optional[int]]] = None,
+                 timeouts: Optional[Dict[int, Optional[float]]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rpm = TokenBucket(rpm, clock)
+        self.tpm = TokenBucket(tpm, clock)
+        self.max_queue = max_queue
+        self.max_concurrency = max_concurrency
+        self.shed_depth = shed_depth or {INTERACTIVE: None, WHAT_IF: 40, BATCH: 10}
+        self.timeouts = timeouts or dict(DEFAULT_TIMEOUTS)
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._seq = itertools.count()
+        self.in_flight = 0
+        self.counters = {name: {"admitted": 0, "shed": 0, "timed_out": 0} for name in CLASS_NAMES.values()}
+
+    def _shed(self, priority: int, depth: int) -> bool:
+        limit = self.shed_depth.get(priority)
+        return depth >= self.max_queue or (limit is not None and depth >= limit)
+
+    def acquire(self, priority: int, estimated_tokens: int) -> Ticket:
+        counters = self.counters[CLASS_NAMES[priority]]
+        with self._cond:
+            if self._shed(priority, len(self._waiting)):
+                counters["shed"] += 1
+                raise Overloaded(f"LLM queue depth {len(self._waiting)}: {CLASS_NAMES[priority]} call shed")
+            entry = (priority, next(self._seq))
+            heapq.heappush(self._waiting, entry)
+            timeout = self.timeouts.get(priority)
+            deadline = None if timeout is None else self.clock() + timeout
+            try:
+                while True:
+                    delay = None
+                    # At the concurrency cap the head waits for a release (which notifies)
+                    if self._waiting[0] == entry and self.in_flight < self.max_concurrency:
+                        delay = max(self.rpm.wait_time(1), self.tpm.wait_time(estimated_tokens))
+                        if delay == 0:
+                            heapq.heappop(self._waiting)
+                            self.rpm.take(1)
+                            self.tpm.take(estimated_tokens)
+                            self.in_flight += 1
+                            counters["admitted"] += 1
+                            self._cond.notify_all()
+                            return Ticket(self, priority, estimated_tokens)
+                    if deadline is not None:
+                        remaining = deadline - self.clock()
+                        if remaining <= 0:
+                            counters["timed_out"] += 1
+                            raise Overloaded(f"{CLASS_NAMES[priority]} call waited {timeout:.0f}s for LLM quota")
+                        delay = remaining if delay is None else min(delay, remaining)
+                    self._cond.wait(delay)
+            except BaseException:
+                if entry in self._waiting:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    self._cond.notify_all()
+                raise
+
+    def release(self, ticket: Ticket):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority: int, estimated_tokens: int):
+        ticket = self.acquire(priority, estimated_tokens)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def snapshot(self) -> Dict:
+        with self._cond:
+            queued = {name: 0 for name in CLASS_NAMES.values()}
+            for priority, _ in self._waiting:
+                queued[CLASS_NAMES[priority]] += 1
+            self.rpm._refill()
+            self.tpm._refill()
+            return {
+                "queued": queued,
+                "queue_depth": len(self._waiting),
+                "in_flight": self.in_flight,
+                "max_concurrency": self.max_concurrency,
+                "rpm": {"limit": self.rpm.capacity, "available": round(self.rpm.tokens, 2)},
+                "tpm": {"limit": self.tpm.capacity, "available": round(self.tpm.tokens)},
+                "counters": {name: dict(c) for name, c in self.counters.items()},
+            }
+
+# ----------------------------------------
+# Call-site helpers
+# ----------------------------------------
+_priority = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: int):
+    """Run the enclosed calls in a priority class (e.g. BATCH for batch jobs)."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority(default: int = INTERACTIVE) -> int:
+    """The caller's class, never more urgent than `default` for this call type."""
+    return max(_priority.get(), default)
+
+
+def estimate_tokens(text: str, completion_tokens: int = 0) -> int:
+    # ~4 characters per token is close enough for admission decisions
+    return len(text) // 4 + completion_tokens
+
+
+scheduler = LLMScheduler(
+    rpm=float(os.getenv("LLM_RPM", "60")),
+    tpm=float(os.getenv("LLM_TPM", "250000")),
+    max_queue=int(os.getenv("LLM_MAX_QUEUE", "200")),
+    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+    shed_depth={INTERACTIVE: None,
+                WHAT_IF: int(os.getenv("LLM_SHED_WHAT_IF_DEPTH", "40")),
+                BATCH: int(os.getenv("LLM_SHED_BATCH_DEPTH", "10"))},
+)
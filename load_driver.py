@@ -0,0 +1,144 @@
+import argparse
+import json
+import resource
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from profiles import build_profile_text, generate_profiles, load_distributions
+
+# ----------------------------------------
+# Targets: each takes a profile-form dict and runs one unit of work.
+# Only the pipeline target imports main (and so needs GEMINI_API_KEY).
+# ----------------------------------------
+def _rules_target():
+    from rules import calculate_insurance_recommendations
+
+    def run(profile):
+        return calculate_insurance_recommendations(build_profile_text(profile))
+    return run
+
+
+def _matcher_target():
+    from matching import match_recommendation_products
+    from rules import calculate_insurance_recommendations
+
+    def run(profile):
+        # Requirements come from the rules engine; only the matcher is timed.
+        profile_text = build_profile_text(profile)
+        rec = calculate_insurance_recommendations(profile_text)
+        start = time.perf_counter()
+        match_recommendation_products(rec, profile_text)
+        return time.perf_counter() - start
+    return run
+
+
+def _pipeline_target():
+    from main import get_recommendation
+
+    def run(profile):
+        # Time the pipeline only: no chart PNGs or insurance_output.txt per profile
+        result = get_recommendation(build_profile_text(profile), render_charts=False, save_output=False)
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        return result
+    return run
+
+
+TARGETS = {
+    "rules": _rules_target,
+    "matcher": _matcher_target,
+    "pipeline": _pipeline_target,
+}
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def drive(mode: str, profiles, rate: float = 0, workers: int = 1, report_every: int = 0):
+    """Push profiles through a target at `rate` per second (0 = as fast as possible)."""
+    run = TARGETS[mode]()
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    in_flight = threading.BoundedSemaphore(workers * 2)
+
+    def timed(profile):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            value = run(profile)
+            # The matcher target reports its own timing, excluding setup work
+            elapsed = value if mode == "matcher" else time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+        except Exception:
+            with lock:
+                errors += 1
+        finally:
+            in_flight.release()
+
+    started = time.perf_counter()
+    sent = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for profile in profiles:
+            if rate > 0:
+                delay = started + sent / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            in_flight.acquire()
+            pool.submit(timed, profile)
+            sent += 1
+            if report_every and sent % report_every == 0:
+                elapsed = time.perf_counter() - started
+                print(f"... {sent} sent, {sent / elapsed:.1f}/s, peak RSS {peak_rss_mb():.1f} MB", flush=True)
+    duration = time.perf_counter() - started
+
+    lat_ms = np.array(latencies) * 1000
+    percentiles = (
+        dict(zip(["p50", "p90", "p95", "p99"], np.percentile(lat_ms, [50, 90, 95, 99]).round(3).tolist()))
+        if len(lat_ms) else {}
+    )
+    return {
+        "mode": mode,
+        "requests": sent,
+        "completed": len(latencies),
+        "errors": errors,
+        "duration_s": round(duration, 3),
+        "throughput_per_s": round(sent / duration, 1) if duration > 0 else 0,
+        "latency_ms": {**percentiles, "max": round(float(lat_ms.max()), 3) if len(lat_ms) else None},
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Drive synthetic profiles through the recommender.")
+    ap.add_argument("--mode", choices=sorted(TARGETS), default="rules")
+    ap.add_argument("--count", type=int, default=10000)
+    ap.add_argument("--rate", type=float, default=0, help="target requests/second (0 = unthrottled)")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--distributions", help="JSON file overriding profile distributions")
+    ap.add_argument("--report-every", type=int, default=0)
+    ap.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = ap.parse_args(argv)
+
+    profiles = generate_profiles(args.count, args.seed, load_distributions(args.distributions))
+    summary = drive(args.mode, profiles, args.rate, args.workers, args.report_every)
+
+    if args.json:
+        print(json.dumps(summary))
+    else:
+        print(f"Mode: {summary['mode']}")
+        print(f"Requests: {summary['requests']} ({summary['completed']} ok, {summary['errors']} errors)")
+        print(f"Throughput: {summary['throughput_per_s']}/s over {summary['duration_s']}s")
+        print("Latency (ms): " + ", ".join(f"{k}={v}" for k, v in summary["latency_ms"].items()))
+        print(f"Peak RSS: {summary['peak_rss_mb']} MB")
+
+
+if __name__ == "__main__":
+    main()
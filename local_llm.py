@@ -0,0 +1,166 @@
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+# ----------------------------------------
+# Offline inference with llama-cpp
+# ----------------------------------------
+# One model per process, loaded lazily behind a lock and shared by every
+# thread. Access is serialized: requests go through a queue and a single
+# worker thread runs them one after another on the model (llama-cpp-python's
+# high-level API evaluates one sequence at a time), so callers never contend
+# for it and the constant system prompt stays in the prefix cache between
+# requests. The worker takes whatever is already queued, up to
+# LOCAL_LLM_MAX_BATCH, without waiting for more. JSON requests are
+# constrained by a grammar compiled once from the Pydantic schema, so output
+# parses first time.
+#
+#   LLM_BACKEND=local          select this path in main.py
+#   LOCAL_MODEL_PATH           GGUF file
+#   LOCAL_LLM_THREADS          CPU threads (default: all cores)
+#   LOCAL_LLM_N_CTX            context size (default 4096)
+#   LOCAL_LLM_MAX_BATCH        queued requests taken per pass (default 8)
+
+DEFAULT_N_CTX = 4096
+DEFAULT_MAX_TOKENS = 1024
+
+
+def local_backend_enabled() -> bool:
+    return os.getenv("LLM_BACKEND", "gemini").lower() == "local"
+
+
+class LlamaCppBackend:
+    """Runs chat requests sequentially on one llama-cpp model."""
+
+    def __init__(self, model_path: str, n_threads: Optional[int] = None, n_ctx: int = DEFAULT_N_CTX):
+        try:
+            from llama_cpp import Llama, LlamaRAMCache
+        except ImportError:
+            raise RuntimeError("Local inference needs llama-cpp-python (pip install llama-cpp-python)")
+        if not model_path or not os.path.exists(model_path):
+            raise RuntimeError(f"LOCAL_MODEL_PATH does not point to a model file: {model_path!r}")
+        self.model = Llama(model_path=model_path, n_threads=n_threads, n_ctx=n_ctx, verbose=False)
+        # Keeps the KV state of the shared system prompt between requests
+        self.model.set_cache(LlamaRAMCache())
+        self._grammars = {}
+
+    def _grammar(self, schema: str):
+        if schema not in self._grammars:
+            from llama_cpp import LlamaGrammar
+            self._grammars[schema] = LlamaGrammar.from_json_schema(schema, verbose=False)
+        return self._grammars[schema]
+
+    def generate(self, requests: List[Dict]) -> List[Dict]:
+        results = []
+        for req in requests:
+            response = self.model.create_chat_completion(
+                messages=req["messages"],
+                grammar=self._grammar(req["schema"]) if req.get("schema") else None,
+                max_tokens=req.get("max_tokens", DEFAULT_MAX_TOKENS),
+                temperature=req.get("temperature", 0.2),
+            )
+            usage = response.get("usage", {})
+            results.append({
+                "text": response["choices"][0]["message"]["content"],
+                "prompt_tokens": usage.get("prompt_tokens"),
+                "completion_tokens": usage.get("completion_tokens"),
+            })
+        return results
+
+
+class StaticBackend:
+    """Test double: answers from `responses` (a callable or a fixed string) and records batch sizes."""
+
+    def __init__(self, responses="{}", delay: float = 0.0):
+        self.responses = responses
+        self.delay = delay
+        self.batches: List[int] = []
+
+    def generate(self, requests: List[Dict]) -> List[Dict]:
+        self.batches.append(len(requests))
+        time.sleep(self.delay)
+        return [{"text": self.responses(req) if callable(self.responses) else self.responses,
+                 "prompt_tokens": None, "completion_tokens": None} for req in requests]
+
+
+class LocalLLM:
+    """Serializing front end over a backend; submit from any thread."""
+
+    def __init__(self, backend, max_batch: int = 8):
+        self.backend = backend
+        self.max_batch = max_batch
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="local-llm", daemon=True)
+        self._worker.start()
+
+    def submit(self, messages: List[Dict], schema: Optional[str] = None,
+               max_tokens: int = DEFAULT_MAX_TOKENS) -> Future:
+        future = Future()
+        self._queue.put(({"messages": messages, "schema": schema, "max_tokens": max_tokens}, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                results = self.backend.generate([req for req, _ in batch])
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+    def complete_text(self, prompt: str, system: Optional[str] = None, max_tokens: int = 256) -> str:
+        messages = ([{"role": "system", "content": system}] if system else []) + [{"role": "user", "content": prompt}]
+        return self.submit(messages, max_tokens=max_tokens).result()["text"]
+
+    def complete_json(self, system: str, user: str, model) -> Dict:
+        """Generate JSON matching the Pydantic `model`; returns the backend result dict."""
+        messages = [{"role": "system", "content": system}, {"role": "user", "content": user}]
+        return self.submit(messages, schema=schema_for(model)).result()
+
+
+_schema_cache: Dict[type, str] = {}
+
+
+def schema_for(model) -> str:
+    """JSON schema string for a Pydantic model (cached; also the grammar cache key)."""
+    if model not in _schema_cache:
+        _schema_cache[model] = json.dumps(model.model_json_schema(), sort_keys=True)
+    return _schema_cache[model]
+
+
+_instance: Optional[LocalLLM] = None
+_instance_lock = threading.Lock()
+
+
+def get_local_llm(backend=None) -> LocalLLM:
+    """Process-wide LocalLLM; the model is loaded on first use only."""
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None:
+                if backend is None:
+                    backend = LlamaCppBackend(
+                        os.getenv("LOCAL_MODEL_PATH"),
+                        n_threads=int(os.getenv("LOCAL_LLM_THREADS", "0")) or os.cpu_count(),
+                        n_ctx=int(os.getenv("LOCAL_LLM_N_CTX", str(DEFAULT_N_CTX))),
+                    )
+                _instance = LocalLLM(backend, max_batch=int(os.getenv("LOCAL_LLM_MAX_BATCH", "8")))
+    return _instance
+
+
+def reset_local_llm():
+    """Drop the shared instance (tests / model reloads)."""
+    global _instance
+    with _instance_lock:
+        _instance = None
@@ -4,15 +4,31 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
 load_dotenv()
 import os
+from functools import lru_cache
 
 from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
 from langchain.output_parsers import PydanticOutputParser
-from pydantic import BaseModel
-from typing import List, Optional
-from langchain.prompts import PromptTemplate
+from langchain_core.messages import HumanMessage, SystemMessage
 import re
+import json
+import time
+from json_repair import extract_json, fill_missing_sections
+from llm_scheduler import WHAT_IF, Overloaded, current_priority, estimate_tokens, scheduler
+from local_llm import get_local_llm, local_backend_enabled
+from model_router import REPAIR_CALL, RECOMMENDATION_CALL, TIER_MODELS, WHAT_IF_CALL, router
+from capture import captured, record_llm, stage
+from profiling import profiled
+from singleflight import coalesced
 from products import insurance_products
+from catalog import parse_csr_value
+from matching import match_products, match_recommendation_products
+from rules import calculate_insurance_recommendations, parse_profile_text
+from schemas import InsuranceRecommendation
+from scenarios import run_what_if_scenario
+from similarity import similarity_index
+from catalog_qa import answer_catalog_question
+from streaming import SentenceLimiter
 from retrieval import query_products, product_sentences, product_embeddings, embedding_model
 import numpy as np
 from tools import (
@@ -24,142 +40,23 @@ from tools import (
     explain_affordability,
     explain_coverage_adequacy,
     explain_coverage_vs_income,
-    parse_money
-)
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-pro",
-    google_api_key=os.getenv("GEMINI_API_KEY")
+    recommendation_insights
 )
+@lru_cache(maxsize=None)
+def get_llm(model: str):
+    """One client per Gemini model; model_router picks which one a call uses."""
+    return ChatGoogleGenerativeAI(
+        model=model,
+        google_api_key=os.getenv("GEMINI_API_KEY")
+    )
 
 
-def parse_csr_value(csr_value):
-    """Parse CSR value from various formats and return numeric value."""
-    if csr_value is None:
-        return 0
-
-    # Convert to string first
-    csr_str = str(csr_value).strip()
-
-    # Try to extract percentage from text like "High persistency, ~88.1% renewals"
-    import re
-    match = re.search(r'(\d+(?:\.\d+)?)%', csr_str)
-    if match:
-        return float(match.group(1))
+llm = get_llm(TIER_MODELS["pro"][0])
 
-    # Try to extract number with ~ symbol like "~88.1"
-    match = re.search(r'~?(\d+(?:\.\d+)?)', csr_str)
-    if match:
-        return float(match.group(1))
-
-    # Try direct float conversion
-    try:
-        return float(csr_str)
-    except ValueError:
-        return 0
 
 def get_matching_products(product_type, user_requirements):
-    matches = []
-
-    for company, details in insurance_products.items():
-        # Company-level CSR for explanation - try both field names
-        csr = details.get("csr") or details.get("claim_settlement_ratio")
-
-        # Handle different product structures
-        products = []
-        if "products" in details:
-            # Structure like ICICI, SBI, Axis
-            for prod in details["products"]:
-                if prod.get("type") == product_type:
-                    products.append(prod)
-        elif "plans" in details:
-            # Structure like Tata AIA, Kotak, HDFC, LIC, Aditya Birla
-            # For these companies, we need to infer the type from the plan name or company offerings
-            if product_type == "term" and any("term" in plan.lower() for plan in details["plans"]):
-                products = [{"name": plan, "type": product_type, "coverage": details.get("coverage", {})} for plan in details["plans"] if "term" in plan.lower()]
-            elif product_type == "health" and any("health" in plan.lower() or "optima" in plan.lower() or "suraksha" in plan.lower() for plan in details["plans"]):
-                products = [{"name": plan, "type": product_type, "coverage": details.get("coverage", {})} for plan in details["plans"] if "health" in plan.lower() or "optima" in plan.lower() or "suraksha" in plan.lower()]
-            else:
-                # For companies with plans structure, include all plans for the product type
-                products = [{"name": plan, "type": product_type, "coverage": details.get("coverage", {})} for plan in details["plans"]]
-
-        for product in products:
-            score = 0
-            matched_criteria = []
-
-            # Check coverage matching
-            coverage_info = product.get("coverage", {})
-            if isinstance(coverage_info, dict):
-                for req_key, req_val in user_requirements.items():
-                    if req_key in coverage_info:
-                        if str(req_val).lower() in str(coverage_info[req_key]).lower():
-                            score += 1
-                            matched_criteria.append(req_key)
-                    elif req_key == "coverage" and "sum_assured" in coverage_info:
-                        # Special case for term insurance coverage
-                        if str(req_val).lower() in str(coverage_info).lower():
-                            score += 1
-                            matched_criteria.append("coverage")
-                    elif req_key == "coverage":
-                        # Check if the required coverage amount is mentioned in coverage info
-                        if str(req_val).lower() in str(coverage_info).lower():
-                            score += 1
-                            matched_criteria.append("coverage")
-
-            # If no specific coverage match, give a base score for having the right product type
-            if score == 0 and product.get("type") == product_type:
-                score = 1
-                matched_criteria.append("product_type")
-
-            if score > 0:
-                plan_name = product.get("name", "Insurance Plan")
-                explanation = (
-                    f"{company} offers {plan_name} "
-                    f"with Claim Settlement Ratio {csr}. "
-                    f"It matches your needs for {', '.join(matched_criteria)}."
-                )
-                matches.append({
-                    "company": company,
-                    "plans": [plan_name],
-                    "score": score,
-                    "explanation": explanation,
-                    "csr": csr
-                })
-
-    # Sort by highest score, then CSR if available - use the new parsing function
-    matches.sort(key=lambda x: (x["score"], parse_csr_value(x.get("csr")), x.get("company", "")), reverse=True)
-
-    # Return top matches (increased to 3 for better selection)
-    return matches[:3]
-
-def extract_number(coverage_str):
-    if not coverage_str:
-        return 0
-    # Extract numeric value from coverage string
-    coverage_str = coverage_str.replace("₹", "").strip().lower()
-    match = re.search(r"₹?\s*(\d+)([lcr]?)", coverage_str)
-    if not match:
-        return 0
-    number, unit = match.groups()
-    number = int(number)
-    return number * 1_00_000 if unit == "l" else number * 1_00_00_000 if unit == "c" else number
-
-
-class InsuranceDetails(BaseModel):
-    coverage: str
-    estimated_premium: str
-    reason: str
-    add_ons: Optional[List[str]] = []
-    priority: Optional[str] = None
-class InsuranceRecommendation(BaseModel):
-    term_insurance: InsuranceDetails
-    health_insurance: InsuranceDetails
-    vehicle_insurance: Optional[InsuranceDetails] = None
-    property_insurance: Optional[InsuranceDetails] = None
-    travel_insurance: Optional[InsuranceDetails] = None
-    personal_accident_cover: Optional[InsuranceDetails] = None
-    premium_affordability_check: Optional[str] = None
-    additional_advice: Optional[List[str]] = []
-    products_to_avoid: Optional[List[str]] = []
+    # Single-type view over the multi-category matcher
+    return match_products({product_type: user_requirements})[product_type]
 
 def build_clean_prompt() -> PromptTemplate:
     template = """You are an expert insurance advisor. Analyze the following customer profile and provide personalized insurance recommendations.
@@ -178,15 +75,15 @@ Output format:
 
 {{
   "term_insurance": {{
-    "coverage": "",
-    "estimated_premium": "",
+    "coverage_inr": 0,
+    "annual_premium_inr": 0,
     "reason": "",
     "add_ons": [],
     "priority": ""
   }},
   "health_insurance": {{
-    "coverage": "",
-    "estimated_premium": "",
+    "coverage_inr": 0,
+    "annual_premium_inr": 0,
     "reason": "",
     "add_ons": [],
     "priority": ""
@@ -200,7 +97,7 @@ Output format:
   "products_to_avoid": []
 }}
 
-Fill in all the empty strings and arrays with appropriate values based on the customer's profile. Ensure the JSON is complete and valid."""
+Fill in all the empty strings, zero amounts and arrays with appropriate values based on the customer's profile. Amounts are whole rupees (e.g. 10000000 for ₹1 crore); premiums are per year. Ensure the JSON is complete and valid."""
     return PromptTemplate(input_variables=["profile_text"], template=template)
 
 parser = PydanticOutputParser(pydantic_object=InsuranceRecommendation)
@@ -210,210 +107,223 @@ recommendation_chain = LLMChain(
     prompt=build_clean_prompt()
 )
 
+# Compact prompt for native structured output. The instruction block is a
+# constant system message so every request shares the same prefix (eligible for
+# provider-side prompt caching); only the profile varies. The JSON shape comes
+# from the InsuranceRecommendation schema, so no skeleton is sent in the prompt.
+COMPACT_SYSTEM_PROMPT = (
+    "You are an expert Indian insurance advisor. For the customer profile given, "
+    "recommend term and health insurance, plus vehicle, property, travel and "
+    "personal accident cover where applicable (null otherwise). Use realistic INR "
+    "coverage amounts and annual premiums based on age, income, family, occupation "
+    "and assets. Give add-ons, a priority per product, an affordability check, "
+    "additional advice and products to avoid."
+)
 
-def calculate_insurance_recommendations(profile_text: str):
-    """Calculate insurance recommendations based on profile data using rules."""
-
-    # Parse profile data
-    lines = profile_text.strip().split('\n')
-    profile_data = {}
-    for line in lines:
-        if ':' in line:
-            key, value = line.split(':', 1)
-            profile_data[key.strip()] = value.strip()
 
-    age = int(profile_data.get('Age', '35'))
-    income = int(profile_data.get('Monthly Income', '₹75000').replace('₹', ''))
-    marital_status = profile_data.get('Marital Status', 'Married')
-    dependents = int(profile_data.get('Dependents', '2'))
-    employment = profile_data.get('Employment', 'Private Job')
-    vehicle = profile_data.get('Vehicle', 'Yes')
-    owns_property = profile_data.get('Owns Property', 'Yes')
+def build_compact_messages(profile_text: str) -> list:
+    return [
+        SystemMessage(content=COMPACT_SYSTEM_PROMPT),
+        HumanMessage(content=f"Customer profile:\n{profile_text.strip()}"),
+    ]
 
-    # Calculate term insurance coverage (typically 10-20x annual income)
-    annual_income = income * 12
-    term_coverage_multiplier = 15 if dependents > 0 else 10
-    term_coverage = min(annual_income * term_coverage_multiplier, 20000000)  # Cap at 2 crores
 
-    # Calculate term premium (rough estimate based on age and coverage)
-    term_premium = (term_coverage / 100000) * (age / 100) * 1000  # Rough calculation
+@lru_cache(maxsize=None)
+def get_structured_llm(model: str):
+    return get_llm(model).with_structured_output(
+        InsuranceRecommendation, method="json_mode", include_raw=True
+    )
 
-    # Calculate health insurance coverage
-    health_coverage = 1000000 if age < 40 else 1500000  # 10-15 lakhs based on age
 
-    # Calculate health premium
-    health_premium = health_coverage / 100000 * 80  # Rough calculation
+REPAIR_SYSTEM_PROMPT = (
+    "The text below was meant to be an insurance recommendation in JSON but does not "
+    "parse. Return the same recommendation as valid JSON matching the schema. Do not "
+    "change any amounts or advice."
+)
 
-    # Format coverage strings
-    def format_coverage(amount):
-        if amount >= 10000000:  # 1 crore
-            return f"₹{amount//10000000} crores"
-        else:
-            return f"₹{amount//100000} lakhs"
-
-    def format_premium(amount):
-        return f"₹{int(amount)}/year"
-
-    # Create recommendation object
-    term_insurance = InsuranceDetails(
-        coverage=format_coverage(term_coverage),
-        estimated_premium=format_premium(term_premium),
-        reason=f"Provides financial security for {'family' if dependents > 0 else 'your future'}",
-        add_ons=["Critical Illness Rider", "Waiver of Premium"],
-        priority="must-have"
-    )
 
-    health_insurance = InsuranceDetails(
-        coverage=format_coverage(health_coverage),
-        estimated_premium=format_premium(health_premium),
-        reason="Covers medical expenses and hospitalization",
-        add_ons=["Maternity Cover" if dependents > 0 else "OPD Cover", "Critical Illness"],
-        priority="must-have"
-    )
+# Completion budget used for admission before the real usage is known
+RECOMMENDATION_COMPLETION_TOKENS = 900
+WHAT_IF_COMPLETION_TOKENS = 150
 
-    vehicle_insurance = InsuranceDetails(
-        coverage="₹5 lakhs",
-        estimated_premium="₹3,000/year",
-        reason="Protects vehicle from damage and theft",
-        add_ons=["Zero Depreciation", "Roadside Assistance"],
-        priority="recommended"
-    ) if vehicle == "Yes" else None
-
-    personal_accident_cover = InsuranceDetails(
-        coverage="₹25 lakhs",
-        estimated_premium="₹1,000/year",
-        reason="Accident protection and disability coverage",
-        add_ons=["Permanent Disability", "Temporary Disability"],
-        priority="recommended"
-    )
 
-    # Calculate affordability
-    total_premium = term_premium + health_premium
-    if vehicle_insurance:
-        total_premium += 3000
-    if personal_accident_cover:
-        total_premium += 1000
-
-    affordability = "Premiums are affordable" if total_premium < income * 0.1 else "Premiums may be high - consider lower coverage options"
-
-    return InsuranceRecommendation(
-        term_insurance=term_insurance,
-        health_insurance=health_insurance,
-        vehicle_insurance=vehicle_insurance,
-        property_insurance=None,
-        travel_insurance=None,
-        personal_accident_cover=personal_accident_cover,
-        premium_affordability_check=affordability,
-        additional_advice=["Consider increasing coverage as income grows", "Review coverage annually"],
-        products_to_avoid=["High-commission products", "Products with low claim settlement ratio"]
-    )
+def extract_token_usage(message) -> dict:
+    """Return prompt/completion token counts reported by the provider for a response."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    return {
+        "prompt_tokens": usage.get("input_tokens"),
+        "completion_tokens": usage.get("output_tokens"),
+        "total_tokens": usage.get("total_tokens"),
+    }
 
-def clean_json_output(output: str) -> str:
-    """Clean the LLM output to extract valid JSON."""
-    import json
-    import re
 
-    # Remove markdown code blocks if present
-    output = re.sub(r'```json\s*', '', output)
-    output = re.sub(r'```\s*', '', output)
+def settle_ticket(ticket, response):
+    """Correct a scheduler slot with the tokens a structured response actually used."""
+    ticket.settle(extract_token_usage(response["raw"])["total_tokens"])
 
-    # Find JSON object in the output
-    start = output.find('{')
-    end = output.rfind('}') + 1
 
-    if start != -1 and end > start:
-        json_str = output[start:end]
+def run_structured_recommendation(profile_text: str):
+    """Call the LLM in native JSON-schema mode; returns (recommendation, token_usage, json_repairs)."""
+    if local_backend_enabled():
+        # Grammar-constrained local model; the repair pass is only a safety net
+        result = get_local_llm().complete_json(COMPACT_SYSTEM_PROMPT, f"Customer profile:\n{profile_text.strip()}",
+                                               InsuranceRecommendation)
+        recommendation, repairs = parse_recommendation_output(result["text"])
+        token_usage = {
+            "prompt_tokens": result["prompt_tokens"],
+            "completion_tokens": result["completion_tokens"],
+            "total_tokens": (result["prompt_tokens"] or 0) + (result["completion_tokens"] or 0) or None,
+        }
+        record_llm(RECOMMENDATION_CALL, "local", result["text"], token_usage)
+        return recommendation, token_usage, repairs
+
+    messages = build_compact_messages(profile_text)
+    estimated = estimate_tokens(COMPACT_SYSTEM_PROMPT + profile_text, RECOMMENDATION_COMPLETION_TOKENS)
+    started = time.perf_counter()
+    response, model = router.invoke(RECOMMENDATION_CALL, lambda m: get_structured_llm(m).invoke(messages),
+                                    admit=lambda: scheduler.slot(current_priority(), estimated),
+                                    settle=settle_ticket)
+    raw = response["raw"]
+    record_llm(RECOMMENDATION_CALL, model, raw.content, extract_token_usage(raw),
+               (time.perf_counter() - started) * 1000)
+    recommendation = response["parsed"]
+    repairs = []
+    if recommendation is None:
+        # Schema mode should always parse; repair the raw text as a safety net,
+        # and ask a fast model to fix it when that is not enough.
         try:
-            # Validate it's valid JSON
-            json.loads(json_str)
-            return json_str
-        except json.JSONDecodeError:
-            pass
+            recommendation, repairs = parse_recommendation_output(raw.content)
+        except ValueError:
+            recommendation, repairs = repair_with_llm(raw.content)
+    return recommendation, dict(extract_token_usage(raw), model=model), repairs
+
+
+def repair_with_llm(output: str):
+    """One retry on the repair tier for output the local repair pass could not parse."""
+    messages = [SystemMessage(content=REPAIR_SYSTEM_PROMPT), HumanMessage(content=output)]
+    estimated = estimate_tokens(REPAIR_SYSTEM_PROMPT + output, RECOMMENDATION_COMPLETION_TOKENS)
+    started = time.perf_counter()
+    response, model = router.invoke(REPAIR_CALL, lambda m: get_structured_llm(m).invoke(messages),
+                                    admit=lambda: scheduler.slot(current_priority(), estimated),
+                                    settle=settle_ticket)
+    record_llm(REPAIR_CALL, model, response["raw"].content, extract_token_usage(response["raw"]),
+               (time.perf_counter() - started) * 1000)
+    if response["parsed"] is not None:
+        return response["parsed"], ["llm_repair_retry"]
+    recommendation, repairs = parse_recommendation_output(response["raw"].content)
+    return recommendation, repairs + ["llm_repair_retry"]
 
-    # If no valid JSON found, return the original output
-    return output
 
-def get_recommendation(profile_text: str):
+def clean_json_output(output: str) -> str:
+    """Clean the LLM output to extract valid JSON."""
+    data, _ = extract_json(output)
+    # If no JSON object could be recovered, return the original output
+    return json.dumps(data) if data is not None else output
+
+def parse_recommendation_output(output: str):
+    """Extract, repair and validate a recommendation; returns (recommendation, repairs)."""
+    data, repairs = extract_json(output)
+    if data is None:
+        raise ValueError("No JSON object found in model output")
+    data = fill_missing_sections(data, InsuranceRecommendation, repairs)
+    return InsuranceRecommendation.model_validate(data), repairs
+
+@captured("recommendation")
+@profiled("get_recommendation")
+@coalesced("get_recommendation")
+def get_recommendation(profile_text: str, structured_output: bool = True, render_charts: bool = True,
+                       save_output: bool = True):
     try:
         # Use LLM for pure predictions
-        output = recommendation_chain.run(profile_text=profile_text)
-        cleaned_output = clean_json_output(output)
-        recommendation = parser.parse(cleaned_output)
+        token_usage = None
+        served_by = "llm"
+        reused_from = None
+        with stage("llm"):
+            try:
+                # A stored LLM recommendation for a near-identical profile is reused,
+                # with its amounts re-derived for this one
+                reuse = similarity_index.lookup(profile_text)
+                if reuse:
+                    recommendation, json_repairs, reused_from = reuse["recommendation"], [], reuse["reused_from"]
+                elif structured_output:
+                    recommendation, token_usage, json_repairs = run_structured_recommendation(profile_text)
+                else:
+                    estimated = estimate_tokens(recommendation_chain.prompt.template + profile_text,
+                                                RECOMMENDATION_COMPLETION_TOKENS)
+                    with scheduler.slot(current_priority(), estimated):
+                        started = time.perf_counter()
+                        output = recommendation_chain.run(profile_text=profile_text)
+                    record_llm(RECOMMENDATION_CALL, TIER_MODELS["pro"][0], output, None,
+                               (time.perf_counter() - started) * 1000)
+                    recommendation, json_repairs = parse_recommendation_output(output)
+            except Overloaded:
+                # LLM quota is saturated: degrade to the rules engine instead of queueing further
+                recommendation = calculate_insurance_recommendations(profile_text)
+                json_repairs, served_by = [], "rules_engine"
+        if served_by == "llm" and reused_from is None:
+            similarity_index.add(profile_text, recommendation)
 
       
 
-        # Match insurance products
-        matched_products = {}
-        term_matches = get_matching_products("term", {"coverage": recommendation.term_insurance.coverage})
-        if term_matches:
-            matched_products["Term Insurance"] = term_matches
-
-        health_matches = get_matching_products("health", {"coverage": recommendation.health_insurance.coverage})
-        if health_matches:
-            matched_products["Health Insurance"] = health_matches
+        # Match insurance products for every recommended category in one pass
+        with stage("matching"):
+            matched_products = match_recommendation_products(recommendation, profile_text)
 
         # Save recommendation
-        save_path = save_insurance_recommendation(recommendation, matched_products)
-        explanation = generate_explanation(recommendation.term_insurance, "Term Insurance")
-
-        # Generate charts
-        income = extract_number(profile_text.split("Monthly Income: ₹")[1].split("\n")[0])
-        term_val = extract_number(recommendation.term_insurance.estimated_premium)
-        health_val = extract_number(recommendation.health_insurance.estimated_premium)
-        term_coverage = extract_number(recommendation.term_insurance.coverage)
-        health_coverage = extract_number(recommendation.health_insurance.coverage)
-
-        chart_path = visualize_affordability_chart(term_val, health_val, income)
-
-        coverage_chart_path = visualize_coverage_vs_income_chart(
-            term_coverage, health_coverage, income
-        )
-
-        total_coverage = parse_money(term_coverage) + parse_money(health_coverage)
-        coverage_adequacy = visualize_coverage_adequacy(total_coverage, income)
+        with stage("save"):
+            save_path = save_insurance_recommendation(recommendation, matched_products) if save_output else None
+        with stage("insights"):
+            insights = recommendation_insights(recommendation, profile_text)
+        chart_path = coverage_chart_path = coverage_adequacy = chart_data = None
+        if render_charts:
+            with stage("charts"):
+                term_val, health_val, term_coverage, health_coverage, income = insights["figures"]
+                chart_path = visualize_affordability_chart(term_val, health_val, income)
+
+                coverage_chart_path = visualize_coverage_vs_income_chart(
+                    term_coverage, health_coverage, income
+                )
 
-        affordability_tip = explain_affordability(term_val, health_val, income)
-        coverage_tip = explain_coverage_vs_income(term_coverage, health_coverage, income)
-        adequacy_tip = explain_coverage_adequacy(term_coverage + health_coverage, income)
+                coverage_adequacy = visualize_coverage_adequacy(term_coverage + health_coverage, income * 12)
+        else:
+            # Interactive mode: return the data and let the browser draw it
+            chart_data = insights["chart_data"]
 
         return {
             "recommendation": recommendation,
             "products": matched_products,
-            "explanation": explanation,  # GenAI explanation
+            "explanation": insights["explanation"],  # GenAI explanation
             "chart_path": chart_path,
             "coverage_chart_path": coverage_chart_path,
             "coverage_adequacy": coverage_adequacy,
-            "affordability_tip": affordability_tip,
-            "coverage_tip": coverage_tip,
-            "adequacy_tip": adequacy_tip,
-            "save_path": save_path
+            "chart_data": chart_data,
+            "affordability_tip": insights["affordability_tip"],
+            "coverage_tip": insights["coverage_tip"],
+            "adequacy_tip": insights["adequacy_tip"],
+            "save_path": save_path,
+            "token_usage": token_usage,
+            "json_repairs": json_repairs,
+            "served_by": served_by,
+            "reused_from": reused_from
         }
 
     except Exception as e:
         return {"error": str(e)}
     
-def answer_what_if_question(query: str, profile_text: str) -> str:
-    try:
-        if llm is None:
-            return "Sorry, the AI model is not available. Please try again later."
-        if not query.strip():
-            return "Please enter a question."
-
-        # --- Step 1: Embed query ---
-        query_embedding = embedding_model.encode(query, convert_to_tensor=True)
-
-        # --- Step 2: Compute cosine similarities ---
-        scores = np.dot(product_embeddings, query_embedding) / (
-            np.linalg.norm(product_embeddings, axis=1) * np.linalg.norm(query_embedding)
-        )
-        top_indices = np.argsort(scores)[-3:][::-1]  # top-3 results
-        retrieved_facts = [product_sentences[i] for i in top_indices]
-
-        # --- Step 3: Build context ---
-        context = "\n".join(retrieved_facts)
+def retrieve_product_facts(query: str, k: int = 3) -> list:
+    """Top-k product sentences for a question (embeddings when loaded, keyword match otherwise)."""
+    if embedding_model is None or product_embeddings is None:
+        return query_products(query, k)
+    query_embedding = embedding_model.encode(query, convert_to_tensor=True)
+    scores = np.dot(product_embeddings, query_embedding) / (
+        np.linalg.norm(product_embeddings, axis=1) * np.linalg.norm(query_embedding)
+    )
+    top_indices = np.argsort(scores)[-k:][::-1]
+    return [product_sentences[i] for i in top_indices]
 
-        # --- Step 4: Build final prompt ---
-        prompt_text = f"""
+def build_what_if_prompt(query: str, profile_text: str) -> str:
+    context = "\n".join(retrieve_product_facts(query))
+    return f"""
 You are an expert insurance advisor. Use the customer's profile and relevant product facts to guide your answer.
 
 Customer Profile:
@@ -428,13 +338,99 @@ Respond in 2-3 clear sentences. Focus on practical advice about what changes the
 Keep the answer concise and actionable.
 """
 
-        # --- Step 5: Call LLM ---
-        text = llm.invoke(prompt_text).content
-
-        # --- Step 6: Clean ---
-        text = text.replace("Answer:", "").replace("###", "").strip()
-        sentences = [s.strip() for s in text.split('.') if s.strip()]
-        return '. '.join(sentences[:3]) + '.'
+@captured("what_if")
+def stream_what_if_answer(query: str, profile_text: str, cancel_event=None, max_sentences: int = 3):
+    """Yield the answer as it is generated; stops reading the model after `max_sentences`
+    sentences or as soon as `cancel_event` is set."""
+    try:
+        if not query.strip():
+            yield "Please enter a question."
+            return
+
+        # Parametric questions (income/dependents/age/coverage changes) are
+        # answered by the rules engine; only open-ended ones reach the LLM.
+        with stage("scenario"):
+            scenario = run_what_if_scenario(query, profile_text)
+        if scenario:
+            yield scenario["answer"]
+            return
+
+        # Catalog facts (CSR rankings, riders, entry age, minimum premiums,
+        # waiting periods) are looked up in the product indexes.
+        with stage("catalog"):
+            fact = answer_catalog_question(query)
+        if fact:
+            yield fact["answer"]
+            return
+
+        prompt_text = build_what_if_prompt(query, profile_text)
+        busy = "We're answering a lot of questions right now. Please try again in a minute."
+        priority, estimated = current_priority(WHAT_IF), estimate_tokens(prompt_text, WHAT_IF_COMPLETION_TOKENS)
+        attempt = {"ticket": None, "model": None}
+
+        def admit_attempt(model):
+            # A failover is another request: it takes a fresh slot. The old one is popped
+            # first, so a refused slot leaves nothing for the finally below to release.
+            if attempt["model"] is not None:
+                scheduler.release(attempt.pop("ticket"))
+                attempt["ticket"] = scheduler.acquire(priority, estimated)
+            attempt["model"] = model
+
+        if local_backend_enabled():
+            attempt["model"] = "local"
+            stream = iter([get_local_llm().complete_text(prompt_text)])
+        else:
+            try:
+                attempt["ticket"] = scheduler.acquire(priority, estimated)
+            except Overloaded:
+                yield busy
+                return
+            stream = router.stream(WHAT_IF_CALL, lambda model: get_llm(model).stream(prompt_text),
+                                   on_model=admit_attempt)
+
+        limiter = SentenceLimiter(max_sentences)
+        started = False
+        answered = 0
+        chunks = []
+        stream_started = time.perf_counter()
+        try:
+            for chunk in stream:
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                chunks.append(getattr(chunk, "content", chunk))
+                text = chunks[-1].replace("###", "")
+                if not started:
+                    # Drop a leading "Answer:" label
+                    text = text.lstrip()
+                    text = text[len("Answer:"):].lstrip() if text.startswith("Answer:") else text
+                    started = bool(text)
+                piece, done = limiter.feed(text)
+                answered += len(piece)
+                if piece:
+                    yield piece
+                if done:
+                    return
+            tail = limiter.finish()
+            if tail:
+                yield tail
+        except Overloaded:
+            yield busy
+        finally:
+            # Closing the stream ends the HTTP response, so no further tokens are generated
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+            record_llm(WHAT_IF_CALL, attempt["model"], "".join(chunks), None,
+                       (time.perf_counter() - stream_started) * 1000, chunks=chunks)
+            ticket = attempt.get("ticket")
+            if ticket is not None:
+                ticket.settle(estimate_tokens(prompt_text) + answered // 4)
+                scheduler.release(ticket)
 
     except Exception as e:
-        return f"Error processing question: {str(e)}"
\ No newline at end of file
+        yield f"Error processing question: {str(e)}"
+
+@profiled("what_if")
+@coalesced("what_if")
+def answer_what_if_question(query: str, profile_text: str) -> str:
+    return "".join(stream_what_if_answer(query, profile_text)).strip()
@@ -0,0 +1,156 @@
+import heapq
+from typing import Dict, List, Optional
+
+from catalog import EligibilityIndex, catalog_index, coverage_distance
+from rules import AFFORDABLE_SHARE_OF_INCOME, parse_profile_text
+from schemas import parse_inr
+
+# ----------------------------------------
+# Single-pass multi-category product matching
+# ----------------------------------------
+# Recommendation sections -> (catalog product type, display category)
+RECOMMENDATION_CATEGORIES = {
+    "term_insurance": ("term", "Term Insurance"),
+    "health_insurance": ("health", "Health Insurance"),
+    "vehicle_insurance": ("vehicle", "Vehicle Insurance"),
+    "property_insurance": ("property", "Property Insurance"),
+    "travel_insurance": ("travel", "Travel Insurance"),
+    "personal_accident_cover": ("personal_accident", "Personal Accident Cover"),
+}
+
+
+# Requirement keys used for eligibility and quoting, not for coverage matching
+NON_COVERAGE_KEYS = {"age", "coverage_inr", "term_years", "premium_budget"}
+
+# Term cover is sized to run until retirement, with a floor for older buyers
+TERM_COVER_UNTIL_AGE = 60
+MIN_TERM_YEARS = 10
+
+
+def coverage_fit(distance: Optional[float]) -> float:
+    """1 when the plan's range contains the requested cover, 1/2 one doubling away, 1/3 two
+    doublings away (1 / (1 + doublings)); 0 if unknown."""
+    return 0.0 if distance is None else 1 / (1 + distance)
+
+
+def _score_plan(plan: Dict, requirements: Dict, coverage: Optional[float], distance: Optional[float] = None):
+    """Every plan of the right type starts at 1; coverage fit adds up to 1 and each
+    other requirement found in the plan's coverage details adds 1."""
+    coverage_info = plan["coverage"]
+    if distance is None and coverage and plan["coverage_range"] is not None:
+        distance = coverage_distance(coverage, plan["coverage_range"])
+    fit = coverage_fit(distance)
+    score = 1 + fit
+    matched_criteria = ["coverage"] if fit == 1 else []
+    for req_key, req_val in requirements.items():
+        if req_key in NON_COVERAGE_KEYS or req_key == "coverage":
+            continue
+        if isinstance(coverage_info, dict) and req_key in coverage_info:
+            if str(req_val).lower() in str(coverage_info[req_key]).lower():
+                score += 1
+                matched_criteria.append(req_key)
+    return round(score, 2), matched_criteria or ["product_type"]
+
+
+def _requested_coverage(reqs: Dict) -> Optional[float]:
+    if reqs.get("coverage_inr"):
+        return reqs["coverage_inr"]
+    return parse_inr(reqs["coverage"]) or None if reqs.get("coverage") else None
+
+
+def _push(heap: List, k: int, entry):
+    if len(heap) < k:
+        heapq.heappush(heap, entry)
+    elif entry[:2] > heap[0][:2]:
+        heapq.heapreplace(heap, entry)
+
+
+def _nearest_top_k(index: EligibilityIndex, product_type: str, reqs: Dict, coverage: float, k: int) -> List:
+    """Top-k when only coverage is scored: walk plans nearest-first and stop once
+    the remaining ones cannot outscore the heap."""
+    heap = []
+    eligibility = (reqs.get("age"), reqs.get("term_years"), reqs.get("premium_budget"))
+    for distance, position, plan in index.nearest_coverage(product_type, coverage, *eligibility):
+        score, matched_criteria = _score_plan(plan, reqs, coverage, distance)
+        if len(heap) == k and score < heap[0][0][0]:
+            break
+        _push(heap, k, ((score, plan["csr_value"], plan["company"]), -position, plan, matched_criteria))
+    if len(heap) < k:
+        # Plans that state no amount only fill the remaining places
+        for position, plan in index.candidates(product_type, *eligibility):
+            if plan["coverage_range"] is None:
+                _push(heap, k, ((1, plan["csr_value"], plan["company"]), -position, plan, ["product_type"]))
+    return heap
+
+
+def match_products(requirements: Dict[str, Dict], k: int = 3, plans: Optional[List[Dict]] = None) -> Dict[str, List[Dict]]:
+    """Match every requested product type against the plans the profile is eligible for.
+
+    `requirements` maps a product type ("term", "health", "vehicle", ...) to its
+    requirement dict (e.g. {"coverage": "₹1 crore", "coverage_inr": 10000000,
+    "age": 35}). Optional "age", "term_years" and "premium_budget" keys narrow
+    the candidates through the eligibility index before scoring; a plan whose
+    maximum term is shorter than "term_years" stays eligible at that maximum. Coverage fit
+    is scored by numeric distance between the requested cover and each plan's
+    sum-assured range. Each type keeps a bounded top-k heap ordered by
+    (score, CSR, company).
+    """
+    index = catalog_index if plans is None else EligibilityIndex(plans)
+    heaps = {}
+
+    for product_type, reqs in requirements.items():
+        coverage = _requested_coverage(reqs)
+        if coverage and set(reqs) <= NON_COVERAGE_KEYS | {"coverage"}:
+            heaps[product_type] = _nearest_top_k(index, product_type, reqs, coverage, k)
+            continue
+        heap = heaps[product_type] = []
+        candidates = index.candidates(product_type, reqs.get("age"), reqs.get("term_years"), reqs.get("premium_budget"))
+        for position, plan in candidates:
+            score, matched_criteria = _score_plan(plan, reqs, coverage)
+            # -position: among equal keys, earlier catalog entries win (stable like list.sort)
+            _push(heap, k, ((score, plan["csr_value"], plan["company"]), -position, plan, matched_criteria))
+
+    results = {}
+    for product_type, heap in heaps.items():
+        matches = []
+        for (score, _, _), _, plan, matched_criteria in sorted(heap, key=lambda e: e[:2], reverse=True):
+            explanation = (
+                f"{plan['company']} offers {plan['name']} "
+                f"with Claim Settlement Ratio {plan['csr']}. "
+                f"It matches your needs for {', '.join(matched_criteria)}."
+            )
+            matches.append({
+                "company": plan["company"],
+                "plans": [plan["name"]],
+                "score": score,
+                "explanation": explanation,
+                "csr": plan["csr"],
+            })
+        results[product_type] = matches
+    return results
+
+
+def recommendation_requirements(recommendation, profile_text: Optional[str] = None) -> Dict[str, Dict]:
+    """Build matcher requirements for every section present in a recommendation."""
+    profile = parse_profile_text(profile_text) if profile_text else {}
+    age = profile.get("age")
+    requirements = {}
+    for field, (product_type, _) in RECOMMENDATION_CATEGORIES.items():
+        section = getattr(recommendation, field, None)
+        if section is not None:
+            reqs = {"coverage": section.coverage, "coverage_inr": section.coverage_inr}
+            if age:
+                reqs["age"] = age
+                if product_type == "term":
+                    reqs["term_years"] = max(TERM_COVER_UNTIL_AGE - age, MIN_TERM_YEARS)
+            if profile.get("income"):
+                reqs["premium_budget"] = profile["income"] * 12 * AFFORDABLE_SHARE_OF_INCOME
+            requirements[product_type] = reqs
+    return requirements
+
+
+def match_recommendation_products(recommendation, profile_text: Optional[str] = None, k: int = 3) -> Dict[str, List[Dict]]:
+    """Matched products for a recommendation, keyed by display category."""
+    matches = match_products(recommendation_requirements(recommendation, profile_text), k)
+    display = {product_type: label for product_type, label in RECOMMENDATION_CATEGORIES.values()}
+    return {display[t]: found for t, found in matches.items() if found}
@@ -0,0 +1,271 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Dict, Iterable, List, Optional
+
+# ----------------------------------------
+# Latency- and cost-aware routing across Gemini tiers
+# ----------------------------------------
+# Each call type has a preferred tier: full recommendations need the most
+# capable model, a three-sentence what-if answer or a JSON repair retry do
+# not. The router keeps a rolling window of latency and outcome per model;
+# when the preferred model's p95 exceeds the call type's budget, or it keeps
+# failing, calls go to the next faster tier until it recovers. A call that
+# errors is retried once on each remaining candidate (failover).
+#
+# The list of models the key can use is fetched once per process and cached
+# on disk, so restarts do not pay for the listing call; models that are not
+# available are skipped.
+#
+# Every attempt, failovers included, is a separate request to the provider:
+# callers pass an admit hook so each one takes its own quota slot.
+#
+#   MODEL_CACHE_PATH            discovered model list
+#                               (default $XDG_CACHE_HOME/insurance_recommender/gemini_models.json)
+#   MODEL_CACHE_TTL_HOURS       refresh the list after this long (default 24)
+#   LLM_TIER_<CALL>             tier for a call type: pro / flash / flash_lite
+#   LLM_P95_BUDGET_MS_<CALL>    p95 latency budget for a call type
+
+# Slowest, most capable first
+TIERS = ["pro", "flash", "flash_lite"]
+TIER_MODELS = {
+    "pro": ["gemini-2.5-pro"],
+    "flash": ["gemini-2.5-flash", "gemini-2.0-flash"],
+    "flash_lite": ["gemini-2.5-flash-lite", "gemini-2.0-flash-lite"],
+}
+
+RECOMMENDATION_CALL, WHAT_IF_CALL, REPAIR_CALL = "recommendation", "what_if", "repair"
+DEFAULT_CALL_TIERS = {RECOMMENDATION_CALL: "pro", WHAT_IF_CALL: "flash", REPAIR_CALL: "flash_lite"}
+DEFAULT_P95_BUDGETS_MS = {RECOMMENDATION_CALL: 30000, WHAT_IF_CALL: 5000, REPAIR_CALL: 8000}
+
+WINDOW = 50          # latency / outcome samples kept per model
+MIN_SAMPLES = 5      # samples needed before p95 or error rate can reroute traffic
+MAX_ERROR_RATE = 0.5
+COOLDOWN_S = 60.0    # a model that just failed is skipped for this long
+
+DEFAULT_CACHE_PATH = os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+                                  "insurance_recommender", "gemini_models.json")
+
+
+def percentile(values: Iterable[float], pct: float) -> Optional[float]:
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+# ----------------------------------------
+# Model discovery
+# ----------------------------------------
+def list_gemini_models() -> List[str]:
+    """Models the configured key can call generateContent on."""
+    import google.generativeai as genai
+
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    return sorted(model.name.split("/", 1)[-1] for model in genai.list_models()
+                  if "generateContent" in model.supported_generation_methods)
+
+
+def discover_models(cache_path: Optional[str] = None, ttl_s: Optional[float] = None,
+                    list_models: Callable[[], List[str]] = list_gemini_models, refresh: bool = False,
+                    now: Callable[[], float] = time.time) -> Optional[List[str]]:
+    """The available model names, from the disk cache when it is fresh. Falls back to a
+    stale cache when listing fails; None when nothing is known."""
+    cache_path = cache_path or os.getenv("MODEL_CACHE_PATH", DEFAULT_CACHE_PATH)
+    if ttl_s is None:
+        ttl_s = float(os.getenv("MODEL_CACHE_TTL_HOURS", 24)) * 3600
+    cached = None
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            cached = None
+    if cached and not refresh and now() - cached["fetched_at"] < ttl_s:
+        return cached["models"]
+    try:
+        models = list_models()
+    except Exception:
+        return cached["models"] if cached else None
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": now(), "models": models}, f)
+    except OSError:
+        pass
+    return models
+
+
+# ----------------------------------------
+# Router
+# ----------------------------------------
+class ModelStats:
+    def __init__(self):
+        self.latencies = deque(maxlen=WINDOW)
+        self.outcomes = deque(maxlen=WINDOW)
+        self.calls = 0
+        self.errors = 0
+        self.failed_at = None
+
+    def p95(self) -> Optional[float]:
+        return percentile(self.latencies, 95) if len(self.latencies) >= MIN_SAMPLES else None
+
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def flaky(self) -> bool:
+        return len(self.outcomes) >= MIN_SAMPLES and self.error_rate() > MAX_ERROR_RATE
+
+
+class ModelRouter:
+    def __init__(self, call_tiers: Optional[Dict[str, str]] = None, budgets_ms: Optional[Dict[str, float]] = None,
+                 discover: Callable[[], Optional[List[str]]] = discover_models,
+                 clock: Callable[[], float] = time.monotonic):
+        self.call_tiers = dict(DEFAULT_CALL_TIERS, **(call_tiers or {}))
+        self.budgets_ms = dict(DEFAULT_P95_BUDGETS_MS, **(budgets_ms or {}))
+        self.discover = discover
+        self.clock = clock
+        self.stats: Dict[str, ModelStats] = {}
+        self._available = None
+        self._discovered = False
+        self._lock = threading.Lock()
+
+    def available(self) -> Optional[List[str]]:
+        """Discovered model names (listed once, on first use); None when unknown."""
+        with self._lock:
+            if not self._discovered:
+                self._available = self.discover()
+                self._discovered = True
+            return self._available
+
+    def candidates(self, call_type: str) -> List[str]:
+        """Models for a call type: its tier first, then faster tiers, then slower ones."""
+        start = TIERS.index(self.call_tiers[call_type])
+        order = TIERS[start:] + TIERS[:start][::-1]
+        models = [model for tier in order for model in TIER_MODELS[tier]]
+        available = self.available()
+        if available is not None:
+            models = [model for model in models if model in available] or models
+        return models
+
+    def _healthy(self, model: str, budget_ms: float) -> bool:
+        stats = self.stats.get(model)
+        if stats is None:
+            return True
+        if stats.failed_at is not None and self.clock() - stats.failed_at < COOLDOWN_S:
+            return False
+        p95 = stats.p95()
+        return (p95 is None or p95 <= budget_ms) and not stats.flaky()
+
+    def route(self, call_type: str) -> List[str]:
+        """Candidates in the order they should be tried: healthy ones first."""
+        models = self.candidates(call_type)
+        with self._lock:
+            healthy = [m for m in models if self._healthy(m, self.budgets_ms[call_type])]
+        return healthy + [m for m in models if m not in healthy]
+
+    def choose(self, call_type: str) -> str:
+        return self.route(call_type)[0]
+
+    def record(self, model: str, latency_ms: float, ok: bool):
+        with self._lock:
+            stats = self.stats.setdefault(model, ModelStats())
+            stats.calls += 1
+            stats.outcomes.append(ok)
+            if ok:
+                stats.latencies.append(latency_ms)
+                stats.failed_at = None
+            else:
+                stats.errors += 1
+                stats.failed_at = self.clock()
+
+    def invoke(self, call_type: str, call: Callable[[str], object],
+               admit: Optional[Callable[[], ContextManager]] = None,
+               settle: Optional[Callable[[object, object], None]] = None):
+        """Run `call(model)` on the routed model, failing over to the next candidate on
+        error. Returns (result, model).
+
+        Each attempt runs inside `admit()` (e.g. a scheduler slot); an error entering it
+        ends the call without failover. `settle(ticket, result)` runs on success."""
+        error = None
+        for model in self.route(call_type):
+            with (admit() if admit else nullcontext()) as ticket:
+                started = self.clock()
+                try:
+                    result = call(model)
+                except Exception as e:
+                    self.record(model, (self.clock() - started) * 1000, False)
+                    error = e
+                    continue
+                self.record(model, (self.clock() - started) * 1000, True)
+                if settle:
+                    settle(ticket, result)
+                return result, model
+        raise error
+
+    def stream(self, call_type: str, open_stream: Callable[[str], Iterable],
+               on_model: Optional[Callable[[str], None]] = None):
+        """Stream from the routed model. A model that fails before its first chunk is
+        replaced by the next candidate; latency is recorded when the stream ends.
+
+        `on_model(model)` runs before each attempt (to record the model or take a quota
+        slot); an error it raises ends the stream without failover."""
+        error = None
+        for model in self.route(call_type):
+            if on_model:
+                on_model(model)
+            started = self.clock()
+            ok = False
+            first = True
+            try:
+                for chunk in open_stream(model):
+                    first = False
+                    yield chunk
+                ok = True
+            except GeneratorExit:
+                ok = True  # the caller stopped reading (sentence cap or cancel)
+                raise
+            except Exception as e:
+                if not first:
+                    raise
+                error = e
+                continue
+            finally:
+                self.record(model, (self.clock() - started) * 1000, ok)
+            return
+        raise error
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            models = {
+                model: {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "error_rate": round(stats.error_rate(), 3),
+                    "p50_ms": percentile(stats.latencies, 50),
+                    "p95_ms": stats.p95(),
+                    "cooling_down": stats.failed_at is not None and self.clock() - stats.failed_at < COOLDOWN_S,
+                }
+                for model, stats in self.stats.items()
+            }
+        return {"available": self._available, "routes": {c: self.choose(c) for c in self.call_tiers},
+                "models": models}
+
+
+def _env_config():
+    call_tiers, budgets = {}, {}
+    for call_type in DEFAULT_CALL_TIERS:
+        tier = os.getenv(f"LLM_TIER_{call_type.upper()}")
+        if tier in TIERS:
+            call_tiers[call_type] = tier
+        budget = os.getenv(f"LLM_P95_BUDGET_MS_{call_type.upper()}")
+        if budget:
+            budgets[call_type] = float(budget)
+    return call_tiers, budgets
+
+
+router = ModelRouter(*_env_config())
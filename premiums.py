@@ -0,0 +1,147 @@
+import json
+import math
+import os
+from bisect import bisect_right
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+# ----------------------------------------
+# Table-driven premium quotes
+# ----------------------------------------
+# rate_tables.json gives, per product, a rate in ₹ per ₹1 lakh of cover for a
+# grid of entry-age bands × cover bands, plus smoker / health-condition
+# loadings and rider add-ons (as a share of the base premium). The tables are
+# compiled once into dense NumPy arrays with one row per year of age, so a
+# quote is an array lookup plus linear interpolation between cover bands.
+# Single quotes without riders use plain-float copies of the same tables (the
+# NumPy call overhead dominates one quote); the arithmetic is the same.
+RATE_TABLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rate_tables.json")
+
+_compiled = {}
+
+
+def compile_rate_table(table: Dict) -> Dict:
+    age_bands = np.asarray(table["age_bands"], dtype=float)
+    coverage_bands = np.asarray(table["coverage_bands"], dtype=float)
+    rates = np.asarray(table["rate_per_lakh"], dtype=float)
+
+    # Dense age axis: one row per year, interpolated between age bands
+    ages = np.arange(int(age_bands[0]), int(age_bands[-1]) + 1)
+    dense = np.column_stack([np.interp(ages, age_bands, rates[:, j]) for j in range(len(coverage_bands))])
+
+    conditions = table["loadings"].get("health_conditions", {})
+    riders = table.get("riders", {})
+    return {
+        "min_age": int(ages[0]),
+        "max_age": int(ages[-1]),
+        "coverage_bands": coverage_bands,
+        "rates": dense,
+        "coverage_band_list": coverage_bands.tolist(),
+        "rate_rows": dense.tolist(),
+        "smoker_loading": float(table["loadings"].get("smoker", 0.0)),
+        "condition_index": {name: i for i, name in enumerate(conditions)},
+        "condition_loadings": np.asarray(list(conditions.values()) or [0.0], dtype=float),
+        "rider_index": {name: i for i, name in enumerate(riders)},
+        "rider_loadings": np.asarray(list(riders.values()), dtype=float),
+    }
+
+
+def load_rate_tables(path: Optional[str] = None) -> Dict:
+    """Load and compile rate tables (cached per path)."""
+    path = path or RATE_TABLES_PATH
+    if path not in _compiled:
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        _compiled[path] = {
+            product: compile_rate_table(table)
+            for product, table in raw.items() if not product.startswith("_")
+        }
+    return _compiled[path]
+
+
+def _condition_codes(table: Dict, health_conditions, size: int) -> np.ndarray:
+    if health_conditions is None:
+        return np.full(size, -1)
+    values, inverse = np.unique(np.broadcast_to(np.asarray(health_conditions, dtype=object), (size,)).astype(str),
+                                return_inverse=True)
+    lookup = np.array([table["condition_index"].get(v, -1) for v in values])
+    return lookup[inverse]
+
+
+def quote_premiums(product: str, ages, coverages, health_conditions=None, smoker=None,
+                   riders=None, tables: Optional[Dict] = None) -> np.ndarray:
+    """Quote annual premiums for a batch of profiles.
+
+    `ages` and `coverages` are arrays (or scalars) that broadcast together;
+    `health_conditions` holds condition names ("None", "Diabetes", ...);
+    `smoker` is a boolean array; `riders` is a boolean matrix with one column
+    per rider in the table's order (see rider_names).
+    """
+    table = (tables or load_rate_tables())[product]
+    ages, coverages = np.broadcast_arrays(np.asarray(ages, dtype=float), np.asarray(coverages, dtype=float))
+    shape = ages.shape
+    ages, coverages = ages.ravel(), coverages.ravel()
+
+    # Row lookup by age, linear interpolation across cover bands
+    rows = np.clip(np.rint(ages).astype(int), table["min_age"], table["max_age"]) - table["min_age"]
+    bands = table["coverage_bands"]
+    position = np.interp(coverages, bands, np.arange(len(bands)))
+    lower = np.floor(position).astype(int)
+    upper = np.minimum(lower + 1, len(bands) - 1)
+    weight = position - lower
+    rate = table["rates"][rows, lower] * (1 - weight) + table["rates"][rows, upper] * weight
+    premium = rate * coverages / 100000
+
+    loading = np.zeros_like(premium)
+    codes = _condition_codes(table, health_conditions, len(premium))
+    loading += np.where(codes >= 0, table["condition_loadings"][np.maximum(codes, 0)], 0.0)
+    if smoker is not None:
+        loading += np.broadcast_to(np.asarray(smoker, dtype=bool), premium.shape) * table["smoker_loading"]
+    if riders is not None and len(table["rider_loadings"]):
+        loading += np.asarray(riders, dtype=float).reshape(len(premium), -1) @ table["rider_loadings"]
+
+    return np.round(premium * (1 + loading)).reshape(shape)
+
+
+def rider_names(product: str, tables: Optional[Dict] = None):
+    table = (tables or load_rate_tables())[product]
+    return list(table["rider_index"])
+
+
+def _quote_one(table: Dict, age, coverage, health_condition, smoker: bool) -> int:
+    """quote_premiums for one profile without riders, on plain floats."""
+    row = table["rate_rows"][min(max(round(float(age)), table["min_age"]), table["max_age"]) - table["min_age"]]
+    bands, coverage = table["coverage_band_list"], float(coverage)
+    # np.interp(coverage, bands, arange(len(bands)))
+    j = bisect_right(bands, coverage) - 1
+    if j < 0:
+        position = 0.0
+    elif j >= len(bands) - 1 or bands[j] == coverage:
+        position = float(j)
+    else:
+        position = 1.0 / (bands[j + 1] - bands[j]) * (coverage - bands[j]) + j
+    lower = math.floor(position)
+    upper = min(lower + 1, len(bands) - 1)
+    weight = position - lower
+    premium = (row[lower] * (1 - weight) + row[upper] * weight) * coverage / 100000
+
+    code = table["condition_index"].get(str(health_condition), -1)
+    loading = float(table["condition_loadings"][code]) if code >= 0 else 0.0
+    if smoker:
+        loading += table["smoker_loading"]
+    return round(premium * (1 + loading))
+
+
+def quote_premium(product: str, age: int, coverage: int, health_condition: str = "None",
+                  smoker: bool = False, riders: Iterable[str] = (), tables: Optional[Dict] = None) -> int:
+    """Quote the annual premium for a single profile."""
+    table = (tables or load_rate_tables())[product]
+    if not riders:
+        return _quote_one(table, age, coverage, health_condition, smoker)
+    rider_mask = np.zeros((1, len(table["rider_index"])))
+    for rider in riders:
+        if rider in table["rider_index"]:
+            rider_mask[0, table["rider_index"][rider]] = 1
+    premium = quote_premiums(product, [age], [coverage], [health_condition], [smoker], rider_mask, tables)
+    return int(premium[0])
@@ -255,5 +255,107 @@ insurance_products = {
             "forfeiture": "Policy may lapse if premiums are not paid within grace period",
             "revival": "Lapsed policies can be revived by paying outstanding premiums with interest within the revival window"
         }
+    },
+
+    "ICICI Lombard General Insurance": {
+        "claim_settlement_ratio": 85.0,
+        "products": [
+            {
+                "name": "ICICI Lombard Private Car Package Policy",
+                "type": "vehicle",
+                "coverage": {"own_damage": True, "third_party": True, "sum_insured": "IDV ₹1 lakh to ₹50 lakhs"},
+                "premium": {"mode": ["yearly"], "variable": True},
+                "tenure": {"min": 1, "max": 3},
+                "riders": ["zero depreciation", "roadside assistance", "engine protection"],
+                "waiting_period": None
+            },
+            {
+                "name": "ICICI Lombard Travel Insurance",
+                "type": "travel",
+                "coverage": {"medical_expenses": True, "trip_cancellation": True, "sum_insured": "₹25 lakhs to ₹4 crores"},
+                "premium": {"mode": ["single"], "variable": True},
+                "eligibility": {"min_age": 0.5, "max_age": 70},
+                "riders": ["adventure sports", "pre-existing disease cover"],
+                "waiting_period": None
+            },
+            {
+                "name": "ICICI Lombard Personal Protect",
+                "type": "personal_accident",
+                "coverage": {"accidental_death": True, "permanent_disability": True, "sum_insured": "₹5 lakhs to ₹1 crore"},
+                "premium": {"mode": ["yearly"], "variable": True},
+                "tenure": {"min": 1, "max": 3},
+                "eligibility": {"min_age": 18, "max_age": 65},
+                "riders": ["temporary disability", "hospital cash"],
+                "waiting_period": None
+            }
+        ]
+    },
+
+    "Bajaj Allianz General Insurance": {
+        "claim_settlement_ratio": 98.5,
+        "products": [
+            {
+                "name": "Bajaj Allianz Private Car Package Policy",
+                "type": "vehicle",
+                "coverage": {"own_damage": True, "third_party": True, "sum_insured": "IDV ₹1 lakh to ₹1 crore"},
+                "premium": {"mode": ["yearly"], "variable": True},
+                "tenure": {"min": 1, "max": 3},
+                "riders": ["zero depreciation", "roadside assistance", "key replacement"],
+                "waiting_period": None
+            },
+            {
+                "name": "Bajaj Allianz Travel Prime",
+                "type": "travel",
+                "coverage": {"medical_expenses": True, "baggage_loss": True, "sum_insured": "₹40 lakhs to ₹4 crores"},
+                "premium": {"mode": ["single"], "variable": True},
+                "eligibility": {"min_age": 0.25, "max_age": 70},
+                "riders": ["trip delay", "passport loss"],
+                "waiting_period": None
+            },
+            {
+                "name": "Bajaj Allianz Premium Personal Guard",
+                "type": "personal_accident",
+                "coverage": {"accidental_death": True, "permanent_disability": True, "sum_insured": "₹10 lakhs to ₹2 crores"},
+                "premium": {"mode": ["yearly"], "variable": True},
+                "tenure": {"min": 1, "max": 1},
+                "eligibility": {"min_age": 18, "max_age": 70},
+                "riders": ["temporary disability", "education benefit"],
+                "waiting_period": None
+            }
+        ]
+    },
+
+    "Tata AIG General Insurance": {
+        "claim_settlement_ratio": 96.0,
+        "products": [
+            {
+                "name": "Tata AIG Auto Secure",
+                "type": "vehicle",
+                "coverage": {"own_damage": True, "third_party": True, "sum_insured": "IDV ₹50,000 to ₹50 lakhs"},
+                "premium": {"mode": ["yearly"], "variable": True},
+                "tenure": {"min": 1, "max": 3},
+                "riders": ["zero depreciation", "roadside assistance", "return to invoice"],
+                "waiting_period": None
+            },
+            {
+                "name": "Tata AIG Travel Guard",
+                "type": "travel",
+                "coverage": {"medical_expenses": True, "trip_cancellation": True, "sum_insured": "₹25 lakhs to ₹2 crores"},
+                "premium": {"mode": ["single"], "variable": True},
+                "eligibility": {"min_age": 0.5, "max_age": 70},
+                "riders": ["adventure sports"],
+                "waiting_period": None
+            },
+            {
+                "name": "Tata AIG Accident Guard Plus",
+                "type": "personal_accident",
+                "coverage": {"accidental_death": True, "permanent_disability": True, "sum_insured": "₹5 lakhs to ₹50 lakhs"},
+                "premium": {"mode": ["yearly"], "variable": True},
+                "tenure": {"min": 1, "max": 1},
+                "eligibility": {"min_age": 18, "max_age": 65},
+                "riders": ["temporary disability", "hospital cash"],
+                "waiting_period": None
+            }
+        ]
     }
 }
@@ -0,0 +1,178 @@
+import argparse
+import json
+import sys
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+
+# ----------------------------------------
+# 1. Profile text (same format app.py sends to get_recommendation)
+# ----------------------------------------
+def build_profile_text(user_input: Dict) -> str:
+    """Format a profile-form dict into the text block the recommendation pipeline expects."""
+    existing = user_input.get("existing_insurance", {})
+    return (
+        f"Age: {user_input['age']}\n"
+        f"Monthly Income: ₹{user_input['income']}\n"
+        f"Marital Status: {user_input['marital_status']}\n"
+        f"Dependents: {user_input['dependents']}\n"
+        f"Employment: {user_input['employment']}\n"
+        f"Existing Insurance: {', '.join([k for k, v in existing.items() if v])}\n"
+        f"Health Conditions: {user_input['health_conditions']}\n"
+        f"Vehicle: {user_input['vehicle']}\n"
+        f"Owns Property: {user_input['owns_property']}\n"
+        f"Frequent Traveler: {user_input['frequent_traveler']}\n"
+    )
+
+# ----------------------------------------
+# 2. Synthetic profile generator
+# ----------------------------------------
+# Every knob can be overridden with a JSON file (see --distributions); missing
+# keys fall back to these defaults.
+DEFAULT_DISTRIBUTIONS = {
+    "age": {"mean": 36, "std": 10, "min": 21, "max": 65},
+    # Monthly income is log-normal around the median
+    "income": {"median": 45000, "sigma": 0.7, "min": 10000, "max": 1000000},
+    # P(married) rises with age: logistic centred on `midpoint`
+    "married": {"midpoint": 28, "scale": 3.5, "divorced_share": 0.04},
+    # Dependents ~ Poisson, with a lower mean for single profiles
+    "dependents": {"married_mean": 1.8, "single_mean": 0.3, "max": 6},
+    "employment": {
+        "Private Job": 0.45,
+        "Government Job": 0.15,
+        "Self-Employed": 0.2,
+        "IT Professional": 0.2,
+    },
+    "existing_insurance": {
+        "term_insurance": 0.25,
+        "health_insurance": 0.4,
+        "vehicle_insurance": 0.35,
+        "travel_insurance": 0.05,
+    },
+    # Share of "None" health conditions at age 20 and 65 (linear in between)
+    "health_conditions": {
+        "none_at_20": 0.95,
+        "none_at_65": 0.55,
+        "conditions": {"Diabetes": 0.5, "Heart Issues": 0.25, "Other": 0.25},
+    },
+    # Ownership probabilities grow with log income
+    "vehicle": {"base": 0.25, "per_log_income": 0.35},
+    "owns_property": {"base": 0.1, "per_log_income": 0.25, "per_decade": 0.1},
+    "frequent_traveler": {"base": 0.03, "per_log_income": 0.12},
+}
+
+
+def load_distributions(path: Optional[str] = None) -> Dict:
+    distributions = json.loads(json.dumps(DEFAULT_DISTRIBUTIONS))
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            overrides = json.load(f)
+        for key, value in overrides.items():
+            if isinstance(value, dict) and isinstance(distributions.get(key), dict):
+                distributions[key].update(value)
+            else:
+                distributions[key] = value
+    return distributions
+
+
+def _choice(rng, weights: Dict, size: int):
+    names = list(weights)
+    p = np.array([weights[n] for n in names], dtype=float)
+    return np.array(names, dtype=object)[rng.choice(len(names), size=size, p=p / p.sum())]
+
+
+def _generate_block(rng, dist: Dict, size: int) -> Iterator[Dict]:
+    a = dist["age"]
+    age = np.clip(np.rint(rng.normal(a["mean"], a["std"], size)), a["min"], a["max"]).astype(int)
+
+    inc = dist["income"]
+    income = rng.lognormal(np.log(inc["median"]), inc["sigma"], size)
+    income = (np.clip(income, inc["min"], inc["max"]) // 1000 * 1000).astype(int)
+    log_income = np.log10(income / inc["median"])
+
+    m = dist["married"]
+    p_married = 1 / (1 + np.exp(-(age - m["midpoint"]) / m["scale"]))
+    married = rng.random(size) < p_married
+    divorced = married & (rng.random(size) < m["divorced_share"])
+    marital = np.where(divorced, "Divorced", np.where(married, "Married", "Single"))
+
+    d = dist["dependents"]
+    dependents = np.minimum(
+        rng.poisson(np.where(married, d["married_mean"], d["single_mean"])), d["max"]
+    )
+
+    employment = _choice(rng, dist["employment"], size)
+
+    existing = {
+        key: rng.random(size) < p for key, p in dist["existing_insurance"].items()
+    }
+
+    h = dist["health_conditions"]
+    p_none = np.interp(age, [20, 65], [h["none_at_20"], h["none_at_65"]])
+    condition = _choice(rng, h["conditions"], size)
+    health = np.where(rng.random(size) < p_none, "None", condition)
+
+    def yes_no(p):
+        return np.where(rng.random(size) < np.clip(p, 0, 1), "Yes", "No")
+
+    v, o, t = dist["vehicle"], dist["owns_property"], dist["frequent_traveler"]
+    vehicle = yes_no(v["base"] + v["per_log_income"] * (log_income + 1))
+    owns_property = yes_no(
+        o["base"] + o["per_log_income"] * (log_income + 1) + o["per_decade"] * (age - 20) / 10
+    )
+    traveler = yes_no(t["base"] + t["per_log_income"] * (log_income + 1))
+
+    for i in range(size):
+        yield {
+            "age": int(age[i]),
+            "income": int(income[i]),
+            "marital_status": str(marital[i]),
+            "dependents": int(dependents[i]),
+            "employment": str(employment[i]),
+            "existing_insurance": {key: bool(flags[i]) for key, flags in existing.items()},
+            "health_conditions": str(health[i]),
+            "vehicle": str(vehicle[i]),
+            "owns_property": str(owns_property[i]),
+            "frequent_traveler": str(traveler[i]),
+        }
+
+
+def generate_profiles(count: Optional[int] = None, seed: Optional[int] = None,
+                      distributions: Optional[Dict] = None, block_size: int = 10000) -> Iterator[Dict]:
+    """Stream realistic profile-form dicts; `count=None` streams forever.
+
+    Values are drawn in NumPy blocks, so memory stays constant regardless of count.
+    The same seed and distributions always give the same sequence.
+    """
+    rng = np.random.default_rng(seed)
+    dist = distributions or DEFAULT_DISTRIBUTIONS
+    produced = 0
+    while count is None or produced < count:
+        size = block_size if count is None else min(block_size, count - produced)
+        yield from _generate_block(rng, dist, size)
+        produced += size
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Stream synthetic customer profiles.")
+    ap.add_argument("--count", type=int, default=1000)
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--distributions", help="JSON file overriding DEFAULT_DISTRIBUTIONS")
+    ap.add_argument("--format", choices=["jsonl", "text"], default="jsonl")
+    ap.add_argument("--output", help="output file (default: stdout)")
+    args = ap.parse_args(argv)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for profile in generate_profiles(args.count, args.seed, load_distributions(args.distributions)):
+            if args.format == "jsonl":
+                out.write(json.dumps(profile) + "\n")
+            else:
+                out.write(build_profile_text(profile) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import contextvars
+import functools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+
+# ----------------------------------------
+# On-demand request profiling
+# ----------------------------------------
+# A sampling profiler for single requests. A background thread snapshots the
+# request thread's stack every PROFILE_INTERVAL_MS and the stacks are written
+# as collapsed text (flamegraph.pl / speedscope import) or speedscope JSON.
+#
+#   PROFILE_REQUESTS=1        profile every request
+#   PROFILE_SAMPLE_RATE=0.01  profile a random share of requests
+#   PROFILE_HEADER=1          profile requests carrying "X-Profile: 1"
+#   PROFILE_DIR               output directory (default ./profiling_output)
+#   PROFILE_FORMAT            collapsed | speedscope (default speedscope)
+#   PROFILE_INTERVAL_MS       sampling interval (default 5)
+#   PROFILE_MIN_MS            only keep profiles of requests at least this slow
+#   PROFILE_KEEP / PROFILE_MAX_MB   retention: newest N files, total size cap
+#
+# Triggers are read once at import. When none is set, @profiled returns the
+# function unchanged, so a disabled profiler costs nothing per call.
+
+PROFILE_HEADER_NAME = "X-Profile"
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+ALWAYS = os.getenv("PROFILE_REQUESTS", "0") == "1"
+SAMPLE_RATE = _env_float("PROFILE_SAMPLE_RATE", 0.0)
+HEADER_TRIGGER = os.getenv("PROFILE_HEADER", "0") == "1"
+ENABLED = ALWAYS or SAMPLE_RATE > 0 or HEADER_TRIGGER
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.getcwd(), "profiling_output"))
+PROFILE_FORMAT = os.getenv("PROFILE_FORMAT", "speedscope")
+INTERVAL = _env_float("PROFILE_INTERVAL_MS", 5) / 1000
+MIN_DURATION = _env_float("PROFILE_MIN_MS", 0) / 1000
+KEEP_FILES = int(_env_float("PROFILE_KEEP", 50))
+MAX_BYTES = int(_env_float("PROFILE_MAX_MB", 100) * 1024 * 1024)
+
+# Set by the web layer for the current request (see request_headers)
+_header_requested = contextvars.ContextVar("profile_header_requested", default=False)
+# Guards against nested @profiled calls opening a second profiler
+_active = contextvars.ContextVar("profile_active", default=False)
+
+
+def request_headers(headers) -> None:
+    """Record the current request's headers so a PROFILE_HEADER trigger can see them."""
+    if HEADER_TRIGGER and headers:
+        value = {k.lower(): v for k, v in dict(headers).items()}.get(PROFILE_HEADER_NAME.lower(), "")
+        _header_requested.set(str(value).strip().lower() in ("1", "true", "yes"))
+
+
+def should_profile() -> bool:
+    if _active.get():
+        return False
+    return ALWAYS or _header_requested.get() or (SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE)
+
+# ----------------------------------------
+# Sampler
+# ----------------------------------------
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer thread."""
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = INTERVAL):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+# ----------------------------------------
+# Output formats
+# ----------------------------------------
+def to_collapsed(stacks: Counter) -> str:
+    """One "root;child;leaf count" line per distinct stack (Brendan Gregg's format)."""
+    return "".join(f"{';'.join(stack)} {count}\n" for stack, count in stacks.most_common())
+
+
+def to_speedscope(stacks: Counter, name: str, interval: float) -> Dict:
+    frames, index = [], {}
+    samples, weights = [], []
+    for stack, count in stacks.items():
+        ids = []
+        for label in stack:
+            if label not in index:
+                index[label] = len(frames)
+                func, _, location = label.partition(" (")
+                file, _, line = location.rstrip(")").partition(":")
+                frames.append({"name": func, "file": file, "line": int(line) if line.isdigit() else None})
+            ids.append(index[label])
+        samples.append(ids)
+        weights.append(count * interval * 1000)
+    total = sum(weights)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{"type": "sampled", "name": name, "unit": "milliseconds", "startValue": 0,
+                      "endValue": total, "samples": samples, "weights": weights}],
+        "name": name,
+        "exporter": "profiling.py",
+    }
+
+
+def enforce_retention(directory: str, keep: Optional[int] = None, max_bytes: Optional[int] = None):
+    """Delete the oldest profiles beyond `keep` files or `max_bytes` in total."""
+    keep = KEEP_FILES if keep is None else keep
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+    entries.sort(reverse=True)
+    total = 0
+    for i, (_, size, path) in enumerate(entries):
+        total += size
+        if i >= keep or total > max_bytes:
+            os.remove(path)
+
+
+def write_profile(stacks: Counter, name: str, duration: float, directory: Optional[str] = None,
+                  fmt: Optional[str] = None, interval: float = INTERVAL) -> str:
+    directory, fmt = directory or PROFILE_DIR, fmt or PROFILE_FORMAT
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    base = os.path.join(directory, f"{stamp}_{name}_{duration * 1000:.0f}ms")
+    if fmt == "collapsed":
+        path = base + ".collapsed.txt"
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(to_collapsed(stacks))
+    else:
+        path = base + ".speedscope.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(to_speedscope(stacks, name, interval), f)
+    enforce_retention(directory)
+    return path
+
+# ----------------------------------------
+# Entry points
+# ----------------------------------------
+@contextmanager
+def profile_block(name: str, force: bool = False):
+    """Profile the enclosed block if a trigger fires (or `force`); yields a dict that gets the output path."""
+    info: Dict[str, Optional[str]] = {"path": None}
+    if not (force or should_profile()):
+        yield info
+        return
+    token = _active.set(True)
+    sampler = StackSampler().start()
+    started = time.perf_counter()
+    try:
+        yield info
+    finally:
+        stacks = sampler.stop()
+        duration = time.perf_counter() - started
+        _active.reset(token)
+        if stacks and duration >= MIN_DURATION:
+            try:
+                info["path"] = write_profile(stacks, name, duration)
+            except OSError:
+                # Profiling must never fail the request
+                pass
+
+
+def profiled(name: Optional[str] = None):
+    """Decorator: profile calls when a trigger is configured; a no-op otherwise."""
+    def decorate(func):
+        if not ENABLED:
+            return func
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with profile_block(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
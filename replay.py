@@ -0,0 +1,297 @@
+import argparse
+import contextvars
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from capture import captured, read_records
+
+# ----------------------------------------
+# Timed replay of captured traffic
+# ----------------------------------------
+# Re-drives a capture (see capture.py) through the current code at the
+# original pace (--speed 1), scaled (--speed 10 is ten times faster) or as
+# fast as the workers allow (--speed 0), and reports latency percentiles per
+# call kind and stage next to the recorded ones, plus every output that
+# diverges from what was recorded.
+#
+# The LLM is served from the recorded responses, in the order they were
+# made, so only this code's own work is timed (--llm-latency adds the
+# recorded model time back). A record captured without response text gets
+# the rules engine's recommendation (or an empty what-if answer) and is left
+# out of the divergence count. The quota scheduler, model discovery and the
+# similar-profile index are replaced by unlimited / empty ones so a replay is
+# repeatable.
+#
+# main is imported lazily so `--help` works without GEMINI_API_KEY.
+
+PERCENTILES = [50, 90, 95, 99]
+MAX_EXAMPLES = 5
+
+_responses = contextvars.ContextVar("replay_responses", default=None)
+
+
+def _next_response() -> Optional[Dict]:
+    state = _responses.get()
+    entry = state["queue"].pop(0) if state and state["queue"] else None
+    if entry is None or entry.get("text") is None:
+        if state is not None:
+            state["unrecorded"] = True
+        return None
+    if state["llm_latency"] and entry.get("duration_ms"):
+        time.sleep(entry["duration_ms"] / 1000)
+    return entry
+
+
+def _stand_in_text() -> str:
+    from main import calculate_insurance_recommendations
+
+    return calculate_insurance_recommendations(_responses.get()["profile_text"]).model_dump_json()
+
+
+def _usage_metadata(usage: Optional[Dict]) -> Dict:
+    usage = usage or {}
+    return {"input_tokens": usage.get("prompt_tokens"), "output_tokens": usage.get("completion_tokens"),
+            "total_tokens": usage.get("total_tokens")}
+
+
+class RecordedChat:
+    """Stands in for a chat model: streams the recorded what-if chunks."""
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def stream(self, prompt: str):
+        entry = _next_response()
+        return iter(entry.get("chunks") or [entry["text"]]) if entry else iter([])
+
+
+class RecordedStructured:
+    """Stands in for get_structured_llm(model): returns the recorded JSON response."""
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def invoke(self, messages):
+        from schemas import InsuranceRecommendation
+
+        entry = _next_response()
+        text = entry["text"] if entry else _stand_in_text()
+        try:
+            parsed = InsuranceRecommendation.model_validate_json(text)
+        except ValueError:
+            parsed = None
+        raw = SimpleNamespace(content=text, usage_metadata=_usage_metadata(entry and entry.get("usage")))
+        return {"raw": raw, "parsed": parsed}
+
+
+class RecordedChain:
+    """Stands in for the legacy recommendation_chain."""
+
+    def __init__(self, prompt):
+        self.prompt = prompt
+
+    def run(self, profile_text: str) -> str:
+        entry = _next_response()
+        return entry["text"] if entry else _stand_in_text()
+
+
+@contextmanager
+def recorded_llm():
+    """Point main at recorded responses and fresh, unlimited shared state."""
+    import main
+    from llm_scheduler import LLMScheduler
+    from model_router import ModelRouter
+    from similarity import SimilarityIndex
+
+    patches = {
+        "get_llm": RecordedChat,
+        "get_structured_llm": RecordedStructured,
+        "recommendation_chain": RecordedChain(main.recommendation_chain.prompt),
+        "local_backend_enabled": lambda: False,
+        "scheduler": LLMScheduler(rpm=1e9, tpm=1e12, max_queue=10 ** 9),
+        "router": ModelRouter(discover=lambda: None),
+        "similarity_index": SimilarityIndex(),
+    }
+    saved = {name: getattr(main, name) for name in patches}
+    for name, value in patches.items():
+        setattr(main, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(main, name, value)
+
+
+def diverged_fields(recorded: Optional[Dict], replayed: Optional[Dict]) -> List[str]:
+    """Output fields that differ, one level into sections and products."""
+    recorded, replayed = recorded or {}, replayed or {}
+    fields = []
+    for key in sorted(set(recorded) | set(replayed)):
+        before, after = recorded.get(key), replayed.get(key)
+        if before == after:
+            continue
+        if isinstance(before, dict) and isinstance(after, dict):
+            fields += [f"{key}.{k}" for k in sorted(set(before) | set(after)) if before.get(k) != after.get(k)]
+        else:
+            fields.append(key)
+    return fields
+
+
+def replay_record(record: Dict, llm_latency: bool = False, allow_writes: bool = False) -> Dict:
+    """Run one captured call against the current code; returns its replay record."""
+    import main
+
+    args = dict(record["args"])
+    if record["kind"] == "recommendation" and not allow_writes:
+        args["save_output"] = False
+    state = {"queue": list(record["llm"]), "unrecorded": False, "profile_text": args.get("profile_text", ""),
+             "llm_latency": llm_latency}
+    finished = []
+    token = _responses.set(state)
+    try:
+        if record["kind"] == "recommendation":
+            captured("recommendation", True, sink=finished.append)(main.get_recommendation)(**args)
+        else:
+            for _ in captured("what_if", True, sink=finished.append)(main.stream_what_if_answer)(**args):
+                pass
+    finally:
+        _responses.reset(token)
+    replayed = finished[0]
+    replayed["unrecorded_llm"] = state["unrecorded"]
+    return replayed
+
+
+def _percentiles(values: List[float]) -> Dict:
+    if not values:
+        return {}
+    result = dict(zip([f"p{p}" for p in PERCENTILES], np.percentile(values, PERCENTILES).round(3).tolist()))
+    result["max"] = round(float(max(values)), 3)
+    return result
+
+
+def replay(records: List[Dict], speed: float = 1.0, workers: int = 8, llm_latency: bool = False,
+           allow_writes: bool = False) -> Dict:
+    """Re-drive `records` in their original order at `speed` × the recorded pace (0: unthrottled)."""
+    records = sorted(records, key=lambda r: r["started_at"])
+    results: List[Optional[Dict]] = [None] * len(records)
+    errors = Counter()
+    lock = threading.Lock()
+    in_flight = threading.BoundedSemaphore(workers * 2)
+
+    def run(i):
+        try:
+            results[i] = replay_record(records[i], llm_latency, allow_writes)
+        except Exception as e:
+            with lock:
+                errors[type(e).__name__] += 1
+        finally:
+            in_flight.release()
+
+    origin = records[0]["started_at"] if records else 0
+    started = time.perf_counter()
+    with recorded_llm(), ThreadPoolExecutor(max_workers=workers) as pool:
+        for i, record in enumerate(records):
+            if speed > 0:
+                delay = started + (record["started_at"] - origin) / speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            in_flight.acquire()
+            pool.submit(run, i)
+    duration = time.perf_counter() - started
+
+    by_kind: Dict[str, Dict] = {}
+    field_counts = Counter()
+    examples = []
+    unrecorded = divergences = 0
+    for i, (record, replayed) in enumerate(zip(records, results)):
+        if replayed is None:
+            continue
+        kind = by_kind.setdefault(record["kind"], {"recorded": [], "replay": [], "stages": {}})
+        kind["recorded"].append(record["duration_ms"])
+        kind["replay"].append(replayed["duration_ms"])
+        for name, ms in replayed["stages"].items():
+            kind["stages"].setdefault(name, []).append(ms)
+        if replayed["unrecorded_llm"]:
+            unrecorded += 1
+            continue
+        fields = diverged_fields(record["output"], replayed["output"])
+        if fields:
+            divergences += 1
+            field_counts.update(fields)
+            if len(examples) < MAX_EXAMPLES:
+                examples.append({"index": i, "kind": record["kind"], "fields": fields,
+                                 "recorded": record["output"], "replayed": replayed["output"]})
+
+    return {
+        "records": len(records),
+        "replayed": sum(r is not None for r in results),
+        "errors": dict(errors),
+        "speed": speed,
+        "recorded_span_s": round(records[-1]["started_at"] - origin, 3) if records else 0,
+        "duration_s": round(duration, 3),
+        "by_kind": {
+            name: {
+                "count": len(data["replay"]),
+                "recorded_ms": _percentiles(data["recorded"]),
+                "replay_ms": _percentiles(data["replay"]),
+                "stages_ms": {stage: _percentiles(values) for stage, values in sorted(data["stages"].items())},
+            }
+            for name, data in sorted(by_kind.items())
+        },
+        "unrecorded_llm": unrecorded,
+        "divergences": divergences,
+        "diverged_fields": dict(field_counts.most_common()),
+        "examples": examples,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Replay captured traffic against the current code.")
+    ap.add_argument("capture", help="capture file or directory (CAPTURE_DIR)")
+    ap.add_argument("--speed", type=float, default=1.0, help="pace multiplier (1 = original, 0 = unthrottled)")
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--limit", type=int, default=0, help="replay only the first N records")
+    ap.add_argument("--kind", choices=["recommendation", "what_if"], help="replay one kind of call only")
+    ap.add_argument("--llm-latency", action="store_true", help="sleep the recorded LLM time on each call")
+    ap.add_argument("--allow-writes", action="store_true", help="let recommendations save their text output")
+    ap.add_argument("--workdir", help="directory for rendered charts (default: a temporary directory)")
+    ap.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = ap.parse_args(argv)
+
+    records = [r for r in read_records(args.capture) if args.kind in (None, r["kind"])]
+    if args.limit:
+        records = records[:args.limit]
+    os.chdir(args.workdir or tempfile.mkdtemp(prefix="replay_"))
+    report = replay(records, args.speed, args.workers, args.llm_latency, args.allow_writes)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+        return
+    print(f"Replayed {report['replayed']}/{report['records']} records in {report['duration_s']}s "
+          f"(recorded over {report['recorded_span_s']}s, speed {report['speed']})")
+    if report["errors"]:
+        print(f"Errors: {report['errors']}")
+    for name, data in report["by_kind"].items():
+        print(f"\n{name} ({data['count']} calls)")
+        print("  recorded ms: " + ", ".join(f"{k}={v}" for k, v in data["recorded_ms"].items()))
+        print("  replay ms:   " + ", ".join(f"{k}={v}" for k, v in data["replay_ms"].items()))
+        for stage, values in data["stages_ms"].items():
+            print(f"    {stage}: p50={values['p50']} p95={values['p95']}")
+    print(f"\nDivergences: {report['divergences']} "
+          f"({report['unrecorded_llm']} records without LLM responses not compared)")
+    for field, count in report["diverged_fields"].items():
+        print(f"  {field}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from html import escape
+from itertools import islice
+from string import Template
+from typing import Dict, Iterator, List, Optional
+
+from chart_data import affordability_chart_data, coverage_adequacy_data, coverage_vs_income_chart_data
+from matching import RECOMMENDATION_CATEGORIES
+
+# ----------------------------------------
+# Bulk customer report packs (HTML / PDF)
+# ----------------------------------------
+# Renders the records written by batch_score.py. Templates are compiled once
+# at import, the stylesheet is written once per output directory and linked
+# (or loaded once per worker for PDF), charts are inline SVG built from
+# chart_data, and records are streamed in bounded chunks so memory stays flat
+# however many reports are generated.
+
+CSS_FILENAME = "report.css"
+
+REPORT_CSS = """\
+body { font-family: Helvetica, Arial, sans-serif; color: #222; margin: 2em auto; max-width: 860px; }
+h1 { font-size: 1.6em; border-bottom: 3px solid #2196f3; padding-bottom: .3em; }
+h2 { font-size: 1.2em; margin-top: 1.6em; color: #1565c0; }
+table { border-collapse: collapse; width: 100%; margin: .6em 0; font-size: .9em; }
+th, td { border: 1px solid #ddd; padding: .4em .6em; text-align: left; vertical-align: top; }
+th { background: #f5f5f5; }
+.profile td:first-child { width: 30%; color: #555; }
+.charts { display: flex; flex-wrap: wrap; gap: 1em; }
+.charts figure { margin: 0; }
+.muted { color: #777; font-size: .85em; }
+.tag { display: inline-block; padding: 0 .5em; border-radius: 3px; background: #e3f2fd; font-size: .8em; }
+@media print { body { margin: 0; } h2 { page-break-after: avoid; } table { page-break-inside: avoid; } }
+"""
+
+PAGE_TEMPLATE = Template("""\
+<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Insurance Recommendation - $customer</title>
+$stylesheet
+</head>
+<body>
+<h1>Insurance Recommendation Report</h1>
+<p class="muted">Customer: $customer &middot; Generated: $generated</p>
+<h2>Your Profile</h2>
+<table class="profile">$profile_rows</table>
+<h2>Recommended Cover</h2>
+<table>
+<tr><th>Insurance</th><th>Coverage</th><th>Estimated Premium</th><th>Why</th><th>Add-ons</th></tr>
+$section_rows
+</table>
+<p><b>Affordability check:</b> $affordability</p>
+<h2>Charts</h2>
+<div class="charts">$charts</div>
+<h2>Suggested Products</h2>
+$product_tables
+<h2>Additional Advice</h2>
+<ul>$advice</ul>
+<h2>Products to Avoid</h2>
+<ul>$avoid</ul>
+</body>
+</html>
+""")
+
+SECTION_ROW = Template(
+    "<tr><td>$label $priority</td><td>$coverage</td><td>$premium</td><td>$reason</td><td>$add_ons</td></tr>")
+PRODUCT_TABLE = Template(
+    "<h3>$category</h3><table><tr><th>Company</th><th>Plan</th><th>CSR</th>"
+    "<th>Score</th></tr>$rows</table>")
+PRODUCT_ROW = Template("<tr><td>$company</td><td>$plans</td><td>$csr</td><td>$score</td></tr>")
+PROFILE_ROW = Template("<tr><td>$label</td><td>$value</td></tr>")
+FIGURE = Template('<figure><svg xmlns="http://www.w3.org/2000/svg" width="$width" height="$height" '
+                  'viewBox="0 0 $width $height" font-size="11">$body</svg><figcaption class="muted">$title</figcaption></figure>')
+
+PROFILE_LABELS = [("age", "Age"), ("income", "Monthly Income"), ("marital_status", "Marital Status"),
+                  ("dependents", "Dependents"), ("employment", "Employment"),
+                  ("health_conditions", "Health Conditions"), ("vehicle", "Vehicle"),
+                  ("owns_property", "Owns Property"), ("frequent_traveler", "Frequent Traveler")]
+
+# ----------------------------------------
+# Inline SVG charts (from the shared chart-data layer)
+# ----------------------------------------
+def svg_affordability(data: Dict) -> str:
+    """Stacked bar of the premium split with a legend."""
+    width, bar_w = 320, 300
+    body, x = [], 10
+    for label, pct, color in zip(data["labels"], data["percentages"], data["colors"]):
+        w = bar_w * pct / 100
+        body.append(f'<rect x="{x:.1f}" y="10" width="{w:.1f}" height="28" fill="{color}"/>')
+        x += w
+    for i, (label, pct, color) in enumerate(zip(data["labels"], data["percentages"], data["colors"])):
+        y = 58 + i * 16
+        body.append(f'<rect x="10" y="{y - 9}" width="10" height="10" fill="{color}"/>'
+                    f'<text x="26" y="{y}">{escape(label)} ({pct}%)</text>')
+    return FIGURE.substitute(width=width, height=64 + 16 * len(data["labels"]), body="".join(body),
+                             title=escape(data["title"]))
+
+
+def svg_coverage_vs_income(data: Dict) -> str:
+    """Coverage bars with the annual-income reference line."""
+    width, height, base, top = 320, 200, 170, 20
+    scale = (base - top) / data["y_max"] if data["y_max"] else 0
+    body = []
+    for i, (label, value, color, text) in enumerate(zip(data["labels"], data["values"], data["colors"], data["value_labels"])):
+        x, h = 50 + i * 130, value * scale
+        body.append(f'<rect x="{x}" y="{base - h:.1f}" width="90" height="{h:.1f}" fill="{color}"/>'
+                    f'<text x="{x + 45}" y="{base - h - 4:.1f}" text-anchor="middle">{escape(text)}</text>'
+                    f'<text x="{x + 45}" y="{base + 14}" text-anchor="middle">{escape(label)}</text>')
+    y = base - data["annual_income"] * scale
+    body.append(f'<line x1="30" x2="310" y1="{y:.1f}" y2="{y:.1f}" stroke="#f44336" stroke-dasharray="5,3"/>'
+                f'<text x="310" y="{y - 4:.1f}" text-anchor="end" fill="#f44336">{escape(data["income_label"])}</text>')
+    return FIGURE.substitute(width=width, height=height, body="".join(body), title=escape(data["title"]))
+
+
+def svg_adequacy(data: Dict) -> str:
+    """Horizontal gauge, 0-120% with the 100% target marked."""
+    width, bar_w = 320, 300
+    full = bar_w * data["adequacy_pct"] / 120
+    target = 10 + bar_w * 100 / 120
+    body = (f'<rect x="10" y="10" width="{bar_w}" height="24" fill="#eee"/>'
+            f'<rect x="10" y="10" width="{full:.1f}" height="24" fill="{data["color"]}"/>'
+            f'<line x1="{target:.1f}" x2="{target:.1f}" y1="6" y2="38" stroke="#222"/>'
+            f'<text x="10" y="54">{escape(data["label"])} - {escape(data["coverage_text"])}, '
+            f'{escape(data["recommended_text"])}</text>')
+    return FIGURE.substitute(width=width, height=64, body=body, title=escape(data["title"]))
+
+# ----------------------------------------
+# Rendering
+# ----------------------------------------
+def _list_items(items) -> str:
+    return "".join(f"<li>{escape(str(item))}</li>" for item in items or []) or "<li>None</li>"
+
+
+def render_report_html(record: Dict, stylesheet: str = f'<link rel="stylesheet" href="{CSS_FILENAME}">') -> str:
+    """Fill the page template for one batch_score record."""
+    rec, profile = record["recommendation"], record.get("profile", {})
+    income = profile.get("income", 0)
+
+    section_rows = []
+    for field, (_, label) in RECOMMENDATION_CATEGORIES.items():
+        section = rec.get(field)
+        if section:
+            section_rows.append(SECTION_ROW.substitute(
+                label=escape(label),
+                priority=f'<span class="tag">{escape(section["priority"])}</span>' if section.get("priority") else "",
+                coverage=escape(section["coverage"]), premium=escape(section["estimated_premium"]),
+                reason=escape(section["reason"]), add_ons=escape(", ".join(section.get("add_ons") or []) or "None")))
+
+    product_tables = []
+    for category, products in (record.get("products") or {}).items():
+        rows = "".join(PRODUCT_ROW.substitute(
+            company=escape(p["company"]), plans=escape(", ".join(p["plans"])), csr=escape(str(p.get("csr") or "-")),
+            score=p["score"]) for p in products)
+        product_tables.append(PRODUCT_TABLE.substitute(category=escape(category), rows=rows))
+
+    term_premium, health_premium = record.get("term_premium", 0), record.get("health_premium", 0)
+    term_coverage, health_coverage = record.get("term_coverage", 0), record.get("health_coverage", 0)
+    charts = [
+        svg_affordability(affordability_chart_data(term_premium, health_premium, income)),
+        svg_coverage_vs_income(coverage_vs_income_chart_data(term_coverage, health_coverage, income)),
+        svg_adequacy(coverage_adequacy_data(term_coverage + health_coverage, income * 12)),
+    ]
+
+    profile_rows = "".join(PROFILE_ROW.substitute(
+        label=label, value=escape(f"₹{profile[key]:,}" if key == "income" else str(profile[key])))
+        for key, label in PROFILE_LABELS if key in profile)
+
+    return PAGE_TEMPLATE.substitute(
+        customer=escape(str(record.get("id", record.get("row", "")))),
+        generated=datetime.now().strftime("%Y-%m-%d %H:%M"),
+        stylesheet=stylesheet,
+        profile_rows=profile_rows,
+        section_rows="\n".join(section_rows),
+        affordability=escape(rec.get("premium_affordability_check") or "-"),
+        charts="".join(charts),
+        product_tables="\n".join(product_tables) or "<p>No matching products.</p>",
+        advice=_list_items(rec.get("additional_advice")),
+        avoid=_list_items(rec.get("products_to_avoid")),
+    )
+
+
+def report_filename(record: Dict, fmt: str) -> str:
+    """report_<id>.<fmt>; an id that needed sanitizing gets a short hash of the raw id,
+    so "cust/42" and "cust_42" do not overwrite each other."""
+    raw = str(record.get("id", record.get("row")))
+    customer = "".join(c if c.isalnum() or c in "-_" else "_" for c in raw)
+    if customer != raw:
+        customer += "_" + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:8]
+    return f"report_{customer}.{fmt}"
+
+
+# Per-worker PDF state: the stylesheet is parsed once per process, not per report
+_pdf_stylesheet = None
+
+
+def _write_pdf(html_text: str, path: str, css_path: str):
+    global _pdf_stylesheet
+    try:
+        from weasyprint import CSS, HTML
+    except ImportError:
+        raise RuntimeError("PDF output needs weasyprint (pip install weasyprint)")
+    if _pdf_stylesheet is None:
+        _pdf_stylesheet = CSS(filename=css_path)
+    HTML(string=html_text).write_pdf(path, stylesheets=[_pdf_stylesheet])
+
+
+def render_one(task) -> Dict:
+    record, output_dir, fmt = task
+    path = os.path.join(output_dir, report_filename(record, fmt))
+    try:
+        if "error" in record:
+            raise ValueError(f"record was not scored: {record['error']}")
+        if fmt == "pdf":
+            # The stylesheet is attached by the PDF writer, not linked
+            _write_pdf(render_report_html(record, stylesheet=""), path, os.path.join(output_dir, CSS_FILENAME))
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(render_report_html(record))
+        return {"id": record.get("id"), "path": path}
+    except Exception as e:
+        return {"id": record.get("id"), "error": str(e)}
+
+# ----------------------------------------
+# Bulk driver
+# ----------------------------------------
+def read_records(path: str) -> Iterator[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_shared_assets(output_dir: str) -> str:
+    os.makedirs(output_dir, exist_ok=True)
+    css_path = os.path.join(output_dir, CSS_FILENAME)
+    with open(css_path, "w", encoding="utf-8") as f:
+        f.write(REPORT_CSS)
+    return css_path
+
+
+def render_reports(records_path: str, output_dir: str, fmt: str = "html", workers: Optional[int] = None,
+                   chunk_size: int = 500, limit: Optional[int] = None) -> Dict:
+    """Render one report per record; at most `chunk_size` records are in memory at a time."""
+    write_shared_assets(output_dir)
+    workers = workers or os.cpu_count() or 4
+    records = islice(read_records(records_path), limit)
+    written, errors = 0, []
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            chunk = [(record, output_dir, fmt) for record in islice(records, chunk_size)]
+            if not chunk:
+                break
+            for result in pool.map(render_one, chunk, chunksize=max(1, len(chunk) // (workers * 4))):
+                if "error" in result:
+                    errors.append(result)
+                else:
+                    written += 1
+
+    return {"written": written, "errors": len(errors), "first_errors": errors[:5],
+            "duration_s": round(time.perf_counter() - started, 3), "output_dir": output_dir}
+
+
+def main(argv: List[str] = None):
+    ap = argparse.ArgumentParser(description="Render customer report packs from batch_score.py output.")
+    ap.add_argument("records", help="JSONL written by batch_score.py")
+    ap.add_argument("output_dir")
+    ap.add_argument("--format", choices=["html", "pdf"], default="html")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--chunk-size", type=int, default=500)
+    ap.add_argument("--limit", type=int, default=None)
+    args = ap.parse_args(argv)
+
+    summary = render_reports(args.records, args.output_dir, args.format, args.workers, args.chunk_size, args.limit)
+    print(json.dumps(summary), file=sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
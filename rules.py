@@ -0,0 +1,185 @@
+from typing import Dict, Optional
+
+import numpy as np
+
+from premiums import quote_premium, quote_premiums
+from schemas import InsuranceDetails, InsuranceRecommendation
+
+# ----------------------------------------
+# Rules-engine constants
+# ----------------------------------------
+TERM_MULTIPLIER_WITH_DEPENDENTS = 15
+TERM_MULTIPLIER_NO_DEPENDENTS = 10
+TERM_COVERAGE_CAP = 20000000          # 2 crores
+HEALTH_COVERAGE_UNDER_40 = 1000000    # 10 lakhs
+HEALTH_COVERAGE_40_PLUS = 1500000     # 15 lakhs
+VEHICLE_COVERAGE = 500000
+PERSONAL_ACCIDENT_COVERAGE = 2500000
+AFFORDABLE_SHARE_OF_INCOME = 0.1      # of annual income, for the total annual premium
+AFFORDABILITY_CHECKS = {True: "Premiums are affordable",
+                        False: "Premiums may be high - consider lower coverage options"}
+
+# ----------------------------------------
+# 1. Profile parsing
+# ----------------------------------------
+def parse_profile_text(profile_text: str) -> Dict:
+    """Parse the profile text block into typed values (defaults match the rules engine)."""
+    profile_data = {}
+    for line in profile_text.strip().split('\n'):
+        if ':' in line:
+            key, value = line.split(':', 1)
+            profile_data[key.strip()] = value.strip()
+
+    return {
+        "age": int(profile_data.get('Age', '35')),
+        "income": int(profile_data.get('Monthly Income', '₹75000').replace('₹', '')),
+        "marital_status": profile_data.get('Marital Status', 'Married'),
+        "dependents": int(profile_data.get('Dependents', '2')),
+        "employment": profile_data.get('Employment', 'Private Job'),
+        "existing_insurance": profile_data.get('Existing Insurance', ''),
+        "health_conditions": profile_data.get('Health Conditions', 'None'),
+        "vehicle": profile_data.get('Vehicle', 'Yes'),
+        "owns_property": profile_data.get('Owns Property', 'Yes'),
+        "frequent_traveler": profile_data.get('Frequent Traveler', 'No'),
+    }
+
+# ----------------------------------------
+# 2. Numeric rules
+# ----------------------------------------
+def compute_rule_figures(profile: Dict, term_coverage: Optional[int] = None,
+                         health_coverage: Optional[int] = None) -> Dict:
+    """Compute coverages, annual premiums and affordability for a parsed profile.
+
+    `term_coverage` / `health_coverage` override the rule-based amounts (used by
+    what-if scenarios such as "increase health coverage to ₹15 lakhs").
+    """
+    age = profile["age"]
+    income = profile["income"]
+    dependents = profile["dependents"]
+
+    # Term insurance coverage (typically 10-20x annual income)
+    annual_income = income * 12
+    term_multiplier = TERM_MULTIPLIER_WITH_DEPENDENTS if dependents > 0 else TERM_MULTIPLIER_NO_DEPENDENTS
+    if term_coverage is None:
+        term_coverage = min(annual_income * term_multiplier, TERM_COVERAGE_CAP)
+
+    # Premiums come from the rate tables (age band × cover band × health loading)
+    condition = profile.get("health_conditions", "None")
+    term_premium = quote_premium("term", age, term_coverage, condition)
+
+    # Health insurance coverage: 10-15 lakhs based on age
+    if health_coverage is None:
+        health_coverage = HEALTH_COVERAGE_UNDER_40 if age < 40 else HEALTH_COVERAGE_40_PLUS
+    health_premium = quote_premium("health", age, health_coverage, condition)
+
+    has_vehicle = profile.get("vehicle") == "Yes"
+    vehicle_premium = quote_premium("vehicle", age, VEHICLE_COVERAGE) if has_vehicle else 0
+    personal_accident_premium = quote_premium("personal_accident", age, PERSONAL_ACCIDENT_COVERAGE)
+
+    total_premium = term_premium + health_premium + vehicle_premium + personal_accident_premium
+    return {
+        "annual_income": annual_income,
+        "term_multiplier": term_multiplier,
+        "term_coverage": term_coverage,
+        "term_premium": term_premium,
+        "health_coverage": health_coverage,
+        "health_premium": health_premium,
+        "has_vehicle": has_vehicle,
+        "vehicle_premium": vehicle_premium,
+        "personal_accident_premium": personal_accident_premium,
+        "total_premium": total_premium,
+        "affordable": total_premium < annual_income * AFFORDABLE_SHARE_OF_INCOME,
+    }
+
+def compute_rule_arrays(age, income, dependents, has_vehicle=True, health_conditions=None) -> Dict:
+    """Vectorized compute_rule_figures: the same rules evaluated over NumPy arrays.
+
+    Inputs broadcast against each other, so meshgrids of age/income/dependents
+    are evaluated in one pass.
+    """
+    age, income, dependents = np.broadcast_arrays(
+        np.asarray(age, dtype=float), np.asarray(income, dtype=float), np.asarray(dependents)
+    )
+    annual_income = income * 12
+    term_multiplier = np.where(dependents > 0, TERM_MULTIPLIER_WITH_DEPENDENTS, TERM_MULTIPLIER_NO_DEPENDENTS)
+    term_coverage = np.minimum(annual_income * term_multiplier, TERM_COVERAGE_CAP)
+    if health_conditions is not None:
+        health_conditions = np.broadcast_to(np.asarray(health_conditions, dtype=object), age.shape)
+    term_premium = quote_premiums("term", age, term_coverage, health_conditions)
+    health_coverage = np.where(age < 40, HEALTH_COVERAGE_UNDER_40, HEALTH_COVERAGE_40_PLUS)
+    health_premium = quote_premiums("health", age, health_coverage, health_conditions)
+    vehicle_premium = np.where(has_vehicle, quote_premiums("vehicle", age, VEHICLE_COVERAGE), 0)
+    personal_accident_premium = quote_premiums("personal_accident", age, PERSONAL_ACCIDENT_COVERAGE)
+    total_premium = term_premium + health_premium + vehicle_premium + personal_accident_premium
+    return {
+        "annual_income": annual_income,
+        "term_multiplier": term_multiplier,
+        "term_coverage": term_coverage,
+        "term_premium": term_premium,
+        "health_coverage": health_coverage,
+        "health_premium": health_premium,
+        "vehicle_premium": vehicle_premium,
+        "total_premium": total_premium,
+        "affordable": total_premium < annual_income * AFFORDABLE_SHARE_OF_INCOME,
+    }
+
+# ----------------------------------------
+# 3. Rules-engine recommendation
+# ----------------------------------------
+def calculate_insurance_recommendations(profile_text: str):
+    """Calculate insurance recommendations based on profile data using rules."""
+
+    profile = parse_profile_text(profile_text)
+    figures = compute_rule_figures(profile)
+    dependents = profile["dependents"]
+    term_coverage = figures["term_coverage"]
+    term_premium = figures["term_premium"]
+    health_coverage = figures["health_coverage"]
+    health_premium = figures["health_premium"]
+
+    # Create recommendation object
+    term_insurance = InsuranceDetails(
+        coverage_inr=term_coverage,
+        annual_premium_inr=term_premium,
+        reason=f"Provides financial security for {'family' if dependents > 0 else 'your future'}",
+        add_ons=["Critical Illness Rider", "Waiver of Premium"],
+        priority="must-have"
+    )
+
+    health_insurance = InsuranceDetails(
+        coverage_inr=health_coverage,
+        annual_premium_inr=health_premium,
+        reason="Covers medical expenses and hospitalization",
+        add_ons=["Maternity Cover" if dependents > 0 else "OPD Cover", "Critical Illness"],
+        priority="must-have"
+    )
+
+    vehicle_insurance = InsuranceDetails(
+        coverage_inr=VEHICLE_COVERAGE,
+        annual_premium_inr=figures["vehicle_premium"],
+        reason="Protects vehicle from damage and theft",
+        add_ons=["Zero Depreciation", "Roadside Assistance"],
+        priority="recommended"
+    ) if figures["has_vehicle"] else None
+
+    personal_accident_cover = InsuranceDetails(
+        coverage_inr=PERSONAL_ACCIDENT_COVERAGE,
+        annual_premium_inr=figures["personal_accident_premium"],
+        reason="Accident protection and disability coverage",
+        add_ons=["Permanent Disability", "Temporary Disability"],
+        priority="recommended"
+    )
+
+    affordability = AFFORDABILITY_CHECKS[figures["affordable"]]
+
+    return InsuranceRecommendation(
+        term_insurance=term_insurance,
+        health_insurance=health_insurance,
+        vehicle_insurance=vehicle_insurance,
+        property_insurance=None,
+        travel_insurance=None,
+        personal_accident_cover=personal_accident_cover,
+        premium_affordability_check=affordability,
+        additional_advice=["Consider increasing coverage as income grows", "Review coverage annually"],
+        products_to_avoid=["High-commission products", "Products with low claim settlement ratio"]
+    )
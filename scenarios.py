@@ -0,0 +1,265 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from rules import AFFORDABLE_SHARE_OF_INCOME, TERM_COVERAGE_CAP, compute_rule_figures, parse_profile_text
+from schemas import format_inr
+
+# ----------------------------------------
+# Deterministic what-if engine: parametric questions ("income increases by
+# 20%", "add 2 more dependents", "increase health coverage to ₹15 lakhs") are
+# parsed into profile deltas and re-run through the rules engine. A question
+# it cannot fully parse (words left over beyond the deltas, e.g. "and get
+# diabetes", "which insurer is best"), that changes a field the rules ignore
+# (getting married), or whose deltas leave every rules input as it is, returns
+# None so the caller can fall back to the LLM.
+# ----------------------------------------
+
+AMOUNT = r"₹?\s*(\d+(?:\.\d+)?)\s*(crores?|cr|lakhs?|lacs?|l|k|thousand)?\b"
+UNITS = {"crore": 1e7, "crores": 1e7, "cr": 1e7, "lakh": 1e5, "lakhs": 1e5, "lac": 1e5,
+         "lacs": 1e5, "l": 1e5, "k": 1e3, "thousand": 1e3}
+WORD_NUMBERS = {"a": 1, "an": 1, "one": 1, "another": 1, "two": 2, "three": 3, "four": 4, "five": 5}
+
+UP_WORDS = r"(?:increase|rise|grow|go(?:es)? up|jump|raise|hike|climb)"
+DOWN_WORDS = r"(?:decrease|drop|fall|reduce|cut|go(?:es)? down|decline|shrink)"
+INCOME = r"(?:income|salary|pay)"
+RAISE_WORDS = r"raise|hike|increment|promotion"
+
+# Words a fully parsed question may contain besides the matched phrases
+FILLER_WORDS = {
+    "what", "if", "i", "my", "me", "we", "our", "the", "a", "an", "and", "also", "then", "so", "now", "by",
+    "to", "of", "in", "on", "at", "for", "with", "from", "more", "will", "would", "should", "could", "can",
+    "happen", "happens", "happened", "does", "do", "did", "is", "are", "was", "were", "be", "been", "get",
+    "gets", "got", "have", "has", "had", "how", "much", "it", "this", "that", "about", "change", "changes",
+    "affect", "affects", "cover", "coverage", "insurance", "premium", "premiums", "plan", "plans",
+    "recommendation", "recommendations", "when", "am", "suppose", "say", "let", "lets", "s", "next", "year",
+    "month", "monthly", "annual", "total", "new", "increase", "increases", "decrease", "decreases", "raise",
+    "reduce", "went", "goes", "go", "up", "down", "instead", "still",
+    # Contraction tails ("I'm", "we're", "I'll", "I've"); "n't" is never filler
+    "m", "re", "ll", "ve",
+}
+# Profile fields the rules engine reads; a question changing none of them goes to the LLM
+RULE_INPUTS = ["income", "dependents", "age", "vehicle", "health_conditions"]
+MIN_AGE, MAX_AGE = 18, 100
+MAX_DEPENDENTS = 10
+
+# Fields compared in the before/after diff, with display labels
+DIFF_FIELDS = {
+    "term_multiplier": "term coverage multiplier",
+    "term_coverage": "term cover",
+    "term_premium": "term premium",
+    "health_coverage": "health cover",
+    "health_premium": "health premium",
+    "vehicle_premium": "vehicle premium",
+    "total_premium": "total annual premium",
+    "affordable": "affordability",
+}
+
+
+def parse_amount(number: str, unit: Optional[str]) -> int:
+    return int(float(number) * UNITS.get((unit or "").lower(), 1))
+
+
+def _count(token: str) -> int:
+    return int(token) if token.isdigit() else WORD_NUMBERS.get(token, 1)
+
+
+def parse_what_if(query: str) -> List[Dict]:
+    """Parse a what-if question into a list of profile deltas ({field, op, value})."""
+    return parse_what_if_with_leftover(query)[0]
+
+
+def parse_what_if_with_leftover(query: str) -> Tuple[List[Dict], List[str]]:
+    """(deltas, leftover words): the words of the question no delta accounts for,
+    besides FILLER_WORDS."""
+    q = query.lower().replace(",", "")
+    deltas = []
+    spans = []
+
+    def search(pattern):
+        m = re.search(pattern, q)
+        if m:
+            spans.append(m.span())
+        return m
+
+    # --- Income ---
+    m = (search(rf"{INCOME}\b[^%?]*?\b({UP_WORDS}|{DOWN_WORDS})\w*\b[^%\d?]*?(\d+(?:\.\d+)?)\s*%")
+         or search(rf"(\d+(?:\.\d+)?)\s*%\s*({UP_WORDS}|{DOWN_WORDS}|increment|reduction)\w*\b[^?]*?\b{INCOME}")
+         or search(rf"(\d+(?:\.\d+)?)\s*%\s*{INCOME}\s+({UP_WORDS}|{DOWN_WORDS}|increment|reduction)")
+         # "a raise of 20%", "a 10% hike": raises are always about pay
+         or search(rf"\b({RAISE_WORDS})\s+of\s+(\d+(?:\.\d+)?)\s*%")
+         or search(rf"(\d+(?:\.\d+)?)\s*%\s+({RAISE_WORDS})\b"))
+    if m:
+        words, pct = (m.group(1), m.group(2)) if not m.group(1)[0].isdigit() else (m.group(2), m.group(1))
+        sign = -1 if re.match(DOWN_WORDS + "|reduction", words) else 1
+        deltas.append({"field": "income", "op": "scale", "value": 1 + sign * float(pct) / 100})
+    elif search(rf"{INCOME}\b[^?]*?\bdoubles?\b"):
+        deltas.append({"field": "income", "op": "scale", "value": 2.0})
+    elif search(rf"{INCOME}\b[^?]*?\bhalve[sd]?\b"):
+        deltas.append({"field": "income", "op": "scale", "value": 0.5})
+    else:
+        m = search(rf"{INCOME}\b[^₹\d?]*?\b({UP_WORDS}|{DOWN_WORDS})\w*\s+by\s+{AMOUNT}")
+        if m:
+            sign = -1 if re.match(DOWN_WORDS, m.group(1)) else 1
+            deltas.append({"field": "income", "op": "add", "value": sign * parse_amount(m.group(2), m.group(3))})
+        else:
+            m = search(rf"{INCOME}\b[^₹\d?]*?\b(?:to|becomes|is|of)\s+{AMOUNT}")
+            if m:
+                deltas.append({"field": "income", "op": "set", "value": parse_amount(m.group(1), m.group(2))})
+
+    # --- Dependents ---
+    kids = r"(?:dependents?|kids?|children|child|bab(?:y|ies))"
+    # "have 2 kids" sets the count; "have 2 more kids" / "add 2 kids" adds to it
+    m = search(rf"\b(?:had|have|with)\s+(\d+|one|two|three|four|five)\s+{kids}\b")
+    if m:
+        deltas.append({"field": "dependents", "op": "set", "value": _count(m.group(1))})
+    else:
+        m = search(rf"\b(?:add|have|get|adopt|support)\w*\s+(\d+|a|an|one|two|three|four|five|another)\s+"
+                   rf"(?:more\s+|additional\s+|new\s+|extra\s+)?{kids}\b")
+        if m:
+            deltas.append({"field": "dependents", "op": "add", "value": _count(m.group(1))})
+        else:
+            m = search(rf"\b(\d+|one|two|three|four)\s+(?:fewer|less)\s+{kids}")
+            if m:
+                deltas.append({"field": "dependents", "op": "add", "value": -_count(m.group(1))})
+            elif search(rf"\b(?:no|zero)\s+(?:more\s+)?{kids}"):
+                deltas.append({"field": "dependents", "op": "set", "value": 0})
+
+    # --- Age ---
+    m = search(r"\b(?:turn|at age|age of|when i(?:'m| am)|i(?:'m| am))\s*(\d{2})\b(?:\s+years?\s+old\b)?")
+    if m:
+        deltas.append({"field": "age", "op": "set", "value": int(m.group(1))})
+    else:
+        m = search(r"\b(?:in|after)\s+(\d+)\s+years\b|\b(\d+)\s+years\s+older\b")
+        if m:
+            deltas.append({"field": "age", "op": "add", "value": int(m.group(1) or m.group(2))})
+
+    # --- Coverage overrides ---
+    for kind in ("health", "term"):
+        m = search(rf"\b{kind}\s+(?:insurance\s+|life\s+)?(?:coverage|cover|sum insured|sum assured)\b"
+                      rf"[^₹\d?]*?\b(?:to|of)\s+{AMOUNT}")
+        if m:
+            deltas.append({"field": f"{kind}_coverage", "op": "set", "value": parse_amount(m.group(1), m.group(2))})
+
+    # --- Vehicle / marital status ---
+    if search(r"\b(?:buy|get|purchase)\w*\s+(?:a\s+|an\s+|another\s+)?(?:new\s+)?(?:car|vehicle|bike|scooter)\b"):
+        deltas.append({"field": "vehicle", "op": "set", "value": "Yes"})
+    elif search(r"\b(?:sell|no longer (?:have|own)|don't (?:have|own))\w*\s+(?:my\s+|a\s+|the\s+)?(?:car|vehicle|bike)\b"):
+        deltas.append({"field": "vehicle", "op": "set", "value": "No"})
+    if search(r"\bget(?:ting)? married\b|\bmarry\b"):
+        deltas.append({"field": "marital_status", "op": "set", "value": "Married"})
+
+    leftover = q
+    for start, end in sorted(spans, reverse=True):
+        leftover = leftover[:start] + " " + leftover[end:]
+    words = [w for w in re.findall(r"[a-z]+", leftover) if w not in FILLER_WORDS]
+    return deltas, words
+
+
+def apply_deltas(profile: Dict, deltas: List[Dict]):
+    """Return (new_profile, coverage_overrides) after applying the parsed deltas.
+    Numbers are clamped to valid values (income and cover ≥ 0, age and dependents in range)."""
+    profile = dict(profile)
+    overrides = {}
+    for delta in deltas:
+        field, op, value = delta["field"], delta["op"], delta["value"]
+        if field.endswith("_coverage"):
+            overrides[field] = max(int(value), 0)
+        elif op == "scale":
+            profile[field] = int(round(profile[field] * value))
+        elif op == "add":
+            profile[field] = profile[field] + value
+        else:
+            profile[field] = value
+    profile["income"] = max(profile["income"], 0)
+    profile["age"] = min(max(profile["age"], MIN_AGE), MAX_AGE)
+    profile["dependents"] = min(max(profile["dependents"], 0), MAX_DEPENDENTS)
+    return profile, overrides
+
+
+def _describe_profile_change(before: Dict, after: Dict, overrides: Dict) -> str:
+    parts = []
+    if after["income"] != before["income"]:
+        parts.append(f"a monthly income of {format_inr(after['income'])} (currently {format_inr(before['income'])})")
+    if after["dependents"] != before["dependents"]:
+        plural = "" if after["dependents"] == 1 else "s"
+        parts.append(f"{after['dependents']} dependent{plural} (currently {before['dependents']})")
+    if after["age"] != before["age"]:
+        parts.append(f"age {after['age']}")
+    if after["vehicle"] != before["vehicle"]:
+        parts.append("a vehicle" if after["vehicle"] == "Yes" else "no vehicle")
+    if after["marital_status"] != before["marital_status"]:
+        parts.append(f"{after['marital_status'].lower()} status")
+    for field, value in overrides.items():
+        parts.append(f"{field.split('_')[0]} cover of {format_inr(value)}")
+    return ", ".join(parts) or "these changes"
+
+
+def build_answer(before: Dict, after: Dict, old: Dict, new: Dict, overrides: Dict) -> str:
+    """Templated 2-3 sentence answer summarising the before/after figures."""
+    sentences = []
+    change = _describe_profile_change(before, after, overrides)
+
+    if new["term_coverage"] != old["term_coverage"]:
+        if "term_coverage" in overrides:
+            basis = "the amount you chose"
+        elif new["term_coverage"] == TERM_COVERAGE_CAP:
+            basis = "the ₹2 crore cap"
+        else:
+            basis = f"{new['term_multiplier']}× annual income"
+        sentences.append(
+            f"With {change}, your recommended term cover moves from {format_inr(old['term_coverage'])} "
+            f"to {format_inr(new['term_coverage'])} ({basis})"
+        )
+    else:
+        sentences.append(f"With {change}, your recommended term cover stays at {format_inr(new['term_coverage'])}")
+    if new["health_coverage"] != old["health_coverage"]:
+        sentences[-1] += (f" and health cover moves from {format_inr(old['health_coverage'])} "
+                          f"to {format_inr(new['health_coverage'])}")
+
+    if new["total_premium"] != old["total_premium"]:
+        premiums = (f"Total premiums change from {format_inr(old['total_premium'])} to "
+                    f"{format_inr(new['total_premium'])} a year")
+    else:
+        premiums = f"Total premiums stay at {format_inr(new['total_premium'])} a year"
+    if after["income"]:
+        premiums += (f" ({new['total_premium'] / new['annual_income'] * 100:.1f}% of annual income; "
+                     f"the affordability check allows up to {AFFORDABLE_SHARE_OF_INCOME * 100:.0f}%)")
+    sentences.append(premiums)
+
+    if new["affordable"]:
+        sentences.append("Premiums remain affordable" if old["affordable"] else "Premiums become affordable")
+    elif old["affordable"]:
+        sentences.append("Premiums would no longer be affordable - consider lower coverage options")
+    else:
+        sentences.append("Premiums may be high for this income - consider lower coverage options")
+    return ". ".join(sentences) + "."
+
+
+def run_what_if_scenario(query: str, profile_text: str) -> Optional[Dict]:
+    """Answer a parametric what-if question with the rules engine, or return None."""
+    deltas, leftover = parse_what_if_with_leftover(query)
+    # Anything the rules engine cannot speak to (leftover words, marital status) goes to the LLM
+    if not deltas or leftover or any(d["field"] not in RULE_INPUTS and not d["field"].endswith("_coverage")
+                                     for d in deltas):
+        return None
+
+    before = parse_profile_text(profile_text)
+    after, overrides = apply_deltas(before, deltas)
+    if not overrides and all(after[field] == before[field] for field in RULE_INPUTS):
+        return None
+    old = compute_rule_figures(before)
+    new = compute_rule_figures(after, **overrides)
+
+    changes = {
+        field: {"before": old[field], "after": new[field]}
+        for field in DIFF_FIELDS if old[field] != new[field]
+    }
+    return {
+        "deltas": deltas,
+        "profile_before": before,
+        "profile_after": after,
+        "before": {field: old[field] for field in DIFF_FIELDS},
+        "after": {field: new[field] for field in DIFF_FIELDS},
+        "changes": changes,
+        "answer": build_answer(before, after, old, new, overrides),
+    }
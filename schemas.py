@@ -0,0 +1,103 @@
+import re
+from typing import List, Optional
+
+from pydantic import AliasChoices, BaseModel, Field, computed_field, field_validator
+
+# ----------------------------------------
+# Canonical recommendation schema
+# ----------------------------------------
+# Amounts are stored once as integer rupees. Model output is parsed into them
+# at validation time (numbers, or legacy strings such as "₹1 crores",
+# "₹1.5 crore", "₹20L", "₹8,000/year", "₹750/month" under the old "coverage" /
+# "estimated_premium" keys); the display strings are computed on access.
+
+_UNIT = r"(crores?|cr\b|lakhs?|lacs?|l\b|k\b|thousand)"
+# "₹5-10 lakhs": the unit after a range applies to its lower bound too
+_AMOUNT_RE = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*(?:" + _UNIT + r"|(?=(?:-|–|to)\s*\d[\d,.]*\s*" + _UNIT + r"))?",
+                        re.IGNORECASE)
+_UNITS = {"c": 1e7, "l": 1e5, "k": 1e3, "t": 1e3}
+
+
+def parse_inr(value) -> int:
+    """Rupees from a number or the first amount in a string (0 when there is none)."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = _AMOUNT_RE.search(str(value or "").replace("₹", " "))
+    if not match:
+        return 0
+    number, unit, range_unit = match.groups()
+    unit = unit or range_unit
+    return int(round(float(number.replace(",", "")) * (_UNITS[unit[0].lower()] if unit else 1)))
+
+
+def parse_annual_premium(value) -> int:
+    amount = parse_inr(value)
+    if isinstance(value, str) and re.search(r"month|/\s*mo\b|p\.?m\.?\b", value, re.IGNORECASE):
+        amount *= 12
+    return amount
+
+
+def _scaled(amount: int, unit: int, singular: str, plural: str) -> str:
+    value = f"{amount / unit:.2f}".rstrip("0").rstrip(".")
+    return f"₹{value} {singular if value == '1' else plural}"
+
+
+def format_inr(amount: int) -> str:
+    """₹1 crore, ₹1.5 crores, ₹10 lakhs, ₹50,000."""
+    if amount >= 10_000_000:
+        return _scaled(amount, 10_000_000, "crore", "crores")
+    if amount >= 100_000:
+        return _scaled(amount, 100_000, "lakh", "lakhs")
+    return f"₹{amount:,}"
+
+
+def format_annual_premium(amount: int) -> str:
+    return f"₹{amount}/year"
+
+
+class InsuranceDetails(BaseModel):
+    coverage_inr: int = Field(validation_alias=AliasChoices("coverage_inr", "coverage"),
+                              description="Sum assured / sum insured in rupees, e.g. 10000000 for 1 crore")
+    annual_premium_inr: int = Field(validation_alias=AliasChoices("annual_premium_inr", "estimated_premium"),
+                                    description="Estimated premium in rupees per year")
+    reason: str
+    add_ons: Optional[List[str]] = []
+    priority: Optional[str] = None
+
+    @field_validator("coverage_inr", mode="before")
+    @classmethod
+    def _parse_coverage(cls, value):
+        return parse_inr(value)
+
+    @field_validator("annual_premium_inr", mode="before")
+    @classmethod
+    def _parse_premium(cls, value):
+        return parse_annual_premium(value)
+
+    @computed_field
+    @property
+    def coverage(self) -> str:
+        return format_inr(self.coverage_inr)
+
+    @computed_field
+    @property
+    def estimated_premium(self) -> str:
+        return format_annual_premium(self.annual_premium_inr)
+
+
+class InsuranceRecommendation(BaseModel):
+    term_insurance: InsuranceDetails
+    health_insurance: InsuranceDetails
+    vehicle_insurance: Optional[InsuranceDetails] = None
+    property_insurance: Optional[InsuranceDetails] = None
+    travel_insurance: Optional[InsuranceDetails] = None
+    personal_accident_cover: Optional[InsuranceDetails] = None
+    premium_affordability_check: Optional[str] = None
+    additional_advice: Optional[List[str]] = []
+    products_to_avoid: Optional[List[str]] = []
+
+    def sections(self) -> List[InsuranceDetails]:
+        """The product sections present, term and health first."""
+        return [s for s in (self.term_insurance, self.health_insurance, self.vehicle_insurance,
+                            self.property_insurance, self.travel_insurance, self.personal_accident_cover)
+                if s is not None]
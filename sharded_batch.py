@@ -0,0 +1,356 @@
+import argparse
+import hashlib
+import heapq
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterator, List, Optional
+
+from batch_score import read_rows, normalize_row, run_batch, save_checkpoint
+
+# ----------------------------------------
+# Sharded multi-worker batch scoring
+# ----------------------------------------
+# split  : hash every input row into one of N shard files under a work dir,
+#          dropping repeated rows (same id and profile)
+# run    : score one shard (--shard i) or keep claiming pending shards (--next);
+#          any process on any host that can see the work dir may do this
+# local  : N worker processes on this machine, retrying failed shards
+# merge  : one de-duplicated output in input order, plus aggregate stats
+#
+# Work dir layout:
+#   manifest.json                    shard count, mode, input
+#   shards/shard-00003.jsonl         input rows (+ _row, _key)
+#   results/shard-00003.jsonl        scored records (resumable, see batch_score)
+#   results/shard-00003.done.json    written once the shard finished
+#   results/shard-00003.failed.json  last failure; the shard can simply be run again
+#   claims/shard-00003               which host/process took the shard; its mtime is
+#                                    refreshed while the shard runs, and a claim older
+#                                    than the claim timeout belongs to a dead worker
+
+# Cover below this multiple of annual income counts as underinsured (as in tools.explain_coverage_adequacy)
+ADEQUATE_COVER_MULTIPLE = 10
+TOP_INSURERS = 10
+# A claim not refreshed for this long is taken over by the next worker
+CLAIM_TIMEOUT_S = 600
+
+
+def row_key(row_id, profile) -> str:
+    """Stable identity of an input row: same id and profile -> same key on every host."""
+    payload = json.dumps({"id": row_id, "profile": profile}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def shard_of(key: str, shards: int) -> int:
+    return int(key[:8], 16) % shards
+
+
+def _paths(workdir: str, shard: int) -> Dict[str, str]:
+    name = f"shard-{shard:05d}"
+    return {
+        "input": os.path.join(workdir, "shards", name + ".jsonl"),
+        "output": os.path.join(workdir, "results", name + ".jsonl"),
+        "checkpoint": os.path.join(workdir, "results", name + ".checkpoint.json"),
+        "done": os.path.join(workdir, "results", name + ".done.json"),
+        "failed": os.path.join(workdir, "results", name + ".failed.json"),
+        "claim": os.path.join(workdir, "claims", name),
+    }
+
+
+def load_manifest(workdir: str) -> Dict:
+    with open(os.path.join(workdir, "manifest.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# ----------------------------------------
+# Split
+# ----------------------------------------
+def split(input_path: str, workdir: str, shards: int, mode: str = "rules", chunk_size: int = 1000) -> Dict:
+    for sub in ("shards", "results", "claims"):
+        os.makedirs(os.path.join(workdir, sub), exist_ok=True)
+    files = [open(_paths(workdir, i)["input"], "w", encoding="utf-8") for i in range(shards)]
+    counts = [0] * shards
+    try:
+        for n, row in enumerate(read_rows(input_path)):
+            row_id = row.get("id", n)
+            try:
+                identity = normalize_row(row)
+            except (KeyError, TypeError, ValueError):
+                identity = row  # invalid rows still flow through and become error records
+            key = row_key(row_id, identity)
+            shard = shard_of(key, shards)
+            files[shard].write(json.dumps({**row, "id": row_id, "_row": n, "_key": key}, ensure_ascii=False) + "\n")
+            counts[shard] += 1
+    finally:
+        for f in files:
+            f.close()
+    # A key never leaves its shard, so each shard is de-duplicated on its own
+    duplicates = [_drop_repeated_rows(_paths(workdir, i)["input"]) for i in range(shards)]
+    manifest = {"input": os.path.abspath(input_path), "shards": shards, "mode": mode,
+                "chunk_size": chunk_size, "rows": sum(counts), "duplicates": sum(duplicates),
+                "rows_per_shard": [count - dropped for count, dropped in zip(counts, duplicates)]}
+    save_checkpoint(os.path.join(workdir, "manifest.json"), manifest)
+    return manifest
+
+def _drop_repeated_rows(path: str) -> int:
+    """Keep the first row per key in a shard file; returns how many were dropped."""
+    seen, dropped = set(), 0
+    tmp = path + ".tmp"
+    with open(path, "r", encoding="utf-8") as src, open(tmp, "w", encoding="utf-8") as out:
+        for line in src:
+            key = json.loads(line)["_key"]
+            if key in seen:
+                dropped += 1
+                continue
+            seen.add(key)
+            out.write(line)
+    os.replace(tmp, path)
+    return dropped
+
+# ----------------------------------------
+# Run
+# ----------------------------------------
+def shard_status(workdir: str, shard: int) -> str:
+    paths = _paths(workdir, shard)
+    if os.path.exists(paths["done"]):
+        return "done"
+    if os.path.exists(paths["claim"]):
+        return "running"
+    if os.path.exists(paths["failed"]):
+        return "failed"
+    return "pending"
+
+
+def run_shard(workdir: str, shard: int, workers: int = 1, progress: bool = False) -> Dict:
+    """Score one shard; resumes from its checkpoint when it was interrupted or failed before."""
+    manifest = load_manifest(workdir)
+    paths = _paths(workdir, shard)
+    previous = _read_json(paths["failed"]) or {}
+    attempt = previous.get("attempts", 0) + 1
+    try:
+        summary = run_batch(paths["input"], paths["output"], manifest["mode"], "jsonl", manifest["chunk_size"],
+                            workers, paths["checkpoint"], progress)
+    except Exception as e:
+        save_checkpoint(paths["failed"], {"shard": shard, "attempts": attempt, "error": f"{type(e).__name__}: {e}",
+                                          "host": socket.gethostname(), "at": time.time()})
+        raise
+    summary.update(shard=shard, attempts=attempt, host=socket.gethostname())
+    save_checkpoint(paths["done"], summary)
+    if os.path.exists(paths["failed"]):
+        os.remove(paths["failed"])
+    return summary
+
+
+def claim(workdir: str, shard: int, timeout: float = CLAIM_TIMEOUT_S) -> bool:
+    """Atomically take a shard (O_EXCL works across hosts on a shared filesystem).
+    A claim not refreshed for `timeout` seconds is taken over."""
+    path = _paths(workdir, shard)["claim"]
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        stale = f"{path}.stale-{socket.gethostname()}-{os.getpid()}"
+        try:
+            if time.time() - os.path.getmtime(path) < timeout:
+                return False
+            # Only one of the workers racing for a stale claim wins this rename
+            os.rename(path, stale)
+        except FileNotFoundError:
+            return False
+        os.remove(stale)
+        return claim(workdir, shard, timeout)
+    with os.fdopen(fd, "w") as f:
+        f.write(f"{socket.gethostname()}:{os.getpid()}")
+    return True
+
+
+def _keep_claimed(path: str, stop: threading.Event, interval: float):
+    """Refresh a claim's mtime until `stop` is set, so live shards never look stale."""
+    while not stop.wait(interval):
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return
+
+
+def release(workdir: str, shard: int):
+    try:
+        os.remove(_paths(workdir, shard)["claim"])
+    except FileNotFoundError:
+        pass
+
+
+def run_pending(workdir: str, workers: int = 1, retry_failed: bool = False,
+                claim_timeout: float = CLAIM_TIMEOUT_S) -> List[Dict]:
+    """Claim and score pending shards (and shards whose claim went stale) until none
+    are left; failed shards are skipped unless `retry_failed` so a broken shard
+    cannot spin forever."""
+    results = []
+    wanted = {"pending", "running", "failed"} if retry_failed else {"pending", "running"}
+    for shard in range(load_manifest(workdir)["shards"]):
+        if shard_status(workdir, shard) not in wanted or not claim(workdir, shard, claim_timeout):
+            continue
+        stop = threading.Event()
+        threading.Thread(target=_keep_claimed, args=(_paths(workdir, shard)["claim"], stop, claim_timeout / 4),
+                         daemon=True).start()
+        try:
+            results.append(run_shard(workdir, shard, workers))
+        except Exception as e:
+            results.append({"shard": shard, "error": str(e)})
+        finally:
+            stop.set()
+            release(workdir, shard)
+    return results
+
+
+def run_local(workdir: str, processes: int, retries: int = 2, workers: int = 1) -> Dict:
+    """N independent worker processes on this machine; failed shards are retried up to `retries` times."""
+    shards = load_manifest(workdir)["shards"]
+    for round_number in range(retries + 1):
+        # Every earlier worker has exited, so leftover claims belong to crashed processes
+        for shard in range(shards):
+            if shard_status(workdir, shard) == "running":
+                release(workdir, shard)
+        command = [sys.executable, os.path.abspath(__file__), "run", workdir, "--next", "--workers", str(workers)]
+        if round_number:
+            command.append("--retry-failed")
+        procs = [subprocess.Popen(command) for _ in range(min(processes, shards))]
+        for proc in procs:
+            proc.wait()
+        statuses = status(workdir)["shards"]
+        if all(s == "done" for s in statuses.values()):
+            break
+    return status(workdir)
+
+
+def status(workdir: str) -> Dict:
+    shards = {shard: shard_status(workdir, shard) for shard in range(load_manifest(workdir)["shards"])}
+    return {"counts": dict(Counter(shards.values())), "shards": shards}
+
+# ----------------------------------------
+# Merge
+# ----------------------------------------
+def _shard_records(path: str) -> Iterator[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def merge(workdir: str, output_path: str, allow_partial: bool = False) -> Dict:
+    """Stream-merge shard outputs by input row; one record per input row.
+
+    Shard outputs are already in input order, so heapq.merge keeps memory flat
+    and the result is identical for any shard count. Repeated input rows were
+    dropped by split; a row scored twice (a shard re-run after a crash) yields
+    adjacent records, so comparing with the previous row is enough.
+    """
+    manifest = load_manifest(workdir)
+    statuses = status(workdir)["shards"]
+    missing = [shard for shard, s in statuses.items() if s != "done"]
+    if missing and not allow_partial:
+        raise RuntimeError(f"shards not finished: {missing}")
+    sources = [_shard_records(_paths(workdir, shard)["output"]) for shard in statuses if shard not in missing]
+
+    previous_row = None
+    stats = {"records": 0, "duplicates": manifest.get("duplicates", 0), "errors": 0}
+    ratio_sum, ratio_count, underinsured = 0.0, 0, 0
+    insurers = Counter()
+    tmp = output_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as out:
+        for record in heapq.merge(*sources, key=lambda r: r["row"]):
+            if record["row"] == previous_row:
+                stats["duplicates"] += 1
+                continue
+            previous_row = record["row"]
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            stats["records"] += 1
+            if "error" in record:
+                stats["errors"] += 1
+                continue
+            annual_income = record["profile"]["income"] * 12
+            if annual_income > 0:
+                ratio_sum += record["total_premium"] / annual_income
+                ratio_count += 1
+                if record["term_coverage"] + record["health_coverage"] < annual_income * ADEQUATE_COVER_MULTIPLE:
+                    underinsured += 1
+            for found in record["products"].values():
+                insurers.update(p["company"] for p in found)
+    os.replace(tmp, output_path)
+
+    scored = stats["records"] - stats["errors"]
+    stats.update({
+        "input_rows": manifest["rows"],
+        "missing_shards": missing,
+        "mean_premium_to_income": round(ratio_sum / ratio_count, 4) if ratio_count else None,
+        "underinsured_share": round(underinsured / scored, 4) if scored else None,
+        "top_insurers": insurers.most_common(TOP_INSURERS),
+    })
+    save_checkpoint(output_path + ".stats.json", stats)
+    return stats
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Sharded batch scoring across processes or hosts sharing a filesystem.")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("split", help="hash an input file into shards")
+    p.add_argument("input")
+    p.add_argument("workdir")
+    p.add_argument("--shards", type=int, required=True)
+    p.add_argument("--mode", choices=["rules", "llm"], default="rules")
+    p.add_argument("--chunk-size", type=int, default=1000)
+
+    p = sub.add_parser("run", help="score one shard, or claim pending shards until none are left")
+    p.add_argument("workdir")
+    target = p.add_mutually_exclusive_group(required=True)
+    target.add_argument("--shard", type=int)
+    target.add_argument("--next", action="store_true")
+    p.add_argument("--retry-failed", action="store_true")
+    p.add_argument("--claim-timeout", type=float, default=CLAIM_TIMEOUT_S,
+                   help="take over claims not refreshed for this many seconds")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+
+    p = sub.add_parser("local", help="run every shard with N local worker processes")
+    p.add_argument("workdir")
+    p.add_argument("--procs", type=int, default=os.cpu_count() or 4)
+    p.add_argument("--retries", type=int, default=2)
+    p.add_argument("--workers", type=int, default=1, help="scoring workers inside each process")
+
+    p = sub.add_parser("status")
+    p.add_argument("workdir")
+
+    p = sub.add_parser("merge", help="combine finished shards into one output")
+    p.add_argument("workdir")
+    p.add_argument("output")
+    p.add_argument("--allow-partial", action="store_true")
+
+    args = ap.parse_args(argv)
+    if args.command == "split":
+        result = split(args.input, args.workdir, args.shards, args.mode, args.chunk_size)
+    elif args.command == "run" and args.shard is not None:
+        result = run_shard(args.workdir, args.shard, args.workers, progress=True)
+    elif args.command == "run":
+        result = run_pending(args.workdir, args.workers, args.retry_failed, args.claim_timeout)
+    elif args.command == "local":
+        result = run_local(args.workdir, args.procs, args.retries, args.workers)
+    elif args.command == "status":
+        result = status(args.workdir)
+    else:
+        result = merge(args.workdir, args.output, args.allow_partial)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
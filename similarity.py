@@ -0,0 +1,191 @@
+import math
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from rules import calculate_insurance_recommendations, parse_profile_text
+from schemas import InsuranceRecommendation
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # brute-force NumPy search below
+    cKDTree = None
+
+# ----------------------------------------
+# Nearest-neighbour reuse of LLM recommendations
+# ----------------------------------------
+# Profiles a few years or a few thousand rupees apart get essentially the same
+# advice from the LLM. Every LLM recommendation is indexed by a feature vector
+# of its profile; a new profile within SIMILARITY_MAX_DISTANCE of a stored one
+# reuses that recommendation's reasons, add-ons and advice, with coverages,
+# premiums and the affordability check re-derived by the rules engine for the
+# exact profile. LLM text usually quotes the stored profile's figures
+# ("₹1.2 crore, 15× your income at 34"), so sentences and list items with
+# amounts, percentages or ages are dropped; a reason left empty is the rules
+# engine's.
+#
+# Features: age in 5-year units, log income in ×1.5 steps and dependents are
+# numeric; marital status, employment, health conditions, vehicle, property,
+# travel and existing policies are one-hot. A categorical difference alone is
+# at least √2 apart, so with the default distance only profiles that agree on
+# every categorical field are ever matched.
+#
+# The KD-tree (scipy, when installed) is rebuilt every REBUILD_EVERY inserts;
+# newer points are scanned with NumPy, as is everything when scipy is missing.
+#
+#   SIMILARITY_MAX_DISTANCE     reuse radius in feature units (default 0.5; 0 disables)
+#   SIMILARITY_MAX_ENTRIES      recommendations kept (default 5000, oldest dropped)
+
+AGE_UNIT = 5.0
+INCOME_STEP = 1.5
+CATEGORIES = {
+    "marital_status": ["Single", "Married", "Divorced"],
+    "employment": ["Private Job", "Government Job", "Self-Employed", "IT Professional"],
+    "health_conditions": ["None", "Diabetes", "Heart Issues", "Other"],
+    "vehicle": ["Yes", "No"],
+    "owns_property": ["Yes", "No"],
+    "frequent_traveler": ["Yes", "No"],
+}
+EXISTING_POLICIES = ["term", "health", "vehicle", "travel"]
+DIMENSIONS = 3 + sum(len(values) for values in CATEGORIES.values()) + len(EXISTING_POLICIES)
+
+REBUILD_EVERY = 64
+DEFAULT_MAX_DISTANCE = 0.5
+DEFAULT_MAX_ENTRIES = 5000
+# Sections whose amounts the rules engine re-derives
+RULE_SECTIONS = ["term_insurance", "health_insurance", "vehicle_insurance", "personal_accident_cover"]
+SECTIONS = RULE_SECTIONS + ["property_insurance", "travel_insurance"]
+# Text that quotes a profile's figures
+FIGURES = re.compile(r"₹|\d|\b(?:rs|inr|lakhs?|lacs?|crores?|percent)\b", re.IGNORECASE)
+FALLBACK_REASON = "Recommended for a profile like yours"
+
+
+def without_figures(text: str) -> str:
+    """`text` without the sentences that mention amounts, percentages or ages."""
+    sentences = re.split(r"(?<=[.!?])\s+", text.strip())
+    return " ".join(s for s in sentences if s and not FIGURES.search(s))
+
+
+def _figure_free(items):
+    return [item for item in items or [] if not FIGURES.search(item)]
+
+
+def profile_features(profile: Dict) -> Optional[np.ndarray]:
+    """Feature vector for a parsed profile; None when a field has a value the features
+    cannot represent (such profiles are never reused)."""
+    vector = [profile["age"] / AGE_UNIT,
+              math.log(max(profile["income"], 1)) / math.log(INCOME_STEP),
+              float(profile["dependents"])]
+    for field, values in CATEGORIES.items():
+        if profile[field] not in values:
+            return None
+        vector += [float(profile[field] == value) for value in values]
+    existing = profile["existing_insurance"].lower()
+    vector += [float(policy in existing) for policy in EXISTING_POLICIES]
+    return np.array(vector)
+
+
+def rederive(recommendation: InsuranceRecommendation, profile_text: str) -> InsuranceRecommendation:
+    """The stored recommendation with coverages, premiums and the affordability check
+    recomputed by the rules engine for this profile, and its texts without figures."""
+    rules = calculate_insurance_recommendations(profile_text)
+    update = {"premium_affordability_check": rules.premium_affordability_check,
+              "additional_advice": _figure_free(recommendation.additional_advice),
+              "products_to_avoid": _figure_free(recommendation.products_to_avoid)}
+    for name in SECTIONS:
+        stored, fresh = getattr(recommendation, name), getattr(rules, name)
+        if stored is None:
+            continue
+        section = {"reason": without_figures(stored.reason) or (fresh.reason if fresh else FALLBACK_REASON),
+                   "add_ons": _figure_free(stored.add_ons)}
+        if name in RULE_SECTIONS and fresh is not None:
+            section.update(coverage_inr=fresh.coverage_inr, annual_premium_inr=fresh.annual_premium_inr)
+        update[name] = stored.model_copy(update=section)
+    return recommendation.model_copy(update=update)
+
+
+class SimilarityIndex:
+    def __init__(self, max_distance: Optional[float] = None, max_entries: Optional[int] = None):
+        self.max_distance = float(os.getenv("SIMILARITY_MAX_DISTANCE", DEFAULT_MAX_DISTANCE)) \
+            if max_distance is None else max_distance
+        self.max_entries = int(os.getenv("SIMILARITY_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)) \
+            if max_entries is None else max_entries
+        self.vectors = np.empty((64, DIMENSIONS))
+        self.entries: List[Tuple[Dict, InsuranceRecommendation]] = []
+        self.tree = None
+        self.tree_size = 0
+        self.counters = {"lookups": 0, "reused": 0, "stored": 0}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, profile_text: str, recommendation: InsuranceRecommendation) -> bool:
+        profile = parse_profile_text(profile_text)
+        vector = profile_features(profile)
+        if vector is None or self.max_distance <= 0:
+            return False
+        with self._lock:
+            if len(self.entries) >= self.max_entries:
+                # Drop the oldest tenth and re-index the rest
+                drop = max(1, self.max_entries // 10)
+                self.entries = self.entries[drop:]
+                self.vectors[:len(self.entries)] = self.vectors[drop:drop + len(self.entries)]
+                self.tree, self.tree_size = None, 0
+            n = len(self.entries)
+            if n == len(self.vectors):
+                self.vectors = np.concatenate([self.vectors, np.empty_like(self.vectors)])
+            self.vectors[n] = vector
+            self.entries.append((profile, recommendation))
+            self.counters["stored"] += 1
+            if cKDTree is not None and n + 1 - self.tree_size >= REBUILD_EVERY:
+                self.tree, self.tree_size = cKDTree(self.vectors[:n + 1].copy()), n + 1
+        return True
+
+    def nearest(self, vector: np.ndarray) -> Optional[Tuple[float, Dict, InsuranceRecommendation]]:
+        """(distance, profile, recommendation) of the closest stored profile within the radius."""
+        best = None
+        with self._lock:
+            n = len(self.entries)
+            if self.tree is not None:
+                distance, i = self.tree.query(vector, distance_upper_bound=self.max_distance)
+                if i < self.tree_size:
+                    best = (float(distance), int(i))
+            if n > self.tree_size:
+                distances = np.sqrt(((self.vectors[self.tree_size:n] - vector) ** 2).sum(axis=1))
+                i = int(distances.argmin())
+                if distances[i] <= self.max_distance and (best is None or distances[i] < best[0]):
+                    best = (float(distances[i]), self.tree_size + i)
+            if best is None:
+                return None
+            self.counters["reused"] += 1
+            return (best[0],) + self.entries[best[1]]
+
+    def lookup(self, profile_text: str) -> Optional[Dict]:
+        """A recommendation re-derived from the nearest stored profile, or None."""
+        with self._lock:
+            self.counters["lookups"] += 1
+        if not self.entries or self.max_distance <= 0:
+            return None
+        profile = parse_profile_text(profile_text)
+        vector = profile_features(profile)
+        found = self.nearest(vector) if vector is not None else None
+        if found is None:
+            return None
+        distance, source, recommendation = found
+        return {
+            "recommendation": rederive(recommendation, profile_text),
+            "reused_from": {"distance": round(distance, 3),
+                            **{k: source[k] for k in ("age", "income", "dependents")}},
+        }
+
+    def snapshot(self) -> Dict:
+        lookups = self.counters["lookups"]
+        return dict(self.counters, entries=len(self.entries), kd_tree=cKDTree is not None,
+                    reuse_rate=round(self.counters["reused"] / lookups, 3) if lookups else 0.0)
+
+
+similarity_index = SimilarityIndex()
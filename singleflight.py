@@ -0,0 +1,241 @@
+import asyncio
+import copy
+import functools
+import hashlib
+import inspect
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+
+from rules import parse_profile_text
+from schemas import InsuranceRecommendation
+
+try:
+    import fcntl
+except ImportError:  # Windows: cross-process mode is unavailable
+    fcntl = None
+
+# ----------------------------------------
+# Single-flight request coalescing
+# ----------------------------------------
+# Concurrent calls with the same key share one in-flight computation: the
+# first caller (the leader) runs it, everyone who arrives before it finishes
+# waits and receives a copy of the same result. Nothing is cached afterwards.
+# Works for threads and asyncio tasks in one process; with
+# SINGLEFLIGHT_LOCK_DIR set, processes on the same host also coalesce through
+# a lock file per key (followers block on the lock, then read the result the
+# leader left behind).
+#
+# Shared results hold customer profile data: the directory must be private to
+# the server's user (0700; cross-process mode is skipped otherwise), results
+# are JSON (recommendation models are tagged and rebuilt, anything else that
+# is not JSON is not shared), and the last waiting process deletes the file.
+
+LOCK_DIR = os.getenv("SINGLEFLIGHT_LOCK_DIR")
+# Models a shared result may contain, by tag
+SHARED_MODELS = {"InsuranceRecommendation": InsuranceRecommendation}
+
+
+def normalize_question(query: str) -> str:
+    return re.sub(r"\s+", " ", query.strip().lower()).rstrip("?.! ")
+
+
+def normalize_profile_text(profile_text: str) -> str:
+    return json.dumps(parse_profile_text(profile_text), sort_keys=True)
+
+
+NORMALIZERS = {"profile_text": normalize_profile_text, "query": normalize_question}
+
+
+def request_key(name: str, arguments: Dict) -> str:
+    parts = {k: NORMALIZERS[k](v) if k in NORMALIZERS and isinstance(v, str) else repr(v)
+             for k, v in arguments.items() if not k.startswith("_")}
+    return name + ":" + hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+
+class SingleFlight:
+    def __init__(self, lock_dir: Optional[str] = None):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.lock_dir = lock_dir if fcntl is not None else None
+        self.stats = {"leaders": 0, "followers": 0}
+
+    def _join(self, key: str):
+        """(future, is_leader) for `key`."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.stats["followers"] += 1
+                return future, False
+            future = self._calls[key] = Future()
+            self.stats["leaders"] += 1
+            return future, True
+
+    def _finish(self, key: str, future: Future, result=None, error: Optional[BaseException] = None):
+        with self._lock:
+            self._calls.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: str, fn: Callable, *args, **kwargs):
+        """Run fn(*args, **kwargs) once for all concurrent callers with the same key."""
+        future, leader = self._join(key)
+        if leader:
+            try:
+                result = self._run_leader(key, fn, args, kwargs)
+            except BaseException as e:
+                self._finish(key, future, error=e)
+                raise
+            self._finish(key, future, result)
+            return result
+        return copy.copy(future.result())
+
+    async def do_async(self, key: str, fn: Callable, *args, **kwargs):
+        """asyncio version; sync `fn` runs in the default executor, coroutine functions are awaited.
+
+        Tasks and threads calling do / do_async with the same key share one computation.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return copy.copy(await asyncio.wrap_future(future))
+        try:
+            if inspect.iscoroutinefunction(fn):
+                result = await fn(*args, **kwargs)
+            else:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(None, functools.partial(self._run_leader, key, fn, args, kwargs))
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    # ----------------------------------------
+    # Cross-process coalescing
+    # ----------------------------------------
+    def _run_leader(self, key: str, fn: Callable, args, kwargs):
+        if not self.lock_dir or not private_directory(self.lock_dir):
+            return fn(*args, **kwargs)
+        base = os.path.join(self.lock_dir, key.replace(":", "_"))
+        arrived = time.time()
+        _count_waiters(base, 1)
+        with os.fdopen(os.open(base + ".lock", os.O_RDWR | os.O_CREAT, 0o600), "r+b") as lock_file:
+            # Blocks while another process is computing this key
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                still_waiting = _count_waiters(base, -1)
+                shared = self._read_shared(base + ".result", arrived)
+                if shared is not None:
+                    with self._lock:
+                        self.stats["followers"] += 1
+                    if not still_waiting:
+                        _remove(base + ".result")
+                    return shared
+                _remove(base + ".result")  # left by an earlier flight
+                result = fn(*args, **kwargs)
+                if _count_waiters(base, 0):
+                    self._write_shared(base + ".result", result)
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _read_shared(path: str, arrived: float):
+        """A result another process finished after we started waiting, if any."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                shared = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return _from_json(shared["result"]) if shared["finished"] >= arrived else None
+
+    @staticmethod
+    def _write_shared(path: str, result):
+        try:
+            payload = json.dumps({"finished": time.time(), "result": _to_json(result)}, ensure_ascii=False)
+        except (TypeError, ValueError):
+            return  # results that are not JSON are simply not shared across processes
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+
+
+def private_directory(path: str) -> bool:
+    """Create `path` as 0700, or tighten it if we own it; False when it is someone else's."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.stat(path)
+    if info.st_uid != os.getuid():
+        return False
+    if info.st_mode & 0o077:
+        os.chmod(path, 0o700)
+    return True
+
+
+def _count_waiters(base: str, delta: int) -> int:
+    """Adjust the number of processes waiting on a key; returns the new count."""
+    with os.fdopen(os.open(base + ".waiters", os.O_RDWR | os.O_CREAT, 0o600), "r+b") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        count = max(0, int(f.read() or 0) + delta)
+        if delta:
+            f.seek(0)
+            f.truncate()
+            f.write(str(count).encode("ascii"))
+        return count
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _to_json(value):
+    if isinstance(value, dict):
+        return {k: _to_json(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(v) for v in value]
+    model = type(value).__name__
+    if SHARED_MODELS.get(model) is type(value):
+        return {"__model__": model, "data": value.model_dump(mode="json")}
+    return value
+
+
+def _from_json(value):
+    if isinstance(value, dict):
+        if set(value) == {"__model__", "data"}:
+            return SHARED_MODELS[value["__model__"]].model_validate(value["data"])
+        return {k: _from_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_from_json(v) for v in value]
+    return value
+
+
+default_group = SingleFlight(LOCK_DIR)
+
+
+def coalesced(name: Optional[str] = None, group: Optional[SingleFlight] = None):
+    """Decorator: identical concurrent calls (by normalized arguments) share one execution."""
+    def decorate(func):
+        signature = inspect.signature(func)
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                key = request_key(label, bound.arguments)
+            except Exception:
+                # Unparseable arguments: let the function report its own error
+                return func(*args, **kwargs)
+            return (group or default_group).do(key, func, *args, **kwargs)
+        return wrapper
+    return decorate
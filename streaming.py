@@ -0,0 +1,100 @@
+import re
+import threading
+from typing import Dict, Tuple
+
+# ----------------------------------------
+# Incremental sentence cap for streamed answers
+# ----------------------------------------
+# Streamed text is passed through as it arrives until the Nth sentence ends;
+# the caller then stops reading the model stream. A sentence ends at . ! or ?
+# followed by whitespace, so amounts such as "₹1.5 crore" are never split, and
+# a terminator at the very end of the received text is held back until the
+# next chunk shows whether a space (boundary) or a digit (decimal) follows.
+
+TERMINATORS = ".!?"
+CLOSERS = "\"')]*"
+# Words whose trailing "." does not end a sentence
+ABBREVIATIONS = {"rs", "e.g", "i.e", "approx", "vs", "no", "mr", "mrs", "ms", "dr", "st", "inc", "ltd", "p.a"}
+_WORD_BEFORE_RE = re.compile(r"([A-Za-z.]+)$")
+
+
+class SentenceLimiter:
+    def __init__(self, max_sentences: int = 3):
+        self.max_sentences = max_sentences
+        self.text = ""
+        self.emitted = 0   # chars of self.text already returned
+        self.scanned = 0   # chars of self.text already checked for boundaries
+        self.sentences = 0
+        self.done = False
+
+    def _is_boundary(self, i: int) -> bool:
+        """Is the terminator at text[i] (already followed by whitespace) a sentence end?"""
+        if self.text[i] != ".":
+            return True
+        match = _WORD_BEFORE_RE.search(self.text, 0, i)
+        return not (match and match.group(1).lower() in ABBREVIATIONS)
+
+    def feed(self, chunk: str) -> Tuple[str, bool]:
+        """Add streamed text; returns (text safe to show now, cap reached)."""
+        if self.done:
+            return "", True
+        self.text += chunk
+        i = self.scanned
+        while i < len(self.text):
+            if self.text[i] in TERMINATORS:
+                end = i + 1
+                while end < len(self.text) and self.text[end] in TERMINATORS + CLOSERS:
+                    end += 1
+                if end == len(self.text):
+                    break  # undecided until more text arrives
+                if self.text[end].isspace() and self._is_boundary(i):
+                    self.sentences += 1
+                    if self.sentences >= self.max_sentences:
+                        self.done = True
+                        return self._emit(end), True
+                i = end
+                continue
+            i += 1
+        self.scanned = i
+        return self._emit(i), False
+
+    def finish(self) -> str:
+        """The stream ended: release whatever was held back."""
+        if self.done:
+            return ""
+        self.done = True
+        return self._emit(len(self.text))
+
+    def _emit(self, upto: int) -> str:
+        piece = self.text[self.emitted:upto]
+        self.emitted = max(self.emitted, upto)
+        return piece
+
+
+def cap_sentences(text: str, max_sentences: int = 3) -> str:
+    limiter = SentenceLimiter(max_sentences)
+    piece, done = limiter.feed(text)
+    return (piece + ("" if done else limiter.finish())).strip()
+
+# ----------------------------------------
+# One in-flight answer per session
+# ----------------------------------------
+_inflight: Dict[str, threading.Event] = {}
+_inflight_lock = threading.Lock()
+
+
+def begin_request(session_id: str) -> threading.Event:
+    """Cancel the session's previous in-flight answer and return the new one's cancel event."""
+    event = threading.Event()
+    with _inflight_lock:
+        previous = _inflight.get(session_id)
+        if previous is not None:
+            previous.set()
+        _inflight[session_id] = event
+    return event
+
+
+def end_request(session_id: str, event: threading.Event):
+    with _inflight_lock:
+        if _inflight.get(session_id) is event:
+            del _inflight[session_id]
@@ -0,0 +1,103 @@
+from datetime import datetime
+from typing import Dict, Sequence
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from rules import compute_rule_arrays
+from tools import AFFORDABILITY_LIMIT_PCT, SEVERE_UNDERINSURANCE_SHARE
+
+# ----------------------------------------
+# Sensitivity sweeps: evaluate the rules engine and the explain_* thresholds
+# over an age × income × dependents grid in one vectorized pass.
+# ----------------------------------------
+
+# Adequacy / affordability bands (same cut-offs as explain_coverage_adequacy / explain_affordability)
+ADEQUACY_BANDS = ["severely underinsured", "underinsured", "adequate"]
+AFFORDABILITY_BANDS = ["affordable", "over limit"]
+
+METRIC_LABELS = {
+    "term_coverage": "Term cover (₹)",
+    "total_premium": "Total annual premium (₹)",
+    "premium_share_pct": "Term + health premium as % of monthly income",
+    "adequacy_pct": "Coverage adequacy (%)",
+    "adequacy_band": "Adequacy band",
+    "affordability_band": "Affordability band",
+}
+
+
+def sweep(ages: Sequence = range(25, 61), incomes: Sequence = range(30000, 500001, 5000),
+          dependents: Sequence = range(0, 5), has_vehicle: bool = True, multiplier: int = 10) -> Dict:
+    """Evaluate the rules engine over the full grid.
+
+    Returns {"axes": {...}, "metrics": {...}} where every metric is an array of
+    shape (len(ages), len(incomes), len(dependents)).
+    """
+    axes = {
+        "age": np.asarray(ages, dtype=np.int32),
+        "income": np.asarray(incomes, dtype=np.int64),
+        "dependents": np.asarray(dependents, dtype=np.int32),
+    }
+    age, income, deps = np.meshgrid(axes["age"], axes["income"], axes["dependents"], indexing="ij")
+    figures = compute_rule_arrays(age, income, deps, has_vehicle)
+
+    # explain_affordability: term + health premium against monthly income
+    premium_share = (figures["term_premium"] + figures["health_premium"]) / income * 100
+    # explain_coverage_adequacy: total cover against annual income × multiplier
+    total_coverage = figures["term_coverage"] + figures["health_coverage"]
+    recommended = figures["annual_income"] * multiplier
+    adequacy = np.divide(total_coverage, recommended, out=np.zeros_like(total_coverage), where=recommended > 0)
+
+    metrics = {
+        "term_multiplier": figures["term_multiplier"].astype(np.int8),
+        "term_coverage": figures["term_coverage"].astype(np.int64),
+        "health_coverage": figures["health_coverage"].astype(np.int64),
+        "total_premium": figures["total_premium"].astype(np.float32),
+        "premium_share_pct": premium_share.astype(np.float32),
+        "adequacy_pct": (adequacy * 100).astype(np.float32),
+        "adequacy_band": np.digitize(adequacy, [SEVERE_UNDERINSURANCE_SHARE, 1.0]).astype(np.int8),
+        "affordability_band": (premium_share > AFFORDABILITY_LIMIT_PCT).astype(np.int8),
+    }
+    return {"axes": axes, "metrics": metrics}
+
+
+def sweep_table(result: Dict) -> Dict[str, np.ndarray]:
+    """Flatten a sweep into equal-length columns (ready for pandas.DataFrame(...))."""
+    axes = result["axes"]
+    grids = np.meshgrid(axes["age"], axes["income"], axes["dependents"], indexing="ij")
+    table = {name: grid.ravel() for name, grid in zip(axes, grids)}
+    table.update({name: values.ravel() for name, values in result["metrics"].items()})
+    return table
+
+
+def visualize_sweep_heatmap(result: Dict, metric: str = "premium_share_pct", save_path=None):
+    """Render one figure with an age × income heatmap per dependents value."""
+    if save_path is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        save_path = f"sweep_{metric}_{timestamp}.png"
+
+    axes = result["axes"]
+    values = result["metrics"][metric]
+    n = len(axes["dependents"])
+    fig, panels = plt.subplots(1, n, figsize=(4 * n, 4.5), sharey=True, squeeze=False)
+    extent = [axes["income"][0] / 1000, axes["income"][-1] / 1000, axes["age"][0], axes["age"][-1]]
+    vmin, vmax = float(values.min()), float(values.max())
+
+    for k, ax in enumerate(panels[0]):
+        image = ax.imshow(values[:, :, k], origin="lower", aspect="auto", extent=extent,
+                          vmin=vmin, vmax=vmax, cmap="RdYlGn_r" if "premium" in metric else "RdYlGn")
+        ax.set_title(f"{axes['dependents'][k]} dependents", fontsize=11)
+        ax.set_xlabel("Monthly income (₹ thousands)")
+    panels[0][0].set_ylabel("Age")
+
+    colorbar = fig.colorbar(image, ax=panels[0].tolist(), shrink=0.85)
+    colorbar.set_label(METRIC_LABELS.get(metric, metric))
+    if metric == "adequacy_band":
+        colorbar.set_ticks(range(len(ADEQUACY_BANDS)), labels=ADEQUACY_BANDS)
+    elif metric == "affordability_band":
+        colorbar.set_ticks(range(len(AFFORDABILITY_BANDS)), labels=AFFORDABILITY_BANDS)
+
+    fig.suptitle(f"Sensitivity sweep: {METRIC_LABELS.get(metric, metric)}", fontsize=14, fontweight="bold")
+    fig.savefig(save_path, dpi=150, bbox_inches="tight")
+    plt.close(fig)
+    return save_path
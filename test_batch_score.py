@@ -0,0 +1,59 @@
+import json
+import os
+import sys
+
+import pytest
+
+from batch_score import JsonlWriter, ParquetWriter, load_checkpoint, normalize_row, save_checkpoint, score_row
+
+
+def test_csv_row_normalization():
+    row = {"age": "41", "income": "85000.0", "dependents": "", "existing_insurance": "term_insurance; travel_insurance"}
+    profile = normalize_row(row)
+    assert profile["age"] == 41 and profile["income"] == 85000 and profile["dependents"] == 0
+    assert profile["existing_insurance"] == {"term_insurance": True, "health_insurance": False,
+                                             "vehicle_insurance": False, "travel_insurance": True}
+    assert profile["marital_status"] == "Single" and profile["vehicle"] == "No"
+
+
+def test_resume_drops_partial_chunk(tmp_path):
+    out, ckpt = str(tmp_path / "out.jsonl"), str(tmp_path / "out.checkpoint.json")
+    writer = JsonlWriter(out, 0)
+    writer.write_chunk([{"row": 0}, {"row": 1}], 0)
+    save_checkpoint(ckpt, {"input": str(tmp_path / "in.jsonl"), "rows_done": 2, "chunks_done": 1,
+                           "output_position": writer.position()})
+    writer.write_chunk([{"row": 2}], 1)  # crash before this chunk is checkpointed
+    writer.close()
+
+    checkpoint = load_checkpoint(ckpt, str(tmp_path / "in.jsonl"))
+    assert checkpoint["rows_done"] == 2
+    writer = JsonlWriter(out, checkpoint["output_position"])
+    writer.write_chunk([{"row": 2}, {"row": 3}], checkpoint["chunks_done"])
+    writer.close()
+    assert [json.loads(line)["row"] for line in open(out)] == [0, 1, 2, 3]
+
+    # A checkpoint for a different input file is ignored
+    assert load_checkpoint(ckpt, str(tmp_path / "other.jsonl"))["rows_done"] == 0
+
+
+def test_rules_mode_does_not_import_main(monkeypatch):
+    # Rules-only batches run without GEMINI_API_KEY: main must stay unimported
+    monkeypatch.setitem(sys.modules, "main", None)
+    record = score_row((0, {"age": "35", "income": "60000", "dependents": "2"}, "rules"))
+    assert "error" not in record and record["term_coverage"] == 60000 * 12 * 15
+    assert record["top_products"]["Term Insurance"]
+
+
+def test_parquet_resume_keeps_checkpointed_parts(tmp_path):
+    pytest.importorskip("pyarrow")
+    out = str(tmp_path / "out")
+    writer = ParquetWriter(out, 0)
+    writer.write_chunk([{"row": 0}], 0)
+    writer.write_chunk([{"row": 1}], 1)
+    assert writer.position() == 2
+    writer.write_chunk([{"row": 2}], 2)  # crash before this part is checkpointed
+
+    writer = ParquetWriter(out, 2)
+    assert sorted(os.listdir(out)) == ["part-000000.parquet", "part-000001.parquet"]
+    writer.write_chunk([{"row": 2}], 2)
+    assert writer.position() == 3
@@ -0,0 +1,120 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import capture
+import main
+import replay
+from capture import CaptureLog, captured, encode_record, read_records, set_log
+from model_router import ModelRouter
+from similarity import SimilarityIndex
+
+PROFILE = ("Age: 35\nMonthly Income: ₹75000\nMarital Status: Married\nDependents: 2\n"
+           "Employment: Private Job\nExisting Insurance: health_insurance\nHealth Conditions: None\n"
+           "Vehicle: Yes\nOwns Property: No\nFrequent Traveler: No\n")
+WHAT_IF = "Should I add a critical illness rider to my health plan?"
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    def structured(model):
+        def invoke(messages):
+            rules = main.calculate_insurance_recommendations(PROFILE)
+            term = rules.term_insurance.model_copy(update={"reason": "Protects your family's lifestyle"})
+            text = rules.model_copy(update={"term_insurance": term}).model_dump_json()
+            usage = {"input_tokens": 900, "output_tokens": 400, "total_tokens": 1300}
+            return {"raw": SimpleNamespace(content=text, usage_metadata=usage), "parsed": None}
+        return SimpleNamespace(invoke=invoke)
+
+    chunks = ["Answer: A critical illness rider ", "pays a lump sum on diagnosis. ", "It suits your profile."]
+    monkeypatch.setattr(main, "get_structured_llm", structured)
+    monkeypatch.setattr(main, "get_llm", lambda model: SimpleNamespace(
+        stream=lambda prompt: iter(SimpleNamespace(content=c) for c in chunks)))
+    monkeypatch.setattr(main, "local_backend_enabled", lambda: False)
+    monkeypatch.setattr(main, "router", ModelRouter(discover=lambda: None))
+    monkeypatch.setattr(main, "similarity_index", SimilarityIndex())
+    monkeypatch.setattr(capture, "RECORD_LLM", True)
+
+
+def capture_traffic(log):
+    set_log(log)
+    try:
+        captured("recommendation", True)(main.get_recommendation)(PROFILE, render_charts=False, save_output=False)
+        answer = "".join(captured("what_if", True)(main.stream_what_if_answer)(WHAT_IF, PROFILE))
+    finally:
+        set_log(None)
+    return answer
+
+
+def test_frames_roundtrip_rotate_and_tolerate_truncation(tmp_path):
+    record = {"v": 1, "kind": "what_if", "started_at": 1.0, "args": {"query": "What if I marry?"}, "llm": []}
+    frame = encode_record(record)
+    log = CaptureLog(str(tmp_path), max_bytes=len(frame) * 2, keep=2)
+    for i in range(5):
+        log.write(dict(record, started_at=float(i)))
+    files = sorted(os.listdir(tmp_path))
+    assert len(files) == 2
+    assert [r["started_at"] for r in read_records(str(tmp_path))] == [2.0, 3.0, 4.0]
+
+    with open(os.path.join(tmp_path, files[-1]), "ab") as f:
+        f.write(encode_record(record)[:-3])  # crash mid-write
+    assert len(list(read_records(str(tmp_path)))) == 3
+    assert len(frame) < len(str(record))
+
+
+def test_capture_records_stages_and_llm_responses(tmp_path, fake_llm):
+    answer = capture_traffic(CaptureLog(str(tmp_path)))
+    recommendation, what_if = read_records(str(tmp_path))
+
+    assert recommendation["args"]["profile_text"] == PROFILE
+    assert {"llm", "matching", "insights"} <= set(recommendation["stages"])
+    assert "charts" not in recommendation["stages"]
+    call = recommendation["llm"][0]
+    assert call["call"] == "recommendation" and call["usage"]["total_tokens"] == 1300
+    assert "Protects your family" in call["text"]
+    assert recommendation["output"]["sections"]["term_insurance"][2] == "Protects your family's lifestyle"
+
+    assert what_if["args"]["query"] == WHAT_IF
+    assert what_if["llm"][0]["chunks"][0].startswith("Answer:")
+    assert what_if["output"]["answer"] == answer.strip()
+
+
+def test_llm_text_is_dropped_unless_allowed(tmp_path, fake_llm, monkeypatch):
+    monkeypatch.setattr(capture, "RECORD_LLM", False)
+    capture_traffic(CaptureLog(str(tmp_path)))
+    records = list(read_records(str(tmp_path)))
+    assert all(call["text"] is None for record in records for call in record["llm"])
+
+    report = replay.replay(records, speed=0, workers=2)
+    assert report["replayed"] == 2 and report["unrecorded_llm"] == 2 and report["divergences"] == 0
+
+
+def test_replay_reports_latency_and_divergences(tmp_path, fake_llm, monkeypatch):
+    capture_traffic(CaptureLog(str(tmp_path)))
+    records = list(read_records(str(tmp_path)))
+    # The fakes are gone: replay must serve the LLM from the capture
+    monkeypatch.setattr(main, "get_structured_llm", None)
+    monkeypatch.setattr(main, "get_llm", None)
+
+    report = replay.replay(records, speed=0, workers=2)
+    assert report["replayed"] == 2 and report["errors"] == {}
+    assert report["unrecorded_llm"] == 0 and report["divergences"] == 0
+    assert set(report["by_kind"]) == {"recommendation", "what_if"}
+    assert {"p50", "p95", "p99", "max"} <= set(report["by_kind"]["recommendation"]["replay_ms"])
+    assert "llm" in report["by_kind"]["recommendation"]["stages_ms"]
+    assert main.get_llm is None  # patches restored
+
+    monkeypatch.setattr(main, "match_recommendation_products", lambda recommendation, profile_text: {})
+    report = replay.replay(records, speed=0)
+    assert report["divergences"] == 1
+    assert report["diverged_fields"] and all(f.startswith("products.") for f in report["diverged_fields"])
+    assert report["examples"][0]["kind"] == "recommendation"
+
+
+def test_replay_keeps_original_pacing(tmp_path, fake_llm):
+    capture_traffic(CaptureLog(str(tmp_path)))
+    records = list(read_records(str(tmp_path)))
+    records[1]["started_at"] = records[0]["started_at"] + 0.4
+    assert replay.replay(records, speed=1)["duration_s"] >= 0.4
+    assert replay.replay(records, speed=4)["duration_s"] < 0.4
@@ -0,0 +1,49 @@
+import main
+from catalog_qa import answer_catalog_question, resolve_entities
+
+
+def test_highest_csr_is_answered_from_the_catalog():
+    result = answer_catalog_question("Which insurance company has the highest claim settlement ratio?")
+    assert result["intent"] == "csr"
+    assert result["answer"].startswith("Axis Max Life Insurance has the highest claim settlement ratio: 99.7%")
+    # Persistency figures and "not stated" placeholders are not ranked
+    assert "Tata AIA" not in result["answer"] and "Kotak" not in result["answer"]
+    health = answer_catalog_question("Which health insurer has the best claim settlement ratio?")
+    assert health["answer"].startswith("HDFC ERGO has the highest claim settlement ratio among health insurers: 98.59%")
+
+
+def test_fuzzy_company_and_plan_names():
+    assert resolve_entities("what riders does SBI Life offer?")["companies"] == ["SBI Life Insurance"]
+    assert resolve_entities("riders for bajaj alianz")["companies"] == ["Bajaj Allianz General Insurance"]
+    assert resolve_entities("ICICI Lombard riders")["companies"] == ["ICICI Lombard General Insurance"]
+    # A plan named in full (or by its first words) beats its company
+    entities = resolve_entities("entry age for Sampoorna Raksha")
+    assert entities["plans"] and not entities["companies"]
+    # "max age" is not Max Life
+    assert resolve_entities("what is the max age for term cover")["companies"] == []
+
+
+def test_fact_answers_quote_catalog_figures():
+    riders = answer_catalog_question("What riders does Bajaj Allianz offer?")["answer"]
+    assert "zero depreciation, roadside assistance, key replacement" in riders
+    assert "18–65 years" in answer_catalog_question("Entry age for ICICI Term Insurance?")["answer"]
+    assert "from ₹9,999/year" in answer_catalog_question("minimum premium for Optima Restore")["answer"]
+    cheapest = answer_catalog_question("cheapest term plan")["answer"].splitlines()
+    assert cheapest[1].endswith("from ₹2,400/year")
+    assert "36 to 48 months" in answer_catalog_question("waiting period of optima secure")["answer"]
+    assert "Tata AIG Auto Secure" in answer_catalog_question("Which plans offer zero depreciation rider?")["answer"]
+
+
+def test_other_questions_fall_through():
+    assert answer_catalog_question("What if I add a critical illness rider?") is None
+    assert answer_catalog_question("Is a ULIP a good idea for me?") is None
+    assert answer_catalog_question("What is the waiting period?") is None
+
+
+def test_what_if_path_skips_the_llm(monkeypatch):
+    class NoLLM:
+        def stream(self, prompt):
+            raise AssertionError("catalog questions must not reach the LLM")
+    monkeypatch.setattr(main, "llm", NoLLM())
+    reply = main.answer_what_if_question("Which insurance company has the highest claim settlement ratio?", "Age: 35")
+    assert "99.7%" in reply
@@ -0,0 +1,30 @@
+from chart_data import (
+    affordability_chart_data,
+    coverage_adequacy_data,
+    coverage_vs_income_chart_data,
+    format_inr_short,
+)
+
+
+def test_inr_labels():
+    assert format_inr_short(15000000) == "₹1.5Cr"
+    assert format_inr_short(1000000) == "₹10.0L"
+    assert format_inr_short(45000) == "₹45,000"
+
+
+def test_affordability_drops_empty_slices():
+    data = affordability_chart_data(1000, 0, 50000)
+    assert data["labels"] == ["Remaining Income", "Term Insurance"]
+    assert data["values"] == [49000, 1000]
+
+
+def test_coverage_vs_income_labels():
+    data = coverage_vs_income_chart_data(10000000, 500000, 50000)
+    assert data["value_labels"] == ["₹1.0Cr", "₹5.0L"]
+    assert data["income_label"] == "Annual Income (₹6.0L)"
+
+
+def test_adequacy_is_clamped_and_banded():
+    assert coverage_adequacy_data(50000000, 100000)["adequacy_pct"] == 120
+    assert coverage_adequacy_data(700000, 100000)["color"] == "orange"
+    assert coverage_adequacy_data(100000, 100000)["color"] == "red"
@@ -1,5 +1,4 @@
 from tools import visualize_affordability_chart, visualize_coverage_vs_income_chart
-from main import extract_number
 
 # Test chart generation with different values
 print("Testing chart generation...")
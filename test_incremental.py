@@ -0,0 +1,111 @@
+import pytest
+
+import main
+from incremental import affected_outputs, update_recommendation
+from profiles import build_profile_text
+from similarity import SimilarityIndex
+from tools import recommendation_insights
+
+PROFILE = {"age": 35, "income": 60000, "marital_status": "Married", "dependents": 2, "employment": "Private Job",
+           "existing_insurance": {}, "health_conditions": "None", "vehicle": "No", "owns_property": "No",
+           "frequent_traveler": "No"}
+
+
+def amounts(recommendation):
+    return ([(s.coverage_inr, s.annual_premium_inr) if s else None
+             for s in (recommendation.term_insurance, recommendation.health_insurance,
+                       recommendation.vehicle_insurance, recommendation.personal_accident_cover)],
+            recommendation.premium_affordability_check)
+
+
+@pytest.fixture
+def full_run(monkeypatch):
+    # Rules output standing in for the LLM, so a full run and an incremental one are comparable
+    monkeypatch.setattr(main, "run_structured_recommendation",
+                        lambda text: (main.calculate_insurance_recommendations(text), None, []))
+
+    def run(profile):
+        return main.get_recommendation(build_profile_text(profile), render_charts=False, save_output=False)
+    return run
+
+
+def test_dependency_graph():
+    vehicle = affected_outputs({"vehicle"})
+    assert vehicle == {"vehicle_insurance", "products:vehicle", "premium_affordability_check"}
+    income = affected_outputs({"income"})
+    assert {"term_insurance", "premium_affordability_check", "products:*", "chart:affordability",
+            "chart:coverage_vs_income", "chart:coverage_adequacy"} <= income
+    assert "health_insurance" not in income
+    assert affected_outputs({"employment"}) == set()
+
+
+@pytest.mark.parametrize("change", [{"vehicle": "Yes"}, {"income": 95000}, {"dependents": 0}, {"age": 47}])
+def test_incremental_matches_full_run(full_run, change):
+    previous = full_run(PROFILE)
+    edited = dict(PROFILE, **change)
+    result = update_recommendation(previous, PROFILE, edited)
+    expected = full_run(edited)
+    assert amounts(result["recommendation"]) == amounts(expected["recommendation"])
+    assert result["products"] == expected["products"]
+    assert result["chart_data"] == expected["chart_data"]
+    for key in ("affordability_tip", "coverage_tip", "adequacy_tip"):
+        assert result[key] == expected[key], key
+    # The explanation quotes the (kept) LLM reason with the new figures
+    assert result["explanation"] == recommendation_insights(result["recommendation"],
+                                                            build_profile_text(edited))["explanation"]
+    assert result["incremental"]["changed_fields"] == sorted(change)
+
+
+def test_untouched_outputs_are_reused(full_run):
+    previous = full_run(PROFILE)
+    result = update_recommendation(previous, PROFILE, dict(PROFILE, vehicle="Yes"))
+    assert result["products"]["Term Insurance"] is previous["products"]["Term Insurance"]
+    assert result["recommendation"].term_insurance is previous["recommendation"].term_insurance
+    assert result["chart_data"]["affordability"] is previous["chart_data"]["affordability"]
+    assert "Vehicle Insurance" in result["products"]
+    assert result["incremental"]["recomputed"] == ["premium_affordability_check", "products:vehicle",
+                                                   "vehicle_insurance"]
+    # LLM advice with rules-engine figures for the edited section
+    assert previous["served_by"] == "llm" and result["served_by"] == "mixed"
+    # Turning it back off drops the section and its matches
+    back = update_recommendation(result, dict(PROFILE, vehicle="Yes"), PROFILE)
+    assert back["recommendation"].vehicle_insurance is None and "Vehicle Insurance" not in back["products"]
+
+
+def test_llm_only_field_needs_full_run(full_run):
+    previous = full_run(PROFILE)
+    assert update_recommendation(previous, PROFILE, dict(PROFILE, frequent_traveler="Yes")) is None
+    mixed = update_recommendation(previous, PROFILE, dict(PROFILE, vehicle="Yes"))
+    assert update_recommendation(mixed, dict(PROFILE, vehicle="Yes"), dict(PROFILE, vehicle="Yes",
+                                                                          employment="Self-Employed")) is None
+    # Switching chart mode also forces a full run
+    assert update_recommendation(previous, PROFILE, PROFILE, render_charts=True) is None
+
+
+def test_llm_prose_survives_numeric_edits(full_run):
+    previous = full_run(PROFILE)
+    llm = previous["recommendation"]
+    term = llm.term_insurance.model_copy(update={
+        "reason": "Protects your family's lifestyle. Cover of ₹1 crore suits you.", "add_ons": ["Return of Premium"]})
+    previous["recommendation"] = llm.model_copy(update={"term_insurance": term})
+    edited = dict(PROFILE, dependents=0, income=80000)
+    result = update_recommendation(previous, PROFILE, edited)
+    section = result["recommendation"].term_insurance
+    assert section.reason == "Protects your family's lifestyle."
+    assert section.add_ons == ["Return of Premium"]
+    assert section.coverage_inr == main.calculate_insurance_recommendations(build_profile_text(edited)).term_insurance.coverage_inr
+    assert result["served_by"] == "mixed"
+
+
+def test_rules_results_take_the_rules_texts(full_run, monkeypatch):
+    def overloaded(profile_text):
+        raise main.Overloaded("busy")
+
+    monkeypatch.setattr(main, "run_structured_recommendation", overloaded)
+    monkeypatch.setattr(main, "similarity_index", SimilarityIndex())
+    previous = full_run(PROFILE)
+    assert previous["served_by"] == "rules_engine"
+    edited = dict(PROFILE, dependents=0)
+    result = update_recommendation(previous, PROFILE, edited)
+    assert result["recommendation"] == main.calculate_insurance_recommendations(build_profile_text(edited))
+    assert result["served_by"] == "rules_engine"
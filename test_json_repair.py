@@ -0,0 +1,82 @@
+import json
+import random
+
+from json_repair import extract_json, fill_missing_sections
+from schemas import InsuranceRecommendation
+
+# Fuzz corpus built from one well-formed recommendation and the ways Gemini
+# breaks it: fences, prose, trailing commas, single quotes, Python literals,
+# raw newlines and truncation at every offset.
+recommendation = {
+    "term_insurance": {"coverage": "₹1 crore", "estimated_premium": "₹12000/year",
+                       "reason": "Protects the family income", "add_ons": ["Critical Illness Rider"],
+                       "priority": "must-have"},
+    "health_insurance": {"coverage": "₹10 lakhs", "estimated_premium": "₹10000/year",
+                         "reason": "Covers hospitalization", "add_ons": [], "priority": "must-have"},
+    "vehicle_insurance": {"coverage": "₹5 lakhs", "estimated_premium": "₹3000/year",
+                          "reason": "Own damage and third party", "add_ons": ["Zero Depreciation"],
+                          "priority": "recommended"},
+    "property_insurance": None,
+    "travel_insurance": None,
+    "personal_accident_cover": None,
+    "premium_affordability_check": "Premiums are 4.2% of income",
+    "additional_advice": ["Review cover annually", "Increase cover as income grows"],
+    "products_to_avoid": ["High-commission ULIPs"],
+}
+compact = json.dumps(recommendation, ensure_ascii=False)
+pretty = json.dumps(recommendation, ensure_ascii=False, indent=2)
+
+
+def with_trailing_commas(text, rng):
+    return "".join(ch if ch not in "]}" or rng.random() < 0.5 else "," + ch for ch in text)
+
+
+def test_recoverable_variants_round_trip():
+    rng = random.Random(33)
+    variants = {
+        "fence": f"```json\n{pretty}\n```",
+        "bare_fence": f"```\n{compact}\n```",
+        "prose": f"Here is your recommendation:\n{pretty}\nLet me know if you need anything else!",
+        "python_repr": repr(recommendation),
+        "single_quotes": compact.replace('"', "'"),
+    }
+    for n in range(20):
+        variants[f"trailing_commas_{n}"] = with_trailing_commas(pretty, rng)
+        variants[f"mixed_{n}"] = "Sure.\n```json\n" + with_trailing_commas(compact.replace('"', "'"), rng) + "\n``` Done."
+    for name, text in variants.items():
+        data, repairs = extract_json(text)
+        assert data == recommendation, name
+
+
+def test_raw_newlines_in_strings():
+    data, repairs = extract_json(compact.replace("Protects the", "Protects\nthe"))
+    assert data["term_insurance"]["reason"] == "Protects\nthe family income"
+    assert "escaped_control_chars" in repairs
+
+
+def test_truncation_at_every_offset_never_raises():
+    for cut in range(2, len(pretty)):
+        assert isinstance(extract_json(pretty[:cut])[0], dict), cut
+    for cut in range(2, len(compact)):
+        data, repairs = extract_json(compact[:cut])
+        assert isinstance(data, dict), cut
+        # Members that were complete before the cut come back unchanged
+        for key, value in data.items():
+            member = json.dumps({key: recommendation[key]}, ensure_ascii=False)[1:-1]
+            if member in compact[:cut]:
+                assert value == recommendation[key], (cut, key)
+
+
+def test_truncated_after_required_sections_validates():
+    start = compact.index('"vehicle_insurance"')
+    for cut in range(start, len(compact)):
+        data, repairs = extract_json(compact[:cut])
+        model = InsuranceRecommendation.model_validate(fill_missing_sections(data, InsuranceRecommendation, repairs))
+        assert model.term_insurance.coverage_inr == 10_000_000 and model.term_insurance.coverage == "₹1 crore"
+        if model.vehicle_insurance is not None:
+            assert model.vehicle_insurance.coverage_inr == 500_000
+            assert model.vehicle_insurance.estimated_premium == "₹3000/year"
+
+
+def test_no_object():
+    assert extract_json("I cannot help with that.") == (None, [])
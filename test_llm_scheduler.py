@@ -0,0 +1,132 @@
+import threading
+import time
+
+import pytest
+
+from llm_scheduler import (BATCH, INTERACTIVE, WHAT_IF, LLMScheduler, Overloaded, TokenBucket,
+                           current_priority, llm_priority)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills_per_minute():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock)
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+    clock.now = 30
+    assert bucket.wait_time(30) == 0
+    # Reported usage above the estimate puts the bucket into debt
+    bucket.adjust(40)
+    assert bucket.wait_time(1) == pytest.approx(11.0)
+
+
+def test_settle_corrects_token_estimate():
+    sched = LLMScheduler(rpm=100, tpm=1000, clock=FakeClock())
+    with sched.slot(INTERACTIVE, 500) as ticket:
+        ticket.settle(200)
+    snap = sched.snapshot()
+    assert snap["tpm"]["available"] == 800 and snap["rpm"]["available"] == 99
+    assert snap["counters"]["interactive"]["admitted"] == 1 and snap["in_flight"] == 0
+
+
+def test_slots_granted_in_priority_order():
+    sched = LLMScheduler(rpm=60, tpm=100000)
+    sched.rpm.tokens = 0  # next slot in ~1s
+    order = []
+
+    def call(priority):
+        with sched.slot(priority, 10):
+            order.append(priority)
+
+    threads = [threading.Thread(target=call, args=(p,)) for p in (BATCH, WHAT_IF, INTERACTIVE)]
+    for t in threads:
+        t.start()
+        time.sleep(0.05)
+    assert sched.snapshot()["queued"] == {"interactive": 1, "what_if": 1, "batch": 1}
+    for t in threads:
+        t.join()
+    assert order == [INTERACTIVE, WHAT_IF, BATCH]
+
+
+def test_deep_queue_sheds_low_priority_only():
+    sched = LLMScheduler(rpm=60, tpm=100000, shed_depth={INTERACTIVE: None, WHAT_IF: 3, BATCH: 1})
+    sched.rpm.tokens = 0
+
+    def wait_for_slot():
+        with sched.slot(INTERACTIVE, 1):
+            pass
+
+    waiters = [threading.Thread(target=wait_for_slot) for _ in range(2)]
+    for t in waiters:
+        t.start()
+    try:
+        time.sleep(0.05)
+        with pytest.raises(Overloaded):
+            sched.acquire(BATCH, 1)
+        assert sched.snapshot()["counters"]["batch"]["shed"] == 1
+        # What-if is still admitted to the queue at this depth
+        sched.timeouts[WHAT_IF] = 0.05
+        with pytest.raises(Overloaded, match="waited"):
+            sched.acquire(WHAT_IF, 1)
+        snap = sched.snapshot()
+        assert snap["counters"]["what_if"]["timed_out"] == 1 and snap["queue_depth"] == 2
+    finally:
+        # Let the waiters through so no thread outlives the test
+        with sched._cond:
+            sched.rpm.tokens = sched.rpm.capacity
+            sched._cond.notify_all()
+        for t in waiters:
+            t.join(timeout=5)
+    assert not any(t.is_alive() for t in waiters) and sched.snapshot()["in_flight"] == 0
+
+
+def test_in_flight_is_capped_at_max_concurrency():
+    sched = LLMScheduler(rpm=1000, tpm=100000, max_concurrency=2)
+    release = threading.Event()
+    peak = []
+
+    def call():
+        with sched.slot(INTERACTIVE, 1):
+            peak.append(sched.snapshot()["in_flight"])
+            release.wait(5)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for t in threads:
+        t.start()
+    try:
+        time.sleep(0.05)
+        snap = sched.snapshot()
+        assert snap["in_flight"] == 2 and snap["queue_depth"] == 1
+    finally:
+        release.set()
+        for t in threads:
+            t.join(timeout=5)
+    assert max(peak) == 2 and len(peak) == 3 and sched.snapshot()["in_flight"] == 0
+
+
+def test_priority_context_never_upgrades():
+    assert current_priority() == INTERACTIVE
+    assert current_priority(WHAT_IF) == WHAT_IF
+    with llm_priority(BATCH):
+        assert current_priority(WHAT_IF) == BATCH
+    assert current_priority() == INTERACTIVE
+
+
+def test_overload_degrades_recommendation_to_rules(monkeypatch):
+    import main
+
+    def overloaded(profile_text):
+        raise Overloaded("queue full")
+
+    monkeypatch.setattr(main, "run_structured_recommendation", overloaded)
+    result = main.get_recommendation("Age: 35\nMonthly Income: ₹60000\nDependents: 2\n",
+                                     render_charts=False, save_output=False)
+    assert result["served_by"] == "rules_engine"
+    assert result["recommendation"].term_insurance is not None
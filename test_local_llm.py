@@ -0,0 +1,67 @@
+import json
+import os
+import threading
+from typing import List, Optional
+
+import pytest
+from pydantic import BaseModel
+
+import local_llm
+from local_llm import LocalLLM, StaticBackend, get_local_llm, reset_local_llm, schema_for
+
+
+class Cover(BaseModel):
+    coverage: str
+    add_ons: Optional[List[str]] = []
+
+
+def test_concurrent_requests_are_serialized():
+    backend = StaticBackend(lambda req: req["messages"][-1]["content"].upper(), delay=0.05)
+    llm = LocalLLM(backend, max_batch=8)
+    results = {}
+
+    def ask(i):
+        results[i] = llm.complete_text(f"q{i}")
+
+    threads = [threading.Thread(target=ask, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == {i: f"Q{i}" for i in range(16)}
+    assert sum(backend.batches) == 16 and max(backend.batches) > 1 and max(backend.batches) <= 8
+
+
+def test_json_requests_carry_the_schema():
+    seen = []
+    backend = StaticBackend(lambda req: seen.append(req["schema"]) or '{"coverage": "₹1 crore"}')
+    result = LocalLLM(backend).complete_json("system", "profile", Cover)
+    assert Cover.model_validate_json(result["text"]).coverage == "₹1 crore"
+    assert json.loads(seen[0])["required"] == ["coverage"] and seen[0] == schema_for(Cover)
+
+
+def test_backend_errors_reach_every_caller():
+    class Broken:
+        def generate(self, requests):
+            raise RuntimeError("out of memory")
+
+    with pytest.raises(RuntimeError, match="out of memory"):
+        LocalLLM(Broken()).complete_text("hi")
+
+
+def test_shared_instance_is_created_once():
+    reset_local_llm()
+    try:
+        first = get_local_llm(StaticBackend())
+        assert get_local_llm() is first
+    finally:
+        reset_local_llm()
+
+
+@pytest.mark.skipif(not os.getenv("LOCAL_MODEL_PATH"), reason="set LOCAL_MODEL_PATH to a small GGUF model")
+def test_real_model_output_matches_grammar():
+    pytest.importorskip("llama_cpp")
+    llm = LocalLLM(local_llm.LlamaCppBackend(os.environ["LOCAL_MODEL_PATH"], n_threads=2, n_ctx=1024))
+    result = llm.complete_json("Reply with an insurance cover as JSON.", "Age 30, income 50000", Cover)
+    Cover.model_validate_json(result["text"])
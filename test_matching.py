@@ -0,0 +1,91 @@
+from catalog import (INF, IntervalIndex, catalog_index, catalog_plans, coverage_distance, parse_coverage_range,
+                     parse_range_text)
+from matching import coverage_fit, match_products
+
+
+def test_every_category_gets_products():
+    requirements = {t: {"coverage": "₹10 lakhs", "age": 35, "coverage_inr": 1000000}
+                    for t in ("term", "health", "vehicle", "travel", "personal_accident")}
+    matches = match_products(requirements)
+    for product_type, found in matches.items():
+        assert 1 <= len(found) <= 3, product_type
+
+
+def test_ranked_by_score_then_csr():
+    found = match_products({"health": {"coverage": "₹10 Lakhs (Family Floater)"}}, k=5)["health"]
+    star = next(m for m in found if m["company"] == "Star Health")
+    assert star["explanation"].endswith("your needs for coverage.")
+    assert found[0]["company"] == "HDFC ERGO"  # highest CSR among equal scores
+
+
+def test_top_k_is_bounded():
+    assert len(match_products({"term": {}}, k=2)["term"]) == 2
+
+
+def test_range_text_parsing():
+    assert parse_range_text("18 to ~65 years depending on plan") == (18, 65)
+    assert parse_range_text("5-40 years") == (5, 40)
+    assert parse_range_text("18+ years for adults") == (18, INF)
+    assert parse_range_text("Minimum 18 years, maximum varies by plan (e.g., up to 65 years)") == (18, INF)
+
+
+def test_interval_index_matches_brute_force():
+    intervals = [(18, 65), (18, 60), (0.5, 70), (-INF, INF), (30, 30), (40, INF)]
+    index = IntervalIndex(intervals)
+    for x in [0, 0.5, 17.9, 18, 30, 45, 60, 60.5, 65, 70, 71, 1000]:
+        expected = sum(1 << i for i, (low, high) in enumerate(intervals) if low <= x <= high)
+        assert index.lookup(x) == expected, x
+
+
+def test_ineligible_plans_are_not_suggested():
+    # A 63-year-old needs a 10-year term; plans capped at entry age 60 drop out
+    found = match_products({"term": {"age": 63, "term_years": 10}}, k=50)["term"]
+    names = {m["plans"][0] for m in found}
+    assert "ICICI Term Insurance" in names and "ICICI Return of Premium (ROP) Term Plan" not in names
+    for _, plan in catalog_index.candidates("term", 63, 10):
+        assert plan["age_range"][0] <= 63 <= plan["age_range"][1]
+
+    # An 18-year-old wants a 42-year term: plans capped at 40 years are offered at 40, not dropped
+    capped = [p["name"] for p in catalog_plans if "term" in p["types"] and p["term_range"][1] == 40]
+    young = {m["plans"][0] for m in match_products({"term": {"age": 18, "term_years": 42}}, k=50)["term"]}
+    assert capped and set(capped) <= young
+    assert "ICICI Term Insurance" not in {m["plans"][0] for m in match_products({"term": {"term_years": 4}}, k=50)["term"]}
+
+    # Quoted premiums above the budget exclude the plan
+    cheap = match_products({"health": {"premium_budget": 9500}}, k=50)["health"]
+    assert {m["plans"][0] for m in cheap} >= {"Family Health Optima"}
+    assert "ReAssure 2.0" not in {m["plans"][0] for m in cheap}
+    assert len(cheap) < sum("health" in p["types"] for p in catalog_plans)
+
+
+def test_coverage_ranges_parsed_at_load():
+    ranges = {p["name"]: p["coverage_range"] for p in catalog_plans}
+    assert ranges["Family Health Optima"] == (1e6, 1e6)
+    assert ranges["Click 2 Protect Life"] == (1e7, 1e7)
+    assert ranges["Tata AIG Auto Secure"] == (5e4, 5e6)
+    assert ranges["Axis Max Term Plan"] == (2.5e6, INF)
+    assert ranges["ICICI Term Insurance"] is None
+    assert parse_coverage_range("₹5 lakhs to ₹2 crores") == (5e5, 2e7)
+
+
+def test_closer_coverage_ranks_higher():
+    found = match_products({"health": {"coverage": "₹2 crore", "coverage_inr": 2e7}}, k=3)["health"]
+    assert found[0]["plans"] == ["Health Insurance (Optima Secure, Health Suraksha)"] and found[0]["score"] == 2
+    assert all(m["score"] < 2 for m in found[1:])
+    assert all("indicative_premium" not in m for m in found)  # no profile-level price dressed as a quote
+    assert coverage_fit(coverage_distance(2e7, (5e5, 1e7))) == 1 / 2  # one doubling above the range
+    assert coverage_fit(coverage_distance(2.5e5, (1e6, 1e7))) == 1 / 3  # two doublings below it
+    assert coverage_fit(None) == 0
+    # Below every range: the smallest sums insured are nearest
+    cars = match_products({"vehicle": {"coverage_inr": 30000}}, k=3)["vehicle"]
+    assert cars[0]["plans"] == ["Tata AIG Auto Secure"]
+
+
+def test_nearest_walk_matches_full_scan():
+    for product_type in ("term", "health", "vehicle", "travel", "personal_accident"):
+        for coverage in (2e4, 5e5, 1e6, 3e6, 1e7, 5e7, 1e9):
+            reqs = {"coverage_inr": coverage, "age": 40}
+            fast = match_products({product_type: reqs}, k=4)[product_type]
+            # An unscored extra requirement forces the exhaustive path with the same scores
+            slow = match_products({product_type: {**reqs, "unused": "x"}}, k=4)[product_type]
+            assert [(m["plans"], m["score"]) for m in fast] == [(m["plans"], m["score"]) for m in slow]
@@ -0,0 +1,188 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from llm_scheduler import LLMScheduler, Overloaded
+from model_router import COOLDOWN_S, REPAIR_CALL, RECOMMENDATION_CALL, WHAT_IF_CALL, ModelRouter, discover_models
+
+AVAILABLE = ["gemini-2.0-flash", "gemini-2.5-flash", "gemini-2.5-flash-lite", "gemini-2.5-pro"]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_discovery_is_cached_on_disk(tmp_path):
+    cache = str(tmp_path / "models.json")
+    calls = []
+
+    def list_models():
+        calls.append(1)
+        return AVAILABLE
+
+    assert discover_models(cache, ttl_s=100, list_models=list_models, now=lambda: 0) == AVAILABLE
+    assert discover_models(cache, ttl_s=100, list_models=list_models, now=lambda: 50) == AVAILABLE
+    assert len(calls) == 1
+
+    def offline():
+        raise ConnectionError("no network")
+    # A stale cache still answers when listing fails; nothing known at all is None
+    assert discover_models(cache, ttl_s=100, list_models=offline, now=lambda: 500) == AVAILABLE
+    assert json.load(open(cache))["fetched_at"] == 0
+    assert discover_models(str(tmp_path / "missing.json"), list_models=offline) is None
+
+
+def test_call_types_route_to_their_tier():
+    router = ModelRouter(discover=lambda: AVAILABLE)
+    assert router.choose(RECOMMENDATION_CALL) == "gemini-2.5-pro"
+    assert router.choose(WHAT_IF_CALL) == "gemini-2.5-flash"
+    assert router.choose(REPAIR_CALL) == "gemini-2.5-flash-lite"
+    # Unavailable models are skipped; slower tiers are the last resort
+    router = ModelRouter(discover=lambda: ["gemini-2.0-flash", "gemini-2.5-pro"])
+    assert router.route(REPAIR_CALL) == ["gemini-2.0-flash", "gemini-2.5-pro"]
+
+
+def test_slow_preferred_model_downgrades_to_faster_tier():
+    router = ModelRouter(budgets_ms={WHAT_IF_CALL: 5000}, discover=lambda: AVAILABLE, clock=FakeClock())
+    for latency in [1200, 1500, 1100, 9000, 9500]:
+        router.record("gemini-2.5-flash", latency, True)
+    assert router.choose(WHAT_IF_CALL) == "gemini-2.0-flash"
+    # Fast calls push the slow ones out of the p95 and the preferred model returns
+    for _ in range(100):
+        router.record("gemini-2.5-flash", 1000, True)
+    assert router.choose(WHAT_IF_CALL) == "gemini-2.5-flash"
+    assert router.snapshot()["models"]["gemini-2.5-flash"]["p95_ms"] == 1000
+
+
+def test_failover_and_cooldown():
+    clock = FakeClock()
+    router = ModelRouter(discover=lambda: AVAILABLE, clock=clock)
+
+    def call(model):
+        if model == "gemini-2.5-pro":
+            raise RuntimeError("503 model overloaded")
+        return f"answer from {model}"
+
+    assert router.invoke(RECOMMENDATION_CALL, call) == ("answer from gemini-2.5-flash", "gemini-2.5-flash")
+    assert router.choose(RECOMMENDATION_CALL) == "gemini-2.5-flash"
+    clock.now = COOLDOWN_S + 1
+    assert router.choose(RECOMMENDATION_CALL) == "gemini-2.5-pro"
+    with pytest.raises(ZeroDivisionError):
+        router.invoke(RECOMMENDATION_CALL, lambda model: 1 / 0 if model else None)
+
+
+def test_stream_fails_over_before_first_chunk():
+    router = ModelRouter(discover=lambda: AVAILABLE, clock=FakeClock())
+
+    def open_stream(model):
+        if model == "gemini-2.5-flash":
+            raise RuntimeError("timeout")
+        yield from ["One. ", "Two. ", "Three."]
+
+    stream = router.stream(WHAT_IF_CALL, open_stream)
+    assert next(stream) == "One. "
+    stream.close()  # the reader stopped early: still a successful call
+    snap = router.snapshot()["models"]
+    assert snap["gemini-2.5-flash"]["errors"] == 1 and snap["gemini-2.0-flash"]["calls"] == 1
+    assert snap["gemini-2.0-flash"]["errors"] == 0
+
+
+def test_main_routes_what_if_and_repair_calls(monkeypatch):
+    monkeypatch.setattr(main, "router", ModelRouter(discover=lambda: AVAILABLE))
+    used = []
+
+    class FakeChat:
+        def __init__(self, model):
+            self.model = model
+
+        def stream(self, prompt):
+            used.append(self.model)
+            return iter(["Premiums rise slightly."])
+
+    monkeypatch.setattr(main, "get_llm", FakeChat)
+    assert main.answer_what_if_question("Is a ULIP a good idea for me?", "Age: 35") == "Premiums rise slightly."
+    assert used == ["gemini-2.5-flash"]
+
+    fixed = main.calculate_insurance_recommendations("Age: 35\nMonthly Income: ₹60000\nDependents: 2\n")
+
+    class FakeStructured:
+        def __init__(self, model):
+            self.model = model
+
+        def invoke(self, messages):
+            used.append(self.model)
+            usage = {"input_tokens": 10, "output_tokens": 5, "total_tokens": 15}
+            if self.model == "gemini-2.5-pro":
+                return {"raw": SimpleNamespace(content="Sorry, I cannot", usage_metadata=usage), "parsed": None}
+            return {"raw": SimpleNamespace(content="", usage_metadata=usage), "parsed": fixed}
+
+    monkeypatch.setattr(main, "get_structured_llm", FakeStructured)
+    recommendation, token_usage, repairs = main.run_structured_recommendation("Age: 35")
+    assert recommendation == fixed and repairs == ["llm_repair_retry"]
+    assert token_usage["model"] == "gemini-2.5-pro" and used[-2:] == ["gemini-2.5-pro", "gemini-2.5-flash-lite"]
+
+
+def test_each_attempt_takes_its_own_slot(monkeypatch):
+    scheduler = LLMScheduler(rpm=100, tpm=100000)
+    monkeypatch.setattr(main, "scheduler", scheduler)
+    monkeypatch.setattr(main, "router", ModelRouter(discover=lambda: AVAILABLE))
+    usage = {"input_tokens": 10, "output_tokens": 5, "total_tokens": 15}
+    fixed = main.calculate_insurance_recommendations("Age: 35\nMonthly Income: ₹60000\nDependents: 2\n")
+
+    def structured(model):
+        def invoke(messages):
+            if model == "gemini-2.5-pro":
+                raise RuntimeError("503 model overloaded")
+            return {"raw": SimpleNamespace(content="", usage_metadata=usage), "parsed": fixed}
+        return SimpleNamespace(invoke=invoke)
+
+    monkeypatch.setattr(main, "get_structured_llm", structured)
+    main.run_structured_recommendation("Age: 35")
+    assert scheduler.counters["interactive"]["admitted"] == 2 and scheduler.in_flight == 0
+
+    recorded = []
+    monkeypatch.setattr(main, "record_llm", lambda call, model, *args, **kwargs: recorded.append(model))
+
+    def chat(model):
+        def stream(prompt):
+            if model == "gemini-2.5-flash":
+                raise RuntimeError("timeout")
+            return iter(["Premiums rise slightly."])
+        return SimpleNamespace(stream=stream)
+
+    monkeypatch.setattr(main, "get_llm", chat)
+    assert main.answer_what_if_question("Is a ULIP a good idea for me?", "Age: 35") == "Premiums rise slightly."
+    assert recorded == ["gemini-2.0-flash"]
+    assert scheduler.counters["what_if"]["admitted"] == 2 and scheduler.in_flight == 0
+
+    # A refused failover slot: the first slot is released once, nothing else
+    monkeypatch.setattr(main, "router", ModelRouter(discover=lambda: AVAILABLE))
+    acquire, calls = scheduler.acquire, []
+
+    def refuse_failover(priority, estimated):
+        calls.append(priority)
+        if len(calls) > 1:
+            raise Overloaded("queue full")
+        return acquire(priority, estimated)
+
+    monkeypatch.setattr(scheduler, "acquire", refuse_failover)
+    answer = main.answer_what_if_question("Is a ULIP a good idea at 40?", "Age: 40")
+    assert "try again" in answer and len(calls) == 2 and scheduler.in_flight == 0
+
+
+def test_refused_admission_does_not_fail_over():
+    router = ModelRouter(discover=lambda: AVAILABLE)
+    tried = []
+
+    def refuse():
+        raise Overloaded("queue full")
+
+    with pytest.raises(Overloaded):
+        router.invoke(RECOMMENDATION_CALL, tried.append, admit=refuse)
+    assert tried == [] and router.snapshot()["models"] == {}
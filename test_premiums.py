@@ -0,0 +1,40 @@
+import numpy as np
+
+from premiums import quote_premium, quote_premiums
+
+def test_band_points_and_interpolation():
+    # Exact band points reproduce the table; values between bands interpolate
+    assert quote_premium("term", 30, 10000000) == 8000
+    assert quote_premium("health", 35, 1000000) == 10000
+    assert 8000 < quote_premium("term", 32, 10000000) < quote_premium("term", 35, 10000000)
+
+
+def test_loadings_and_riders():
+    base = quote_premium("term", 35, 10000000)
+    assert quote_premium("term", 35, 10000000, health_condition="Diabetes") == round(base * 1.4)
+    assert quote_premium("term", 35, 10000000, smoker=True) == round(base * 1.6)
+    assert quote_premium("term", 35, 10000000, riders=["Critical Illness Rider"]) == round(base * 1.2)
+
+
+def test_batch_matches_single_quotes():
+    ages = np.array([22, 35, 47, 64])
+    coverages = np.array([3000000, 10000000, 12500000, 40000000])
+    conditions = np.array(["None", "Diabetes", "Heart Issues", "Other"])
+    batch = quote_premiums("term", ages, coverages, conditions)
+    singles = [quote_premium("term", a, c, h) for a, c, h in zip(ages, coverages, conditions)]
+    assert batch.tolist() == singles
+
+
+def test_single_quotes_match_the_vectorized_path():
+    rng = np.random.default_rng(3)
+    ages = rng.integers(10, 75, 400)
+    coverages = np.concatenate([rng.integers(50000, 60000000, 380), [2500000, 5000000, 300000, 100000, 10000000,
+                                                                      50000000, 2000000, 500000, 0, 99999999,
+                                                                      1000000, 1500000, 20000000, 40000, 70000000,
+                                                                      2500000, 25000000, 600000, 10000000, 4000000]])
+    conditions = rng.choice(["None", "Diabetes", "Heart Issues", "Other", "Asthma"], 400)
+    smokers = rng.random(400) < 0.3
+    for product in ("term", "health", "vehicle", "personal_accident"):
+        batch = quote_premiums(product, ages, coverages, conditions, smokers)
+        singles = [quote_premium(product, a, c, h, bool(s)) for a, c, h, s in zip(ages, coverages, conditions, smokers)]
+        assert batch.tolist() == singles
@@ -0,0 +1,47 @@
+import sys
+from itertools import islice
+
+import pytest
+
+import load_driver
+from profiles import build_profile_text, generate_profiles
+
+
+@pytest.fixture(scope="module")
+def first():
+    return list(generate_profiles(500, seed=7))
+
+
+def test_same_seed_gives_same_stream(first):
+    assert first == list(generate_profiles(500, seed=7))
+
+
+def test_unbounded_stream_can_be_sliced():
+    # Streaming: an unbounded generator can be sliced without materializing it
+    assert len(list(islice(generate_profiles(seed=1), 2000))) == 2000
+
+
+def test_profile_text_matches_app_format(first):
+    for profile in first[:50]:
+        lines = build_profile_text(profile).strip().split("\n")
+        keys = [line.split(":", 1)[0] for line in lines]
+        assert keys == [
+            "Age", "Monthly Income", "Marital Status", "Dependents", "Employment",
+            "Existing Insurance", "Health Conditions", "Vehicle", "Owns Property",
+            "Frequent Traveler",
+        ]
+        assert lines[1] == f"Monthly Income: ₹{profile['income']}"
+
+
+def test_values_stay_in_range(first):
+    for profile in first:
+        assert 21 <= profile["age"] <= 65
+        assert 10000 <= profile["income"] <= 1000000
+        assert profile["marital_status"] in ("Single", "Married", "Divorced")
+        assert profile["vehicle"] in ("Yes", "No")
+
+
+def test_rules_targets_do_not_need_main(first, monkeypatch):
+    monkeypatch.setitem(sys.modules, "main", None)
+    assert load_driver.TARGETS["rules"]()(first[0]).term_insurance.coverage_inr > 0
+    assert load_driver.TARGETS["matcher"]()(first[0]) >= 0
@@ -0,0 +1,46 @@
+import json
+import os
+import time
+from collections import Counter
+
+import profiling
+from profiling import enforce_retention, profile_block, profiled, to_collapsed, to_speedscope
+
+STACKS = Counter({("main (app.py:1)", "get_recommendation (main.py:10)", "parse (json.py:5)"): 3,
+                  ("main (app.py:1)", "get_recommendation (main.py:10)"): 1})
+
+
+def test_disabled_decorator_returns_the_function_itself():
+    def handler():
+        return 42
+    if not profiling.ENABLED:
+        assert profiled("x")(handler) is handler
+
+
+def test_output_formats():
+    assert to_collapsed(STACKS).splitlines()[0] == "main (app.py:1);get_recommendation (main.py:10);parse (json.py:5) 3"
+    doc = to_speedscope(STACKS, "req", 0.005)
+    frames = doc["shared"]["frames"]
+    assert [f["name"] for f in frames] == ["main", "get_recommendation", "parse"]
+    assert frames[2] == {"name": "parse", "file": "json.py", "line": 5}
+    assert doc["profiles"][0]["weights"] == [15.0, 5.0]
+
+
+def test_forced_block_writes_a_profile(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    with profile_block("busy", force=True) as info:
+        deadline = time.perf_counter() + 0.1
+        while time.perf_counter() < deadline:
+            sum(range(1000))
+    assert info["path"] and os.path.dirname(info["path"]) == str(tmp_path)
+    doc = json.load(open(info["path"]))
+    assert any(f["name"] == "test_forced_block_writes_a_profile" for f in doc["shared"]["frames"])
+
+
+def test_retention_keeps_newest(tmp_path):
+    for i in range(5):
+        path = tmp_path / f"p{i}.txt"
+        path.write_text("x" * 100)
+        os.utime(path, (i, i))
+    enforce_retention(str(tmp_path), keep=3, max_bytes=250)
+    assert sorted(os.listdir(tmp_path)) == ["p3.txt", "p4.txt"]
@@ -0,0 +1,44 @@
+import json
+import os
+import xml.etree.ElementTree as ET
+
+from reports import CSS_FILENAME, render_report_html, render_reports, report_filename
+
+SECTION = {"coverage": "₹50 lakhs", "estimated_premium": "₹7000/year", "reason": "Family <security>",
+           "add_ons": ["Critical Illness Rider"], "priority": "must-have"}
+RECORD = {
+    "id": "cust/42", "profile": {"age": 35, "income": 60000, "dependents": 2},
+    "term_coverage": 5000000, "term_premium": 7000, "health_coverage": 1000000, "health_premium": 11000,
+    "recommendation": {"term_insurance": SECTION, "health_insurance": dict(SECTION, coverage="₹10 lakhs"),
+                       "premium_affordability_check": "Affordable", "additional_advice": ["Review yearly"],
+                       "products_to_avoid": []},
+    "products": {"Term Insurance": [{"company": "LIC India", "plans": ["LIC Digi Term"], "score": 2,
+                                     "csr": "98.5%"}]},
+}
+
+
+def test_report_html_is_escaped_and_complete():
+    page = render_report_html(RECORD)
+    assert "Family &lt;security&gt;" in page and "<security>" not in page
+    assert "LIC Digi Term" in page and "₹60,000" in page
+    assert f'href="{CSS_FILENAME}"' in page
+    # Inline charts are well-formed SVG
+    start = page.index("<svg")
+    ET.fromstring(page[start:page.index("</svg>", start) + len("</svg>")])
+
+
+def test_bulk_render_writes_one_file_per_record(tmp_path):
+    records = tmp_path / "scored.jsonl"
+    rows = [dict(RECORD, id=f"c{i}") for i in range(5)] + [{"id": "bad", "error": "LLM timeout"}]
+    records.write_text("\n".join(json.dumps(r) for r in rows), encoding="utf-8")
+
+    summary = render_reports(str(records), str(tmp_path / "out"), workers=2, chunk_size=2)
+    assert summary["written"] == 5 and summary["errors"] == 1
+    files = sorted(os.listdir(tmp_path / "out"))
+    assert files == [CSS_FILENAME] + [f"report_c{i}.html" for i in range(5)]
+
+
+def test_sanitized_ids_do_not_collide():
+    names = {report_filename({"id": customer}, "html") for customer in ("cust/42", "cust_42", "cust 42")}
+    assert len(names) == 3 and "report_cust_42.html" in names
+    assert all(name.startswith("report_cust_42") and "/" not in name for name in names)
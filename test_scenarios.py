@@ -0,0 +1,80 @@
+from scenarios import parse_what_if, run_what_if_scenario
+
+profile_text = """Age: 35
+Monthly Income: ₹75000
+Marital Status: Married
+Dependents: 2
+Employment: Private Job
+Existing Insurance: None
+Health Conditions: None
+Vehicle: Yes
+Owns Property: Yes
+Frequent Traveler: No
+"""
+
+
+def test_suggested_questions_are_parsed():
+    assert parse_what_if("What if my income increases by 20%?") == [
+        {"field": "income", "op": "scale", "value": 1.2}]
+    assert parse_what_if("What if I add 2 more dependents?") == [
+        {"field": "dependents", "op": "add", "value": 2}]
+    assert parse_what_if("What if I increase my health coverage to ₹15 lakhs?") == [
+        {"field": "health_coverage", "op": "set", "value": 1500000}]
+
+
+def test_open_ended_questions_fall_through():
+    assert run_what_if_scenario("Which insurance company has the highest claim settlement ratio?", profile_text) is None
+    assert run_what_if_scenario("Is a ULIP a good idea for me?", profile_text) is None
+
+
+def test_income_change_recomputes_term_cover():
+    result = run_what_if_scenario("What if my income increases by 20%?", profile_text)
+    assert result["profile_after"]["income"] == 90000
+    assert result["changes"]["term_coverage"] == {"before": 13500000, "after": 16200000}
+    assert "health_coverage" not in result["changes"]
+    assert "₹1.62 crore" in result["answer"]
+
+
+def test_dropping_dependents_lowers_multiplier():
+    result = run_what_if_scenario("What if I have no kids?", profile_text)
+    assert result["changes"]["term_multiplier"] == {"before": 15, "after": 10}
+
+
+def test_have_n_kids_sets_the_count():
+    assert parse_what_if("What if I have 3 kids?") == [{"field": "dependents", "op": "set", "value": 3}]
+    assert parse_what_if("What if I have 2 more kids?") == [{"field": "dependents", "op": "add", "value": 2}]
+    # Already 2 dependents: no rules input changes, so the LLM answers
+    assert run_what_if_scenario("What if I have 2 kids?", profile_text) is None
+
+
+def test_deltas_are_clamped():
+    result = run_what_if_scenario("What if my income decreases by 120%?", profile_text)
+    assert result["profile_after"]["income"] == 0
+    assert "₹-" not in result["answer"]
+    assert run_what_if_scenario("What if I have 2 fewer kids?", profile_text.replace("Dependents: 2", "Dependents: 1")
+                                )["profile_after"]["dependents"] == 0
+
+
+def test_partly_parsed_questions_go_to_the_llm():
+    assert run_what_if_scenario("What if I turn 45 and get diabetes?", profile_text) is None
+    assert run_what_if_scenario("What if I sell my car, which insurer is best?", profile_text) is None
+    assert run_what_if_scenario("What if I get married?", profile_text) is None
+
+
+def test_answer_describes_override_and_affordability_base():
+    answer = run_what_if_scenario("What if I increase my term cover to ₹5 crore?", profile_text)["answer"]
+    assert "the amount you chose" in answer and "× annual income" not in answer
+    assert "of annual income; the affordability check allows up to 10%" in answer
+
+
+def test_affordability_uses_annual_income():
+    answer = run_what_if_scenario("What if my income increases by 20%?", profile_text)["answer"]
+    assert "Premiums remain affordable" in answer and "(2.8% of annual income;" in answer
+
+
+def test_age_and_raise_phrasings():
+    assert parse_what_if("What if I'm 50?") == [{"field": "age", "op": "set", "value": 50}]
+    assert parse_what_if("What if I am 50 years old?") == [{"field": "age", "op": "set", "value": 50}]
+    assert parse_what_if("What if I get a raise of 20%?") == [{"field": "income", "op": "scale", "value": 1.2}]
+    assert parse_what_if("What if I get a 10% hike?") == [{"field": "income", "op": "scale", "value": 1.1}]
+    assert run_what_if_scenario("What if I'm 50?", profile_text)["profile_after"]["age"] == 50
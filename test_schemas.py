@@ -0,0 +1,34 @@
+from schemas import InsuranceDetails, InsuranceRecommendation, format_inr, parse_annual_premium, parse_inr
+
+
+def test_amount_strings_parse_to_rupees():
+    assert parse_inr("₹1 crores") == 10_000_000  # the old extract_number read this as 1
+    assert parse_inr("₹1.5 crore") == 15_000_000
+    assert parse_inr("₹20L") == 2_000_000
+    assert parse_inr("Rs 10,00,000") == 1_000_000
+    assert parse_inr("₹5-10 lakhs") == 500_000
+    assert parse_inr("Varies") == 0
+    assert parse_annual_premium("₹750/month") == 9000
+    assert parse_annual_premium("₹8,000/year") == 8000
+
+
+def test_display_strings_are_derived():
+    assert format_inr(10_000_000) == "₹1 crore"
+    assert format_inr(25_000_000) == "₹2.5 crores"
+    assert format_inr(1_000_000) == "₹10 lakhs"
+    assert format_inr(50_000) == "₹50,000"
+    details = InsuranceDetails(coverage_inr=15_000_000, annual_premium_inr=12_000, reason="r")
+    assert (details.coverage, details.estimated_premium) == ("₹1.5 crores", "₹12000/year")
+
+
+def test_legacy_keys_and_round_trip():
+    section = {"coverage": "₹1 crores", "estimated_premium": "₹12000/year", "reason": "r"}
+    rec = InsuranceRecommendation.model_validate({"term_insurance": section, "health_insurance": section})
+    assert rec.term_insurance.coverage_inr == 10_000_000 and rec.term_insurance.annual_premium_inr == 12_000
+    dumped = rec.model_dump()
+    assert dumped["term_insurance"]["coverage"] == "₹1 crore"
+    assert InsuranceRecommendation.model_validate(dumped) == rec
+    assert [s.coverage_inr for s in rec.sections()] == [10_000_000, 10_000_000]
+    # The schema sent to the model asks for numbers only
+    schema = InsuranceDetails.model_json_schema()
+    assert schema["required"] == ["coverage_inr", "annual_premium_inr", "reason"]
@@ -0,0 +1,82 @@
+import json
+import os
+import time
+
+import pytest
+
+from sharded_batch import claim, merge, run_local, run_pending, run_shard, split, status
+
+
+def write_rows(path, n=40):
+    rows = [{"id": f"C{i:03d}", "age": 25 + i % 35, "income": 30000 + 5000 * (i % 9), "dependents": i % 4}
+            for i in range(n)]
+    rows += rows[:3]  # the same customers exported twice
+    rows.append({"id": "broken", "age": "unknown"})
+    with open(path, "w") as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+
+
+def test_shards_merge_deterministically(tmp_path):
+    write_rows(tmp_path / "in.jsonl")
+    outputs = []
+    for shards in (3, 5):
+        workdir = str(tmp_path / f"w{shards}")
+        manifest = split(str(tmp_path / "in.jsonl"), workdir, shards, chunk_size=10)
+        assert manifest["rows"] == 44 and len(manifest["rows_per_shard"]) == shards
+        # Repeated customers are dropped before scoring
+        assert manifest["duplicates"] == 3 and sum(manifest["rows_per_shard"]) == 41
+        run_pending(workdir)
+        stats = merge(workdir, str(tmp_path / f"out{shards}.jsonl"))
+        outputs.append(open(tmp_path / f"out{shards}.jsonl").read())
+
+    assert outputs[0] == outputs[1]
+    records = [json.loads(line) for line in outputs[0].splitlines()]
+    assert [r["row"] for r in records] == sorted(r["row"] for r in records)
+    assert stats["records"] == 41 and stats["duplicates"] == 3 and stats["errors"] == 1
+    assert 0 < stats["mean_premium_to_income"] < 1 and 0 <= stats["underinsured_share"] <= 1
+    assert stats["top_insurers"][0][1] >= stats["top_insurers"][-1][1]
+
+
+def test_failed_shard_is_retried_alone(tmp_path):
+    write_rows(tmp_path / "in.jsonl", 20)
+    workdir = str(tmp_path / "w")
+    split(str(tmp_path / "in.jsonl"), workdir, 2, chunk_size=5)
+    shard_file = tmp_path / "w" / "shards" / "shard-00001.jsonl"
+    good = shard_file.read_text()
+    shard_file.write_text(good + "{truncated\n")
+
+    with pytest.raises(ValueError):
+        run_shard(workdir, 1)
+    run_shard(workdir, 0)
+    assert status(workdir)["shards"] == {0: "done", 1: "failed"}
+    with pytest.raises(RuntimeError, match="not finished"):
+        merge(workdir, str(tmp_path / "out.jsonl"))
+    # A plain --next worker leaves the failed shard alone; a retry picks it up
+    assert run_pending(workdir) == []
+    shard_file.write_text(good)
+    [summary] = run_pending(workdir, retry_failed=True)
+    assert summary["shard"] == 1 and summary["attempts"] == 2
+    assert merge(workdir, str(tmp_path / "out.jsonl"))["records"] == 21
+
+
+def test_local_worker_processes(tmp_path):
+    write_rows(tmp_path / "in.jsonl", 12)
+    workdir = str(tmp_path / "w")
+    split(str(tmp_path / "in.jsonl"), workdir, 3, chunk_size=4)
+    assert run_local(workdir, processes=2, retries=0)["counts"] == {"done": 3}
+    assert merge(workdir, str(tmp_path / "out.jsonl"))["records"] == 13
+
+
+def test_stale_claim_is_taken_over(tmp_path):
+    write_rows(tmp_path / "in.jsonl", 8)
+    workdir = str(tmp_path / "w")
+    split(str(tmp_path / "in.jsonl"), workdir, 2, chunk_size=4)
+    assert claim(workdir, 0)
+    assert not claim(workdir, 0) and status(workdir)["shards"][0] == "running"
+    # A crashed worker stops refreshing its claim
+    old = time.time() - 120
+    os.utime(tmp_path / "w" / "claims" / "shard-00000", (old, old))
+    assert [r["shard"] for r in run_pending(workdir, claim_timeout=60)] == [0, 1]
+    assert status(workdir)["counts"] == {"done": 2}
+    assert os.listdir(tmp_path / "w" / "claims") == []
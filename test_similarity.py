@@ -0,0 +1,127 @@
+import sys
+
+import numpy as np
+import pytest
+
+import main
+import similarity
+from similarity import SimilarityIndex, profile_features
+from rules import parse_profile_text
+
+PROFILE = ("Age: {age}\nMonthly Income: ₹{income}\nMarital Status: {marital}\nDependents: 2\n"
+           "Employment: Private Job\nExisting Insurance: health_insurance\nHealth Conditions: None\n"
+           "Vehicle: Yes\nOwns Property: No\nFrequent Traveler: No\n")
+
+
+def profile(age=35, income=75000, marital="Married"):
+    return PROFILE.format(age=age, income=income, marital=marital)
+
+
+def llm_style(profile_text):
+    # Rules figures with LLM-only wording, so reuse is visible
+    rules = main.calculate_insurance_recommendations(profile_text)
+    term = rules.term_insurance.model_copy(update={"reason": "Protects your family's lifestyle"})
+    return rules.model_copy(update={"term_insurance": term, "additional_advice": ["Review cover every few years"]})
+
+
+def test_feature_distance():
+    near = np.linalg.norm(profile_features(parse_profile_text(profile(35, 75000)))
+                          - profile_features(parse_profile_text(profile(34, 74000))))
+    assert near < 0.3
+    single = np.linalg.norm(profile_features(parse_profile_text(profile()))
+                            - profile_features(parse_profile_text(profile(marital="Single"))))
+    assert single == pytest.approx(2 ** 0.5)
+    assert profile_features(parse_profile_text(profile(marital="Select..."))) is None
+
+
+def test_reuse_rederives_figures_for_exact_profile():
+    index = SimilarityIndex(max_distance=0.5)
+    index.add(profile(35, 75000), llm_style(profile(35, 75000)))
+    reuse = index.lookup(profile(34, 74000))
+    recommendation = reuse["recommendation"]
+    assert recommendation.term_insurance.reason == "Protects your family's lifestyle"
+    assert recommendation.additional_advice == ["Review cover every few years"]
+    exact = main.calculate_insurance_recommendations(profile(34, 74000))
+    assert recommendation.term_insurance.coverage_inr == exact.term_insurance.coverage_inr == 74000 * 12 * 15
+    assert recommendation.health_insurance.annual_premium_inr == exact.health_insurance.annual_premium_inr
+    assert recommendation.premium_affordability_check == exact.premium_affordability_check
+    assert reuse["reused_from"]["age"] == 35
+
+    assert index.lookup(profile(52, 75000)) is None
+    assert index.lookup(profile(marital="Single")) is None
+    assert index.snapshot()["reuse_rate"] == pytest.approx(1 / 3, abs=1e-3)
+    assert SimilarityIndex(max_distance=0).add(profile(), llm_style(profile())) is False
+
+
+class FakeTree:
+    def __init__(self, data):
+        self.data = data
+
+    def query(self, vector, distance_upper_bound):
+        distances = np.sqrt(((self.data - vector) ** 2).sum(axis=1))
+        i = int(distances.argmin())
+        return (distances[i], i) if distances[i] <= distance_upper_bound else (np.inf, len(self.data))
+
+
+def test_tree_and_recent_points_are_both_searched(monkeypatch):
+    monkeypatch.setattr(similarity, "cKDTree", FakeTree)
+    monkeypatch.setattr(similarity, "REBUILD_EVERY", 4)
+    index = SimilarityIndex(max_distance=0.5)
+    for age in range(22, 64, 3):  # 14 inserts: a tree over the first 12, two unindexed points
+        index.add(profile(age), llm_style(profile(age)))
+    assert index.tree is not None and index.tree_size == 12 and len(index) == 14
+    assert index.lookup(profile(61))["reused_from"]["age"] == 61
+    assert index.lookup(profile(48))["reused_from"]["age"] == 49
+    # The oldest profiles are dropped once the index is full
+    small = SimilarityIndex(max_distance=0.5, max_entries=5)
+    for age in range(22, 64, 3):
+        small.add(profile(age), llm_style(profile(age)))
+    assert len(small) <= 5 and small.lookup(profile(23)) is None
+    assert small.lookup(profile(61))["reused_from"]["age"] == 61
+
+
+def test_get_recommendation_serves_reuse(monkeypatch):
+    calls = []
+
+    def fake_llm(profile_text):
+        calls.append(profile_text)
+        return llm_style(profile_text), {"total_tokens": 900}, []
+
+    monkeypatch.setattr(main, "similarity_index", SimilarityIndex(max_distance=0.5))
+    monkeypatch.setattr(main, "run_structured_recommendation", fake_llm)
+    first = main.get_recommendation(profile(35, 75000), render_charts=False, save_output=False)
+    second = main.get_recommendation(profile(34, 74000), render_charts=False, save_output=False)
+    assert len(calls) == 1 and first["reused_from"] is None
+    assert second["reused_from"]["distance"] > 0 and second["token_usage"] is None
+    assert second["chart_data"]["coverage_vs_income"] != first["chart_data"]["coverage_vs_income"]
+    assert main.similarity_index.snapshot()["reused"] == 1
+
+
+def test_reused_text_drops_the_neighbours_figures():
+    stored = main.calculate_insurance_recommendations(profile(35, 75000))
+    term = stored.term_insurance.model_copy(update={
+        "reason": "At 35 with ₹9 lakh a year, 15× income is ₹1.35 crores. Protects your family's lifestyle.",
+        "add_ons": ["Critical Illness Rider", "Accidental death cover of ₹25 lakhs"]})
+    health = stored.health_insurance.model_copy(update={"reason": "A ₹10 lakh floater suits you at 35."})
+    stored = stored.model_copy(update={
+        "term_insurance": term, "health_insurance": health,
+        "additional_advice": ["Keep premiums under 10% of income", "Review cover annually"],
+        "products_to_avoid": ["ULIPs", "Plans costing more than ₹30,000 a year"]})
+    index = SimilarityIndex(max_distance=0.5)
+    index.add(profile(35, 75000), stored)
+
+    recommendation = index.lookup(profile(34, 74000))["recommendation"]
+    assert recommendation.term_insurance.reason == "Protects your family's lifestyle."
+    assert recommendation.term_insurance.add_ons == ["Critical Illness Rider"]
+    exact = main.calculate_insurance_recommendations(profile(34, 74000))
+    assert recommendation.health_insurance.reason == exact.health_insurance.reason
+    assert recommendation.additional_advice == ["Review cover annually"]
+    assert recommendation.products_to_avoid == ["ULIPs"]
+
+
+def test_rederive_does_not_import_main(monkeypatch):
+    monkeypatch.setitem(sys.modules, "main", None)
+    stored = llm_style(profile(35, 75000))
+    reused = similarity.rederive(stored, profile(34, 74000))
+    assert reused.term_insurance.coverage_inr == 74000 * 12 * 15
+    assert reused.term_insurance.reason == "Protects your family's lifestyle"
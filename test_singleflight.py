@@ -0,0 +1,143 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+import singleflight
+from singleflight import SingleFlight, coalesced, request_key
+
+PROFILE = "Age: 35\nMonthly Income: ₹60000\nDependents: 2\n"
+
+
+def slow_counter(calls, delay=0.2):
+    def compute(value):
+        calls.append(value)
+        time.sleep(delay)
+        return {"value": value}
+    return compute
+
+
+def test_key_ignores_formatting_differences():
+    key = request_key("what_if", {"query": "What if I buy a car?", "profile_text": PROFILE})
+    same = request_key("what_if", {"query": "  what if i buy a   car ", "profile_text": "\n" + PROFILE.replace(": ", ":")})
+    other = request_key("what_if", {"query": "What if I sell my car?", "profile_text": PROFILE})
+    assert key == same and key != other
+
+
+def test_concurrent_threads_share_one_call():
+    calls, group = [], SingleFlight()
+    compute = coalesced("rec", group)(slow_counter(calls))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(compute(1))) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == [1] and results == [{"value": 1}] * 10
+    assert group.stats == {"leaders": 1, "followers": 9}
+    # Nothing is cached once the flight lands
+    compute(1)
+    assert calls == [1, 1]
+
+
+def test_asyncio_tasks_and_threads_coalesce():
+    calls, group = [], SingleFlight()
+    compute = slow_counter(calls)
+
+    async def main():
+        thread = threading.Thread(target=group.do, args=("k", compute, 2))
+        tasks = [asyncio.create_task(group.do_async("k", compute, 2)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        thread.start()
+        results = await asyncio.gather(*tasks)
+        await asyncio.to_thread(thread.join)
+        return results
+
+    assert asyncio.run(main()) == [{"value": 2}] * 5
+    assert calls == [2]
+
+
+def test_errors_reach_every_waiter():
+    group = SingleFlight()
+
+    def fail():
+        time.sleep(0.1)
+        raise ValueError("quota exceeded")
+
+    errors = []
+
+    def call():
+        try:
+            group.do("k", fail)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == ["quota exceeded"] * 4
+
+
+def _process_worker(lock_dir, log_path, start_at):
+    group = SingleFlight(lock_dir)
+
+    def compute():
+        with open(log_path, "a") as f:
+            f.write("x")
+        time.sleep(0.3)
+        return "shared"
+
+    time.sleep(max(0, start_at - time.time()))
+    assert group.do("k", compute) == "shared"
+
+
+@pytest.mark.skipif(singleflight.fcntl is None, reason="needs fcntl")
+def test_cross_process_mode(tmp_path):
+    log_path = str(tmp_path / "calls.log")
+    ctx = multiprocessing.get_context("fork")
+    start_at = time.time() + 0.3
+    procs = [ctx.Process(target=_process_worker, args=(str(tmp_path / "locks"), log_path, start_at)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    assert all(p.exitcode == 0 for p in procs)
+    assert open(log_path).read() == "x"
+    lock_dir = tmp_path / "locks"
+    assert os.stat(lock_dir).st_mode & 0o777 == 0o700
+    # The last follower deletes the shared result
+    assert os.listdir(lock_dir) and not [n for n in os.listdir(lock_dir) if ".result" in n]
+
+
+def test_shared_results_are_json_with_models_rebuilt(tmp_path):
+    import main
+
+    recommendation = main.calculate_insurance_recommendations(PROFILE)
+    path = str(tmp_path / "k.result")
+    SingleFlight._write_shared(path, {"recommendation": recommendation, "products": {"Term": [1, 2]}})
+    with open(path, encoding="utf-8") as f:
+        assert '"__model__": "InsuranceRecommendation"' in f.read()
+    shared = SingleFlight._read_shared(path, 0)
+    assert shared["recommendation"] == recommendation and shared["products"] == {"Term": [1, 2]}
+
+    SingleFlight._write_shared(str(tmp_path / "other.result"), {"value": object()})
+    assert not os.path.exists(tmp_path / "other.result")
+
+
+def test_unparseable_arguments_skip_coalescing():
+    calls = []
+
+    @coalesced("rec", SingleFlight())
+    def recommend(profile_text):
+        calls.append(profile_text)
+        try:
+            int("abc")
+        except ValueError as e:
+            return {"error": str(e)}
+
+    assert "error" in recommend("Age: abc\n") and calls == ["Age: abc\n"]
@@ -0,0 +1,44 @@
+from streaming import SentenceLimiter, begin_request, cap_sentences, end_request
+
+ANSWER = "Raise cover to ₹1.5 crore. Add a Rs. 500 rider, e.g. waiver of premium! Review it yearly. Then relax."
+
+
+def stream(chunks, max_sentences=3):
+    limiter = SentenceLimiter(max_sentences)
+    out, used = [], 0
+    for chunk in chunks:
+        used += 1
+        piece, done = limiter.feed(chunk)
+        out.append(piece)
+        if done:
+            return "".join(out), used
+    return "".join(out) + limiter.finish(), used
+
+
+def test_cap_keeps_decimals_and_abbreviations():
+    assert cap_sentences(ANSWER) == "Raise cover to ₹1.5 crore. Add a Rs. 500 rider, e.g. waiver of premium! Review it yearly."
+    assert cap_sentences("Only one sentence without a stop") == "Only one sentence without a stop"
+
+
+def test_same_result_for_any_chunking():
+    expected = cap_sentences(ANSWER)
+    for size in (1, 2, 3, 7, 50):
+        chunks = [ANSWER[i:i + size] for i in range(0, len(ANSWER), size)]
+        text, used = stream(chunks)
+        assert text == expected, size
+        # Stopped reading once the third sentence was confirmed
+        assert used < len(chunks)
+
+
+def test_held_terminator_is_released_at_end():
+    assert stream(["Premiums are ₹1", "."]) == ("Premiums are ₹1.", 2)
+
+
+def test_new_request_cancels_previous():
+    first = begin_request("session-1")
+    second = begin_request("session-1")
+    other = begin_request("session-2")
+    assert first.is_set() and not second.is_set() and not other.is_set()
+    end_request("session-1", second)
+    end_request("session-2", other)
+    assert not begin_request("session-1").is_set()
@@ -0,0 +1,63 @@
+import numpy as np
+
+import main
+import reports
+from profiles import build_profile_text
+from rules import calculate_insurance_recommendations, compute_rule_figures
+from sharded_batch import ADEQUATE_COVER_MULTIPLE
+from sweeps import sweep, sweep_table
+from tools import explain_affordability, explain_coverage_adequacy
+
+result = sweep(ages=range(25, 61, 5), incomes=range(30000, 500001, 47000), dependents=range(0, 5))
+
+
+def test_grid_matches_scalar_rules():
+    axes, metrics = result["axes"], result["metrics"]
+    for i, age in enumerate(axes["age"]):
+        for j, income in enumerate(axes["income"]):
+            for k, deps in enumerate(axes["dependents"]):
+                profile = {"age": int(age), "income": int(income), "dependents": int(deps), "vehicle": "Yes"}
+                figures = compute_rule_figures(profile)
+                assert metrics["term_coverage"][i, j, k] == figures["term_coverage"]
+                assert np.isclose(metrics["total_premium"][i, j, k], figures["total_premium"])
+
+                tip = explain_affordability(figures["term_premium"], figures["health_premium"], int(income))
+                assert tip.startswith("⚠️") == bool(metrics["affordability_band"][i, j, k])
+
+                total = figures["term_coverage"] + figures["health_coverage"]
+                band = metrics["adequacy_band"][i, j, k]
+                tip = explain_coverage_adequacy(total, int(income) * 12)
+                assert tip.startswith("❌") == (band == 0)
+                assert tip.startswith("✅") == (band == 2)
+
+
+def test_table_columns_are_flat():
+    table = sweep_table(result)
+    size = result["metrics"]["term_coverage"].size
+    assert all(len(column) == size for column in table.values())
+    assert {"age", "income", "dependents", "premium_share_pct"} <= set(table)
+
+
+def test_adequacy_uses_annual_income_everywhere(monkeypatch):
+    # One profile: the sweep, the live insights, the report pack and the batch stats agree
+    profile = {"age": 40, "income": 300000, "marital_status": "Married", "dependents": 2, "employment": "Private Job",
+               "existing_insurance": {}, "health_conditions": "None", "vehicle": "Yes", "owns_property": "No",
+               "frequent_traveler": "No"}
+    profile_text = build_profile_text(profile)
+    recommendation = calculate_insurance_recommendations(profile_text)
+    insights = main.recommendation_insights(recommendation, profile_text)
+    live = insights["chart_data"]["coverage_adequacy"]["adequacy_pct"]
+
+    swept = sweep(ages=[40], incomes=[300000], dependents=[2])["metrics"]["adequacy_pct"][0, 0, 0]
+    assert np.isclose(swept, live, rtol=1e-5)
+
+    seen = []
+    monkeypatch.setattr(reports, "svg_adequacy", lambda data: seen.append(data["adequacy_pct"]) or "")
+    reports.render_report_html({"recommendation": recommendation.model_dump(), "profile": profile, "products": {},
+                                "term_coverage": recommendation.term_insurance.coverage_inr,
+                                "health_coverage": recommendation.health_insurance.coverage_inr})
+    assert seen == [live]
+
+    total = recommendation.term_insurance.coverage_inr + recommendation.health_insurance.coverage_inr
+    underinsured = total < profile["income"] * 12 * ADEQUATE_COVER_MULTIPLE
+    assert underinsured == (live < 100) == (not insights["adequacy_tip"].startswith("✅"))
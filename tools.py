@@ -2,28 +2,15 @@ from datetime import datetime
 import os
 import matplotlib.pyplot as plt
 from typing import List, Dict
-from pydantic import BaseModel
-import re
+from chart_data import (
+    ADEQUACY_CLAMP_PCT,
+    affordability_chart_data,
+    coverage_adequacy_data,
+    coverage_vs_income_chart_data
+)
 
-# ----------------------------------------
-# Insurance Schema (for reference typing)
-# ----------------------------------------
-class InsuranceDetails(BaseModel):
-    coverage: str
-    estimated_premium: str
-    reason: str
-    add_ons: List[str]
-
-class InsuranceRecommendation(BaseModel):
-    term_insurance: InsuranceDetails
-    health_insurance: InsuranceDetails
-    premium_affordability_check: str
-    additional_advice: List[str]
-    products_to_avoid: List[str]
-    vehicle_insurance: InsuranceDetails | None = None
-    property_insurance: InsuranceDetails | None = None
-    travel_insurance: InsuranceDetails | None = None
-    personal_accident_cover: InsuranceDetails | None = None
+from rules import parse_profile_text
+from schemas import InsuranceDetails, InsuranceRecommendation, parse_inr
 
 # ----------------------------------------
 # 1. Save recommendation to file
@@ -102,61 +89,29 @@ def generate_explanation(plan: InsuranceDetails, label: str) -> str:
 # 3. Visualize affordability vs income
 # ----------------------------------------
 
-def parse_money(value: str) -> int:
-    """Convert strings like ₹2 Crore, ₹20L, 2,50,000/month → integer rupees."""
-    if isinstance(value, (int, float)):
-        return int(value)
-    if not value:
-        return 0
-
-    # Normalize
-    value = str(value).replace(",", "").replace("₹", "").strip().lower()
-
-    # Crore conversion
-    if "crore" in value or "cr" in value:
-        digits = re.findall(r"\d+\.?\d*", value)
-        return int(float(digits[0]) * 1e7) if digits else 0
-
-    # Lakh conversion
-    if "lakh" in value or "lac" in value or "l" in value:
-        digits = re.findall(r"\d+\.?\d*", value)
-        return int(float(digits[0]) * 1e5) if digits else 0
-
-    # Plain number
-    digits = re.findall(r"\d+", value)
-    return int(digits[0]) if digits else 0
+def parse_money(value) -> int:
+    """Convert strings like ₹2 Crore, ₹20L, 2,50,000 → integer rupees (for free-text input;
+    recommendation amounts are already numeric)."""
+    return parse_inr(value)
 
 def visualize_affordability_chart(term_premium, health_premium, monthly_income, save_path=None):
-    # Convert everything to int
-    term_premium = parse_money(term_premium)
-    health_premium = parse_money(health_premium)
-    monthly_income = parse_money(monthly_income)
+    term_premium, health_premium, monthly_income = int(term_premium), int(health_premium), int(monthly_income)
 
     if save_path is None:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
         save_path = f"affordability_chart_{timestamp}.png"
 
-    remaining_income = max(monthly_income - (term_premium + health_premium), 0)
-    labels = ['Remaining Income', 'Term Insurance', 'Health Insurance']
-    values = [remaining_income, term_premium, health_premium]
-    colors = ['#4caf50', '#f44336', '#2196f3']
-
-    non_zero_labels, non_zero_values, non_zero_colors = [], [], []
-    for label, value, color in zip(labels, values, colors):
-        if value > 0:
-            non_zero_labels.append(label)
-            non_zero_values.append(value)
-            non_zero_colors.append(color)
+    data = affordability_chart_data(term_premium, health_premium, monthly_income)
 
     plt.figure(figsize=(8, 6))
-    if non_zero_values:
-        plt.pie(non_zero_values, labels=non_zero_labels, autopct='%1.1f%%',
-                colors=non_zero_colors, startangle=140)
+    if data["values"]:
+        plt.pie(data["values"], labels=data["labels"], autopct='%1.1f%%',
+                colors=data["colors"], startangle=140)
     else:
         plt.text(0.5, 0.5, 'No data to display', ha='center', va='center',
                  transform=plt.gca().transAxes)
 
-    plt.title("Premium vs Monthly Income", fontsize=14, fontweight='bold')
+    plt.title(data["title"], fontsize=14, fontweight='bold')
     plt.tight_layout()
     plt.savefig(save_path, dpi=300, bbox_inches='tight')
     plt.close()
@@ -165,51 +120,30 @@ def visualize_affordability_chart(term_premium, health_premium, monthly_income,
 def visualize_coverage_vs_income_chart(term_coverage, health_coverage, monthly_income, save_path=None):
     """Visualize insurance coverage vs annual income with formatted labels."""
 
-    # ✅ Parse values to integers
-    term_coverage = parse_money(term_coverage)
-    health_coverage = parse_money(health_coverage)
-    monthly_income = parse_money(monthly_income)
+    term_coverage, health_coverage, monthly_income = int(term_coverage), int(health_coverage), int(monthly_income)
 
     if save_path is None:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         save_path = f"coverage_vs_income_chart_{timestamp}.png"
 
-    labels = ['Term Insurance', 'Health Insurance']
-    coverage_values = [term_coverage, health_coverage]
-    income_value = monthly_income * 12  # Annual income
+    data = coverage_vs_income_chart_data(term_coverage, health_coverage, monthly_income)
 
     plt.figure(figsize=(10, 6))
-    bars = plt.bar(labels, coverage_values, color=['#4caf50', '#2196f3'], alpha=0.8, width=0.6)
+    bars = plt.bar(data["labels"], data["values"], color=data["colors"], alpha=0.8, width=0.6)
 
     # Add text labels with better formatting for large numbers
-    for bar in bars:
-        height = bar.get_height()
-        if height >= 10000000:  # 1 crore
-            label_text = f"₹{height/10000000:.1f}Cr"
-        elif height >= 100000:  # 1 lakh
-            label_text = f"₹{height/100000:.1f}L"
-        else:
-            label_text = f"₹{height:,}"
-
+    for bar, label_text in zip(bars, data["value_labels"]):
         plt.text(
             bar.get_x() + bar.get_width()/2,
-            height + max(coverage_values) * 0.02,
+            bar.get_height() + max(data["values"]) * 0.02,
             label_text,
             ha='center', va='bottom', fontsize=10, fontweight='bold'
         )
 
-    # Add annual income line with better formatting
-    if income_value >= 10000000:
-        income_label = f'Annual Income (₹{income_value/10000000:.1f}Cr)'
-    elif income_value >= 100000:
-        income_label = f'Annual Income (₹{income_value/100000:.1f}L)'
-    else:
-        income_label = f'Annual Income (₹{income_value:,})'
-
-    plt.axhline(y=income_value, color='red', linestyle='--', linewidth=2, label=income_label)
+    plt.axhline(y=data["annual_income"], color='red', linestyle='--', linewidth=2, label=data["income_label"])
     plt.ylabel("Amount (₹)", fontsize=12)
-    plt.title("Insurance Coverage vs Annual Income", fontsize=14, fontweight='bold')
-    plt.ylim(0, max(max(coverage_values), income_value) * 1.3)
+    plt.title(data["title"], fontsize=14, fontweight='bold')
+    plt.ylim(0, data["y_max"])
     plt.legend(loc='upper right')
     plt.grid(axis='y', alpha=0.3)
     plt.tight_layout()
@@ -219,64 +153,47 @@ def visualize_coverage_vs_income_chart(term_coverage, health_coverage, monthly_i
 def visualize_coverage_adequacy(actual_coverage, annual_income, multiplier=10, save_path="coverage_adequacy.png"):
     """Visualize how adequate coverage is compared to recommended (annual_income × multiplier)."""
 
-    # ✅ Parse values to integers
-    actual_coverage = parse_money(actual_coverage)
-    annual_income = parse_money(annual_income)
+    actual_coverage, annual_income = int(actual_coverage), int(annual_income)
 
-    recommended = annual_income * multiplier
-    adequacy = (actual_coverage / recommended) * 100 if recommended > 0 else 0
-
-    # Clamp value between 0–120% for chart
-    adequacy = min(adequacy, 120)
+    data = coverage_adequacy_data(actual_coverage, annual_income, multiplier)
+    adequacy = data["adequacy_pct"]
 
     plt.figure(figsize=(10, 4))
 
     # Create horizontal bar chart
-    bar_color = "green" if adequacy >= 100 else "orange" if adequacy >= 50 else "red"
-    bars = plt.barh(["Coverage Adequacy"], [adequacy], color=bar_color, height=0.6, alpha=0.8)
+    bars = plt.barh(["Coverage Adequacy"], [adequacy], color=data["color"], height=0.6, alpha=0.8)
 
     # Add recommended line
     plt.axvline(x=100, color="black", linestyle="--", linewidth=2, label="Recommended (100%)")
 
     # Set x-axis limits
-    plt.xlim(0, 120)
+    plt.xlim(0, ADEQUACY_CLAMP_PCT)
 
     # Add percentage text on the bar
     for bar in bars:
         width = bar.get_width()
         plt.text(width + 1, bar.get_y() + bar.get_height()/2,
-                f"{adequacy:.1f}%", ha='left', va='center', fontsize=12, fontweight='bold')
-
-    # Add coverage amount text
-    if actual_coverage >= 10000000:
-        coverage_text = f"Current: ₹{actual_coverage/10000000:.1f}Cr"
-    elif actual_coverage >= 100000:
-        coverage_text = f"Current: ₹{actual_coverage/100000:.1f}L"
-    else:
-        coverage_text = f"Current: ₹{actual_coverage:,}"
+                data["label"], ha='left', va='center', fontsize=12, fontweight='bold')
 
-    if recommended >= 10000000:
-        recommended_text = f"Recommended: ₹{recommended/10000000:.1f}Cr"
-    elif recommended >= 100000:
-        recommended_text = f"Recommended: ₹{recommended/100000:.1f}L"
-    else:
-        recommended_text = f"Recommended: ₹{recommended:,}"
-
-    plt.text(5, 0.3, coverage_text, fontsize=10, style='italic')
-    plt.text(5, -0.3, recommended_text, fontsize=10, style='italic')
+    plt.text(5, 0.3, data["coverage_text"], fontsize=10, style='italic')
+    plt.text(5, -0.3, data["recommended_text"], fontsize=10, style='italic')
 
     plt.xlabel("Coverage Adequacy (%)", fontsize=12)
-    plt.title("Insurance Coverage Adequacy Assessment", fontsize=14, fontweight='bold')
+    plt.title(data["title"], fontsize=14, fontweight='bold')
     plt.legend(loc='upper right')
     plt.grid(axis='x', alpha=0.3)
     plt.tight_layout()
     plt.savefig(save_path, dpi=300, bbox_inches='tight')
     plt.close()
     return save_path
+# Thresholds shared by the explain_* helpers and the vectorized sweeps
+AFFORDABILITY_LIMIT_PCT = 20
+SEVERE_UNDERINSURANCE_SHARE = 0.5
+
 def explain_affordability(term_premium, health_premium, monthly_income):
     total_premium = term_premium + health_premium
     percent = (total_premium / monthly_income) * 100
-    if percent > 20:
+    if percent > AFFORDABILITY_LIMIT_PCT:
         return f"⚠️ Your premiums take up {percent:.1f}% of your monthly income. Consider reducing coverage or finding lower-cost plans."
     else:
         return f"✅ Your premiums are only {percent:.1f}% of income. This is affordable and manageable."
@@ -294,9 +211,35 @@ def explain_coverage_vs_income(term_coverage, health_coverage, annual_income):
 
 def explain_coverage_adequacy(actual_coverage, annual_income, multiplier=10):
     recommended = annual_income * multiplier
-    if actual_coverage < recommended * 0.5:
+    if actual_coverage < recommended * SEVERE_UNDERINSURANCE_SHARE:
         return "❌ You are severely underinsured. Increase your coverage immediately."
     elif actual_coverage < recommended:
         return "⚠️ You are underinsured. Consider topping up your policy."
     else:
         return "✅ You are adequately insured."
+
+# ----------------------------------------
+# 4. Insights for a recommendation
+# ----------------------------------------
+def recommendation_insights(recommendation, profile_text: str) -> dict:
+    """Explanation, chart data and tips derived from a recommendation (nothing is drawn)."""
+    income = parse_profile_text(profile_text)["income"]
+    annual_income = income * 12  # coverage is judged against annual income, as in sweeps and batch stats
+    term_val = recommendation.term_insurance.annual_premium_inr
+    health_val = recommendation.health_insurance.annual_premium_inr
+    term_coverage = recommendation.term_insurance.coverage_inr
+    health_coverage = recommendation.health_insurance.coverage_inr
+    total_coverage = term_coverage + health_coverage
+
+    return {
+        "explanation": generate_explanation(recommendation.term_insurance, "Term Insurance"),
+        "chart_data": {
+            "affordability": affordability_chart_data(term_val, health_val, income),
+            "coverage_vs_income": coverage_vs_income_chart_data(term_coverage, health_coverage, income),
+            "coverage_adequacy": coverage_adequacy_data(total_coverage, annual_income),
+        },
+        "affordability_tip": explain_affordability(term_val, health_val, income),
+        "coverage_tip": explain_coverage_vs_income(term_coverage, health_coverage, annual_income),
+        "adequacy_tip": explain_coverage_adequacy(total_coverage, annual_income),
+        "figures": (term_val, health_val, term_coverage, health_coverage, income),
+    }